@@ -9,21 +9,42 @@ Optimized components for fast Vedic astrology analysis:
 - Fast Reranker (NumPy-based)
 - Semantic Selector (chart highlights)
 - Niche Preloader (knowledge caching)
+
+Exports are resolved on first access (PEP 562), so importing one agent
+module does not import every agent and its SDK.
 """
 
-from .openrouter_synthesizer import OpenRouterSynthesizer
-from .modern_synthesizer import ModernSynthesizer
-from .smart_orchestrator import SmartOrchestrator
-from .simple_chart_parser import ChartParser
-from .gemini_embeddings import GeminiEmbeddings
-from .question_complexity import QuestionComplexityClassifier
-from .validator import LightweightValidator
-from .real_rag_retriever import RealRAGRetriever
-from .vector_search_retriever import VectorSearchRetriever
-from .cached_retriever import CachedRetriever
-from .semantic_selector import SemanticFactorSelector
-from .niche_preloader import NichePreloader
-from .fast_reranker import FastReranker
+import importlib
+
+_EXPORTS = {
+    'OpenRouterSynthesizer': '.openrouter_synthesizer',
+    'ModernSynthesizer': '.modern_synthesizer',
+    'SmartOrchestrator': '.smart_orchestrator',
+    'ChartParser': '.simple_chart_parser',
+    'GeminiEmbeddings': '.gemini_embeddings',
+    'QuestionComplexityClassifier': '.question_complexity',
+    'LightweightValidator': '.validator',
+    'RealRAGRetriever': '.real_rag_retriever',
+    'VectorSearchRetriever': '.vector_search_retriever',
+    'CachedRetriever': '.cached_retriever',
+    'SemanticFactorSelector': '.semantic_selector',
+    'NichePreloader': '.niche_preloader',
+    'FastReranker': '.fast_reranker',
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
+
 
 __all__ = [
     'OpenRouterSynthesizer',
@@ -0,0 +1,535 @@
+"""
+Deterministic chart parser for the known chart JSON shapes
+Maps structured D1/Dn/Dasha JSON straight into the flat factor dict used by the
+orchestrator, so session init needs no LLM call for charts we recognise.
+
+Recognised shapes (alone, inside a container keyed by chart name such as
+``d1``/``d9``/``navamsa``/``dasha``, or as JSON blocks embedded in text):
+
+* Documented API format: ``{"planets": {"Sun": {"sign", "house", "degree"}}, "houses": {"7th_lord": ...}}``
+* Developer D1 API: ``{"output": {"Ascendant": {...}, "Sun": {"zodiac_sign_name", "house_number", ...}}}``
+* Developer divisional API: ``{"output": {"0": {"name", "current_sign", "house_number"}, ...}}``
+* Vimshottari tree: ``{"Jupiter": {"Saturn": {"start_time", "end_time"}, ...}}`` - optionally one
+  level deeper for pratyantardashas, optionally wrapped as a JSON string in ``output``
+* Already-flat factor dicts (``{"7th_lord": "Jupiter", ...}``), passed through
+"""
+
+import json
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.dasha_timeline import DashaTimeline, parse_dasha_date
+
+logger = logging.getLogger(__name__)
+
+SIGNS = [
+    "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+    "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces",
+]
+SIGN_LORDS = {
+    "Aries": "Mars", "Taurus": "Venus", "Gemini": "Mercury", "Cancer": "Moon",
+    "Leo": "Sun", "Virgo": "Mercury", "Libra": "Venus", "Scorpio": "Mars",
+    "Sagittarius": "Jupiter", "Capricorn": "Saturn", "Aquarius": "Saturn", "Pisces": "Jupiter",
+}
+PLANETS = ["Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn", "Rahu", "Ketu"]
+# Chara karakas by descending degree-in-sign (7-karaka scheme, Rahu/Ketu excluded)
+KARAKAS = [
+    "atmakaraka", "amatyakaraka", "bhratrukaraka", "matrukaraka",
+    "putrakaraka", "gnatikaraka", "darakaraka",
+]
+
+_PLANET_LOOKUP = {name.lower(): name for name in PLANETS}
+_SIGN_LOOKUP = {name.lower(): name for name in SIGNS}
+_SIGN_LOOKUP.update({name[:3].lower(): name for name in SIGNS})
+_DIVISION_KEY = re.compile(r"^d[-_ ]?(\d{1,2})(?:[-_ ]?chart)?$", re.IGNORECASE)
+_DIVISION_NAMES = {
+    "rasi": 1, "rashi": 1, "lagna": 1, "birth_chart": 1,
+    "hora": 2, "drekkana": 3, "chaturthamsa": 4, "saptamsa": 7,
+    "navamsa": 9, "navamsha": 9, "dasamsa": 10, "dashamsa": 10,
+    "dwadasamsa": 12, "shodasamsa": 16, "vimsamsa": 20, "trimsamsa": 30, "shashtiamsa": 60,
+}
+_DASHA_KEYS = {"dasha", "dashas", "mahadasha", "mahadashas", "vimshottari", "vimshottari_dasha", "dasha_tree"}
+_FACTOR_SUFFIXES = ("_sign", "_lord", "_house", "_nakshatra", "_mahadasha", "_antardasha", "_yoga", "_placement")
+# Bump when the factor output changes; retires parsed-chart cache entries
+SCHEMA_VERSION = 2
+
+
+
+def ordinal(number: int) -> str:
+    """1 -> '1st', 2 -> '2nd', 11 -> '11th'"""
+    if 10 <= number % 100 <= 20:
+        return f"{number}th"
+    return f"{number}{ {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th') }"
+
+
+def parse_chart_json(chart: Any, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """
+    Parse a structured chart without any model call
+
+    Args:
+        chart: Chart JSON (dict, list of blocks, or JSON string)
+        as_of: Reference time for the running dasha (default: now)
+
+    Returns:
+        Dict: Flat chart factors, or None when no known shape was detected
+    """
+    blocks = _labelled_blocks(_decode(chart), label=None)
+    if not blocks:
+        return None
+
+    factors: Dict[str, Any] = {}
+    unlabeled_divisions = iter((9, 10, 7, 12, 60))
+    parsed_any = False
+    for kind, label, payload in blocks:
+        if kind == "planets":
+            parsed_any |= _parse_planet_chart(payload, factors, division=label or 1)
+        elif kind == "d1_api":
+            parsed_any |= _parse_planet_chart(_d1_api_entries(payload), factors, division=label or 1)
+        elif kind == "divisional":
+            division = label or next(unlabeled_divisions, None)
+            if division:
+                parsed_any |= _parse_planet_chart(_divisional_entries(payload), factors, division=division)
+        elif kind == "dasha":
+            parsed_any |= _parse_dasha_tree(payload, factors, as_of or datetime.now())
+        elif kind == "flat":
+            factors.update({k: v for k, v in payload.items() if k not in factors})
+            parsed_any = True
+
+    if not parsed_any:
+        return None
+
+    factors["parsing_method"] = "schema"
+    factors["chart_source"] = "user_input"
+    factors["has_real_data"] = True
+    return factors
+
+
+# ----------------------------------------------------------------------
+# Schema detection
+# ----------------------------------------------------------------------
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, str):
+        text = value.strip()
+        if text[:1] in ("{", "["):
+            try:
+                return json.loads(text)
+            except ValueError:
+                return value
+    return value
+
+
+def _division_from_label(key: str) -> Optional[int]:
+    normalized = key.strip().lower()
+    match = _DIVISION_KEY.match(normalized)
+    if match:
+        return int(match.group(1))
+    return _DIVISION_NAMES.get(normalized)
+
+
+def _labelled_blocks(data: Any, label: Optional[int]) -> List[Tuple[str, Optional[int], Any]]:
+    """Walk containers and return ``(kind, division, payload)`` for each recognised block."""
+    if isinstance(data, list):
+        blocks: List[Tuple[str, Optional[int], Any]] = []
+        for item in data:
+            blocks.extend(_labelled_blocks(_decode(item), label))
+        return blocks
+    if not isinstance(data, dict):
+        return []
+
+    kind = _detect(data)
+    if kind == "wrapped":
+        return _labelled_blocks(_decode(data["output"]), label)
+    if kind and kind != "planets":
+        return [(kind, label, data)]
+
+    # Container keyed by chart name; the documented format also carries
+    # houses (and possibly dasha/divisional blocks) next to its planets
+    blocks = [(kind, label, data)] if kind else []
+    leftovers: Dict[str, Any] = {}
+    for key, value in data.items():
+        if kind and key == "planets":
+            continue
+        division = _division_from_label(str(key))
+        if division is not None:
+            blocks.extend(_labelled_blocks(_decode(value), division))
+        elif str(key).lower() in _DASHA_KEYS:
+            nested = _decode(value)
+            dasha = nested.get("output") if isinstance(nested, dict) and "output" in nested else nested
+            dasha = _decode(dasha)
+            if isinstance(dasha, dict) and _is_dasha_tree(dasha):
+                blocks.append(("dasha", None, dasha))
+        elif str(key).lower() == "houses" and isinstance(value, dict):
+            blocks.append(("flat", None, _house_overrides(value, label or 1)))
+        elif _is_scalar(value):
+            leftovers[key] = value
+    if blocks and leftovers and _looks_flat(leftovers):
+        blocks.append(("flat", None, leftovers))
+    return blocks
+
+
+def _detect(data: Dict[str, Any]) -> Optional[str]:
+    planets = data.get("planets")
+    if isinstance(planets, dict) and any(_planet_name(k) or str(k).lower() == "ascendant" for k in planets):
+        return "planets"
+
+    output = data.get("output")
+    if isinstance(output, str):
+        return "wrapped"
+    if isinstance(output, list):
+        output = {str(i): entry for i, entry in enumerate(output)}
+    if isinstance(output, dict):
+        entries = [v for v in output.values() if isinstance(v, dict)]
+        if any("zodiac_sign_name" in v or "house_number" in v for v in entries) and (
+            "Ascendant" in output or any(_planet_name(k) for k in output)
+        ):
+            return "d1_api"
+        if entries and all("name" in v and ("current_sign" in v or "sign" in v) for v in entries):
+            return "divisional"
+        if _is_dasha_tree(output):
+            return "dasha"
+
+    if _is_dasha_tree(data):
+        return "dasha"
+    if _looks_flat(data):
+        return "flat"
+    return None
+
+
+def _is_dasha_tree(data: Dict[str, Any]) -> bool:
+    planet_keys = [k for k in data if _planet_name(k)]
+    if not planet_keys or len(planet_keys) < len(data) * 0.8:
+        return False
+    for maha in planet_keys:
+        subs = data[maha]
+        if isinstance(subs, dict) and any(_period_bounds(v) or isinstance(v, dict) for v in subs.values()):
+            return True
+    return False
+
+
+def _looks_flat(data: Dict[str, Any]) -> bool:
+    keys = [str(k).lower() for k, v in data.items() if _is_scalar(v)]
+    hits = sum(1 for k in keys if k.endswith(_FACTOR_SUFFIXES) or k in ("ascendant", "current_mahadasha"))
+    return hits >= 3 and hits >= len(data) * 0.5
+
+
+def _is_scalar(value: Any) -> bool:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return True
+    return isinstance(value, list) and all(isinstance(v, (str, int, float, bool)) for v in value)
+
+
+# ----------------------------------------------------------------------
+# Planet charts
+# ----------------------------------------------------------------------
+
+def _planet_name(value: Any) -> Optional[str]:
+    return _PLANET_LOOKUP.get(str(value).strip().lower())
+
+
+def _sign_name(value: Any) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) or str(value).strip().isdigit():
+        number = int(value)
+        return SIGNS[number - 1] if 1 <= number <= 12 else None
+    return _SIGN_LOOKUP.get(str(value).strip().lower()[:11]) or _SIGN_LOOKUP.get(str(value).strip().lower()[:3])
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _truthy(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1", "r", "retro", "retrograde")
+    return bool(value)
+
+
+def _d1_api_entries(payload: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    output = payload["output"]
+    if isinstance(output, list):
+        output = {str(entry.get("name", i)): entry for i, entry in enumerate(output) if isinstance(entry, dict)}
+    entries = {}
+    for key, entry in output.items():
+        if not isinstance(entry, dict):
+            continue
+        entries[str(entry.get("name") or key)] = {
+            "sign": entry.get("zodiac_sign_name") or entry.get("current_sign"),
+            "house": entry.get("house_number"),
+            "degree": entry.get("normDegree", entry.get("fullDegree")),
+            "nakshatra": entry.get("nakshatra_name"),
+            "pada": entry.get("nakshatra_pada"),
+            "retrograde": entry.get("isRetro"),
+        }
+    return entries
+
+
+def _divisional_entries(payload: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    output = payload["output"]
+    values = output.values() if isinstance(output, dict) else output
+    entries = {}
+    for entry in values:
+        if isinstance(entry, dict) and entry.get("name"):
+            entries[str(entry["name"])] = {
+                "sign": entry.get("current_sign", entry.get("sign")),
+                "house": entry.get("house_number"),
+                "retrograde": entry.get("isRetro"),
+            }
+    return entries
+
+
+def _parse_planet_chart(payload: Any, factors: Dict[str, Any], division: int) -> bool:
+    """Map planet entries of one chart; D1 gets full house/lord/karaka factors."""
+    entries = payload.get("planets") if isinstance(payload, dict) and "planets" in payload else payload
+    if not isinstance(entries, dict):
+        return False
+
+    placements: Dict[str, Dict[str, Any]] = {}
+    ascendant_sign = None
+    ascendant_entry: Dict[str, Any] = {}
+    for key, entry in entries.items():
+        if not isinstance(entry, dict):
+            continue
+        sign = _sign_name(entry.get("sign", entry.get("zodiac_sign_name")))
+        if str(key).strip().lower() in ("ascendant", "lagna", "asc"):
+            ascendant_sign, ascendant_entry = sign, entry
+            continue
+        planet = _planet_name(key)
+        if planet and sign:
+            placements[planet] = {**entry, "sign": sign, "house": _to_int(entry.get("house"))}
+
+    if not placements and not ascendant_sign:
+        return False
+
+    # No lagna entry (documented API format): infer it when the whole-sign houses agree
+    if not ascendant_sign:
+        inferred = {
+            (SIGNS.index(p["sign"]) - p["house"] + 1) % 12 for p in placements.values() if p["house"]
+        }
+        if len(inferred) == 1:
+            ascendant_sign = SIGNS[inferred.pop()]
+
+    # Whole-sign houses from the ascendant when the source omits house numbers
+    if ascendant_sign:
+        asc_index = SIGNS.index(ascendant_sign)
+        for placement in placements.values():
+            if placement["house"] is None:
+                placement["house"] = (SIGNS.index(placement["sign"]) - asc_index) % 12 + 1
+
+    if division == 1:
+        _fill_d1(factors, placements, ascendant_sign, ascendant_entry)
+    else:
+        _fill_divisional(factors, placements, ascendant_sign, f"d{division}")
+    return True
+
+
+def _fill_d1(
+    factors: Dict[str, Any],
+    placements: Dict[str, Dict[str, Any]],
+    ascendant_sign: Optional[str],
+    ascendant_entry: Dict[str, Any],
+) -> None:
+    if ascendant_sign:
+        factors["ascendant"] = ascendant_sign
+        factors["ascendant_sign"] = ascendant_sign
+        if ascendant_entry.get("nakshatra"):
+            factors["ascendant_nakshatra"] = ascendant_entry["nakshatra"]
+
+    for planet, placement in placements.items():
+        name = planet.lower()
+        factors[f"{name}_sign"] = placement["sign"]
+        if placement["house"]:
+            factors[f"{name}_house"] = placement["house"]
+        if placement.get("nakshatra"):
+            factors[f"{name}_nakshatra"] = placement["nakshatra"]
+        if placement.get("pada"):
+            factors[f"{name}_pada"] = placement["pada"]
+        degree = _to_float(placement.get("degree"))
+        if degree is not None:
+            factors[f"{name}_degree"] = round(degree % 30, 2)
+        if _truthy(placement.get("retrograde")):
+            factors[f"{name}_retrograde"] = True
+
+    if ascendant_sign:
+        asc_index = SIGNS.index(ascendant_sign)
+        occupants: Dict[int, List[str]] = {}
+        for planet, placement in placements.items():
+            if placement["house"]:
+                occupants.setdefault(placement["house"], []).append(planet)
+
+        for house in range(1, 13):
+            key = ordinal(house)
+            sign = SIGNS[(asc_index + house - 1) % 12]
+            lord = SIGN_LORDS[sign]
+            factors[f"{key}_house_sign"] = sign
+            factors[f"{key}_lord"] = lord
+            lord_placement = placements.get(lord)
+            if lord_placement and lord_placement["house"]:
+                factors[f"{key}_lord_placement"] = f"{ordinal(lord_placement['house'])} house {lord_placement['sign']}"
+                if lord_placement.get("nakshatra"):
+                    factors[f"{key}_lord_nakshatra"] = lord_placement["nakshatra"]
+                if _truthy(lord_placement.get("retrograde")):
+                    factors[f"{key}_lord_retrograde"] = True
+            if occupants.get(house):
+                factors[f"planets_in_{key}"] = ", ".join(occupants[house])
+
+        factors["ascendant_lord"] = factors["1st_lord"]
+        if "1st_lord_placement" in factors:
+            factors["ascendant_lord_placement"] = factors["1st_lord_placement"]
+
+    _fill_karakas(factors, placements)
+
+
+def _fill_karakas(factors: Dict[str, Any], placements: Dict[str, Dict[str, Any]]) -> None:
+    degrees = []
+    for planet in PLANETS[:7]:
+        placement = placements.get(planet)
+        degree = _to_float(placement.get("degree")) if placement else None
+        if degree is None:
+            return  # Needs all seven degrees to be meaningful
+        degrees.append((degree % 30, planet))
+
+    for karaka, (_, planet) in zip(KARAKAS, sorted(degrees, reverse=True)):
+        factors[f"{karaka}_planet"] = planet
+        if karaka in ("atmakaraka", "amatyakaraka", "darakaraka"):
+            factors[f"{karaka}_sign"] = placements[planet]["sign"]
+            if placements[planet]["house"]:
+                factors[f"{karaka}_house"] = placements[planet]["house"]
+
+
+def _fill_divisional(
+    factors: Dict[str, Any],
+    placements: Dict[str, Dict[str, Any]],
+    ascendant_sign: Optional[str],
+    prefix: str,
+) -> None:
+    if ascendant_sign:
+        factors[f"{prefix}_ascendant"] = ascendant_sign
+        asc_index = SIGNS.index(ascendant_sign)
+        for house in range(1, 13):
+            sign = SIGNS[(asc_index + house - 1) % 12]
+            factors[f"{prefix}_{ordinal(house)}_house"] = sign
+            factors[f"{prefix}_{ordinal(house)}_lord"] = SIGN_LORDS[sign]
+
+    for planet, placement in placements.items():
+        name = planet.lower()
+        house = f", {ordinal(placement['house'])} house" if placement["house"] else ""
+        factors[f"{prefix}_{name}"] = f"{placement['sign']}{house}"
+        if _truthy(placement.get("retrograde")):
+            factors[f"{prefix}_{name}_retrograde"] = True
+
+
+def _house_overrides(houses: Dict[str, Any], division: int) -> Dict[str, Any]:
+    """Explicit house lords/signs supplied by the client win over computed ones."""
+    prefix = "" if division == 1 else f"d{division}_"
+    return {f"{prefix}{key}": value for key, value in houses.items() if _is_scalar(value)}
+
+
+# ----------------------------------------------------------------------
+# Vimshottari dasha tree
+# ----------------------------------------------------------------------
+
+def _period_bounds(period: Any) -> Optional[Tuple[datetime, datetime]]:
+    if not isinstance(period, dict):
+        return None
+    start = parse_dasha_date(str(period.get("start_time", period.get("start_date", period.get("start"))) or ""))
+    end = parse_dasha_date(str(period.get("end_time", period.get("end_date", period.get("end"))) or ""))
+    if not start or not end:
+        return None
+    return start, end
+
+
+def _build_timeline(tree: Dict[str, Any]) -> Optional[DashaTimeline]:
+    """Index maha -> antar (-> pratyantar) leaves into a DashaTimeline."""
+    rows: Dict[str, Dict[Tuple[str, ...], List[datetime]]] = {level: {} for level in ("mahadasha", "antardasha", "pratyantar")}
+
+    def add(level: str, lords: Tuple[str, ...], start: datetime, end: datetime) -> None:
+        bounds = rows[level].setdefault(lords, [start, end])
+        bounds[0], bounds[1] = min(bounds[0], start), max(bounds[1], end)
+
+    for maha, antars in tree.items():
+        maha_name = _planet_name(maha)
+        if not maha_name or not isinstance(antars, dict):
+            continue
+        for antar, node in antars.items():
+            antar_name = _planet_name(antar)
+            if not antar_name:
+                continue
+            leaves = [((maha_name, antar_name), _period_bounds(node))]
+            if not leaves[0][1] and isinstance(node, dict):
+                leaves = [
+                    ((maha_name, antar_name, _planet_name(pratyantar)), _period_bounds(leaf))
+                    for pratyantar, leaf in node.items() if _planet_name(pratyantar)
+                ]
+            for lords, bounds in leaves:
+                if not bounds:
+                    continue
+                add("mahadasha", lords[:1], *bounds)
+                add("antardasha", lords[:2], *bounds)
+                if len(lords) == 3:
+                    add("pratyantar", lords, *bounds)
+
+    if not rows["antardasha"]:
+        return None
+    return DashaTimeline.from_rows({
+        level: [(start, end, lords) for lords, (start, end) in periods.items()]
+        for level, periods in rows.items()
+    })
+
+
+def _stamp(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _parse_dasha_tree(tree: Dict[str, Any], factors: Dict[str, Any], as_of: datetime) -> bool:
+    timeline = _build_timeline(tree)
+    if timeline is None:
+        return False
+    factors["dasha_timeline"] = timeline.to_dict()
+
+    active = timeline.active(as_of)
+    maha, antar, pratyantar = (active.get(level) for level in ("mahadasha", "antardasha", "pratyantar"))
+    if maha:
+        factors["current_mahadasha"] = maha.lord
+        factors["current_mahadasha_start"], factors["current_mahadasha_end"] = _stamp(maha.start), _stamp(maha.end)
+        previous = timeline.preceding("mahadasha", maha.start)
+        if previous:
+            factors["previous_mahadasha"] = previous.lord
+    if antar:
+        factors["current_antardasha"] = antar.lord
+        factors["current_antardasha_start"], factors["current_antardasha_end"] = _stamp(antar.start), _stamp(antar.end)
+    if pratyantar:
+        factors["current_pratyantara"] = pratyantar.lord
+        factors["current_pratyantara_end"] = _stamp(pratyantar.end)
+
+    next_antar = timeline.following("antardasha", as_of)
+    if next_antar:
+        factors["next_antardasha"] = next_antar.lord
+        factors["next_antardasha_start"] = _stamp(next_antar.start)
+    next_maha = timeline.following("mahadasha", as_of)
+    if next_maha:
+        factors["next_mahadasha"] = next_maha.lord
+        factors["next_mahadasha_start"] = _stamp(next_maha.start)
+
+    # Antardasha-level periods within +/-20 years (shape kept from the regex parser)
+    relevant = [period.as_dict(as_of) for period in timeline.within(20, as_of, level="antardasha")]
+    if relevant:
+        factors["dasha_periods_20yr"] = relevant
+        factors["total_periods_20yr"] = len(relevant)
+    return True
+
+
+__all__ = ["parse_chart_json", "ordinal", "SCHEMA_VERSION", "SIGNS", "SIGN_LORDS", "PLANETS"]
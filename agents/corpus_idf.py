@@ -0,0 +1,295 @@
+"""Corpus IDF statistics for passage reranking.
+
+An offline job counts document frequencies over the classical-text corpus
+and writes a compact term -> IDF table that
+:class:`agents.fast_reranker.FastReranker` uses instead of its length-based
+approximation (which makes long words important no matter how common they
+are in the texts). Terms are the reranker's own tokens, keyed by the same
+crc32 term ids as its passage term matrices.
+
+Input is one or more corpus exports: ``.jsonl`` files with one passage per
+line (``text`` / ``passage`` / ``content`` field, as the retrievers return
+them) or plain-text files (``.txt`` / ``.md``) chunked on blank lines.
+Directories are searched recursively. Each passage/chunk is one document.
+
+Table file layout (little-endian), memory-mapped at load::
+
+    b"ASTROIDF" | uint32 header length | JSON header | padding to 8 bytes
+    uint32[n_terms] sorted term ids | float32[n_terms] IDF values
+
+IDF is smoothed, ``ln((1 + N) / (1 + df)) + 1``. A term missing from the
+table gets ``default_idf`` (0.0): it occurs in no corpus passage, so it can
+match no candidate, and weighting it would only dilute the overlap of the
+query terms that can (question words such as "what" or "does" are the usual
+case).
+
+Usage::
+
+    python -m agents.corpus_idf build --input corpus_export.jsonl --out rerank_idf.bin
+    python -m agents.corpus_idf inspect --table rerank_idf.bin --terms venus house dasha
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from agents.fast_reranker import term_id, tokenize_terms
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ASTROIDF"
+FORMAT_VERSION = 1
+_TEXT_SUFFIXES = (".txt", ".md")
+
+
+def smoothed_idf(n_docs: int, df: np.ndarray) -> np.ndarray:
+    """Smoothed inverse document frequency, always > 0."""
+
+    return np.log((1.0 + n_docs) / (1.0 + np.asarray(df, dtype=np.float64))) + 1.0
+
+
+class CorpusIDF:
+    """Read-only term -> IDF table, sorted by term id for vectorized lookups."""
+
+    def __init__(self, terms: np.ndarray, idf: np.ndarray, meta: Dict[str, Any]):
+        self.terms = terms
+        self.idf = idf
+        self.meta = meta
+
+    @property
+    def corpus_version(self) -> str:
+        return self.meta.get("corpus_version", "")
+
+    @property
+    def n_docs(self) -> int:
+        return int(self.meta.get("n_docs", 0))
+
+    @property
+    def default_idf(self) -> float:
+        return float(self.meta.get("default_idf", 0.0))
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def lookup(self, term_ids: np.ndarray) -> np.ndarray:
+        """
+        IDF of each term id, ``default_idf`` for unknown terms
+
+        Args:
+            term_ids: uint32 term ids (agents.fast_reranker.term_id)
+
+        Returns:
+            float64 array of the same shape
+        """
+        term_ids = np.asarray(term_ids, dtype=np.uint32)
+        if not len(self.terms):
+            return np.full(term_ids.shape, self.default_idf)
+        positions = np.searchsorted(self.terms, term_ids).clip(max=len(self.terms) - 1)
+        found = self.terms[positions] == term_ids
+        return np.where(found, self.idf[positions], self.default_idf)
+
+    def idf_of(self, token: str) -> float:
+        return float(self.lookup(np.array([term_id(token)]))[0])
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: Iterable[str],
+        corpus_version: Optional[str] = None,
+    ) -> "CorpusIDF":
+        """
+        Count document frequencies over ``documents``
+
+        Args:
+            documents: Passage texts, one document each
+            corpus_version: Label stored in the table (default: content hash)
+
+        Returns:
+            CorpusIDF
+        """
+        digest = hashlib.sha256()
+        chunks: List[np.ndarray] = []
+        pending: List[int] = []
+        n_docs = 0
+        for text in documents:
+            digest.update(text.encode("utf-8"))
+            digest.update(b"\0")
+            pending.extend(term_id(token) for token in tokenize_terms(text))
+            n_docs += 1
+            if len(pending) >= 1_000_000:
+                chunks.append(np.array(pending, dtype=np.uint32))
+                pending = []
+        chunks.append(np.array(pending, dtype=np.uint32))
+
+        # Each document contributes a distinct-term set, so counts are document frequencies
+        terms, df = np.unique(np.concatenate(chunks), return_counts=True)
+        meta = {
+            "format": FORMAT_VERSION,
+            "corpus_version": corpus_version or digest.hexdigest()[:12],
+            "n_docs": n_docs,
+            "n_terms": int(len(terms)),
+            "default_idf": 0.0,
+            "built_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        }
+        return cls(terms.astype(np.uint32), smoothed_idf(n_docs, df).astype(np.float32), meta)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        header = json.dumps(self.meta, sort_keys=True).encode("utf-8")
+        prefix = MAGIC + struct.pack("<I", len(header)) + header
+        prefix += b"\0" * (-len(prefix) % 8)
+        with open(path, "wb") as handle:
+            handle.write(prefix)
+            handle.write(np.ascontiguousarray(self.terms, dtype="<u4").tobytes())
+            handle.write(np.ascontiguousarray(self.idf, dtype="<f4").tobytes())
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CorpusIDF":
+        """
+        Open a table written by :meth:`save`
+
+        Args:
+            path: Table file
+            mmap: Memory-map the arrays (pages are shared between forked workers)
+
+        Returns:
+            CorpusIDF
+        """
+        with open(path, "rb") as handle:
+            if handle.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a corpus IDF table")
+            (header_length,) = struct.unpack("<I", handle.read(4))
+            meta = json.loads(handle.read(header_length).decode("utf-8"))
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported table format {meta.get('format')}")
+
+        offset = len(MAGIC) + 4 + header_length
+        offset += -offset % 8
+        count = int(meta["n_terms"])
+        if mmap and count:
+            terms = np.memmap(path, dtype="<u4", mode="r", offset=offset, shape=(count,))
+            idf = np.memmap(path, dtype="<f4", mode="r", offset=offset + 4 * count, shape=(count,))
+        else:
+            with open(path, "rb") as handle:
+                handle.seek(offset)
+                terms = np.frombuffer(handle.read(4 * count), dtype="<u4")
+                idf = np.frombuffer(handle.read(4 * count), dtype="<f4")
+        logger.info(
+            f"✅ Corpus IDF table loaded from {path} "
+            f"(version {meta.get('corpus_version')}, {count} terms, {meta.get('n_docs')} docs)"
+        )
+        return cls(terms, idf, meta)
+
+
+# ----------------------------------------------------------------------
+# Corpus exports
+# ----------------------------------------------------------------------
+
+def _document_text(record: Any) -> str:
+    if isinstance(record, str):
+        return record
+    if isinstance(record, dict):
+        return record.get("text") or record.get("passage") or record.get("content") or ""
+    return ""
+
+
+def iter_documents(paths: Sequence[str]) -> Iterator[str]:
+    """Passage texts from JSONL / plain-text exports (directories searched recursively)."""
+
+    for raw in paths:
+        path = Path(raw)
+        files = sorted(
+            p for p in path.rglob("*") if p.suffix in (".jsonl", *_TEXT_SUFFIXES)
+        ) if path.is_dir() else [path]
+        for file in files:
+            with open(file, encoding="utf-8") as handle:
+                if file.suffix == ".jsonl":
+                    for line in handle:
+                        text = _document_text(json.loads(line)) if line.strip() else ""
+                        if text:
+                            yield text
+                else:
+                    for chunk in handle.read().split("\n\n"):
+                        if chunk.strip():
+                            yield chunk.strip()
+
+
+def _print_summary(table: CorpusIDF, tokens: Sequence[str]) -> None:
+    meta = table.meta
+    print(
+        f"version {table.corpus_version}: {meta['n_docs']} docs, {len(table)} terms "
+        f"(unknown terms {table.default_idf:.2f}, built {meta.get('built_at', '?')})"
+    )
+    if len(table):
+        idf = np.asarray(table.idf)
+        print(f"idf min/median/max: {idf.min():.2f} / {float(np.median(idf)):.2f} / {idf.max():.2f}")
+    for token in tokens:
+        if not tokenize_terms(token):
+            print(f"  {token:<20} (not a term: stopword or shorter than 3 chars)")
+            continue
+        for term in sorted(tokenize_terms(token)):
+            print(f"  {term:<20} idf {table.idf_of(term):.2f}   length heuristic {len(term) / 10.0:.2f}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build / inspect the corpus IDF table used for reranking")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Count document frequencies over corpus exports")
+    build.add_argument("--input", nargs="+", required=True, help="JSONL / text files or directories")
+    build.add_argument("--out", required=True)
+    build.add_argument("--corpus-version", help="Label stored in the table (default: content hash)")
+    build.add_argument("--terms", nargs="*", default=[], help="Terms to show after building")
+
+    inspect = sub.add_parser("inspect", help="Summarize a table")
+    inspect.add_argument("--table", required=True)
+    inspect.add_argument("--terms", nargs="*", default=[])
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        table = CorpusIDF.from_documents(iter_documents(args.input), args.corpus_version)
+        if not table.n_docs:
+            print(f"No documents found in {', '.join(args.input)}")
+            return 1
+        table.save(args.out)
+        size_kb = Path(args.out).stat().st_size / 1024
+        print(f"Built in {time.perf_counter() - start:.1f}s -> {args.out} ({size_kb:.0f} KB)")
+        _print_summary(table, args.terms)
+        return 0
+
+    start = time.perf_counter()
+    table = CorpusIDF.load(args.table)
+    print(f"Loaded in {(time.perf_counter() - start) * 1000:.1f}ms")
+    _print_summary(table, args.terms)
+    return 0
+
+
+__all__ = [
+    "CorpusIDF",
+    "iter_documents",
+    "smoothed_idf",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
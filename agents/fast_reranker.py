@@ -7,13 +7,58 @@ Author: Performance Optimization Team
 
 import numpy as np
 import logging
-import time
 import re
+import zlib
 from typing import List, Dict, Set, Any, Tuple, Optional
 
+from utils.tracing import span
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Private passage key holding the cached tokenization (see FastReranker._passage_terms)
+TERMS_KEY = "_rerank_terms"
+
+# Alphanumeric runs of 3+ chars == the [a-z0-9]+ tokens longer than 2
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]{3,}')
+_STOPWORDS = frozenset({'the', 'and', 'or', 'is', 'in', 'at', 'to', 'of', 'for', 'a', 'an'})
+_TERM_DTYPE = np.uint32
+
+
+class _TermIds(dict):
+    """Token -> hashed term id memo (crc32: stable across processes, unlike hash())"""
+
+    max_size = 100_000
+
+    def __missing__(self, token: str) -> int:
+        if len(self) >= self.max_size:
+            self.clear()
+        term_id = self[token] = zlib.crc32(token.encode("utf-8"))
+        return term_id
+
+
+_TERM_IDS = _TermIds()
+
+
+def tokenize_terms(text: str) -> Set[str]:
+    """
+    Distinct lowercase tokens used for overlap scoring and corpus IDF
+    
+    Args:
+        text: Input text
+    
+    Returns:
+        Set of alphanumeric tokens longer than 2 chars, minus stopwords
+    """
+    if not text:
+        return set()
+    return set(_TOKEN_PATTERN.findall(text.lower())) - _STOPWORDS
+
+
+def term_id(token: str) -> int:
+    """Hashed term id of a token (the key of passage term matrices and IDF tables)"""
+    return _TERM_IDS[token]
+
 
 class FastReranker:
     """
@@ -21,9 +66,12 @@ class FastReranker:
     
     Features:
     - Cosine distance scoring
-    - IDF-weighted token overlap
-    - Tag matching bonuses
+    - IDF-weighted token overlap (hashed sparse term matrix x query weights),
+      from corpus statistics when an IDF table is loaded
+    - Tag matching bonuses (passage x tag counts x query hits)
     - Length penalties
+    - Batch mode: several queries against one candidate set (rerank_many)
+    - Passage tokenizations cached on the passages
     - Sub-20ms execution time
     
     Replaces: LLM-based reranking (slow, expensive)
@@ -36,6 +84,7 @@ class FastReranker:
         tag_weight: float = 0.2,
         length_penalty_weight: float = 0.15,
         proximity_bonus: float = 0.2,
+        idf_table=None,
     ):
         """
         Initialize fast reranker
@@ -46,15 +95,19 @@ class FastReranker:
             tag_weight: Weight for tag matching (default: 0.2)
             length_penalty_weight: Weight for length penalty (default: 0.15)
             proximity_bonus: Bonus for very close matches (default: 0.2)
+            idf_table: Optional agents.corpus_idf.CorpusIDF with corpus statistics
+                (default: None = length-based approximation, longer words weigh more)
         """
         self.distance_weight = distance_weight
         self.idf_weight = idf_weight
         self.tag_weight = tag_weight
         self.length_penalty_weight = length_penalty_weight
         self.proximity_bonus = proximity_bonus
+        self.idf_table = idf_table
         
-        # IDF cache for common terms
-        self._idf_cache: Dict[str, float] = {}
+        # Passage tokenizations served from / written to the passage dicts
+        self._term_cache_hits = 0
+        self._term_cache_misses = 0
     
     def rerank(
         self,
@@ -75,84 +128,218 @@ class FastReranker:
         Returns:
             List of reranked passages (sorted by score, descending)
         """
-        start_time = time.time()
+        with span("rerank", passages=len(passages)) as stage:
+            if len(passages) <= 1:
+                reranked = list(passages)
+            else:
+                scores = self._score(passages, [query], [query_tokens])[:, 0]
+                reranked = []
+                for idx in self._top_indices(scores, top_k):
+                    passage = passages[idx]
+                    passage["rerank_score"] = float(scores[idx])
+                    passage["original_rank"] = idx
+                    reranked.append(passage)
         
-        if not passages:
+        logger.debug(
+            f"  ⚡ Fast rerank: {len(passages)} passages in {stage.duration_ms:.1f}ms "
+            f"(top_k={top_k or 'all'})"
+        )
+        
+        return reranked
+    
+    def rerank_many(
+        self,
+        queries: List[str],
+        passages: List[Dict[str, Any]],
+        top_k: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Rerank one candidate set against several queries in a single pass
+        
+        The passage term matrix, distances and length scores are built once
+        and shared; each query only adds a column to the score matrix.
+        
+        Args:
+            queries: Query strings
+            passages: Shared candidate passages
+            top_k: Return only top K passages per query (optional)
+        
+        Returns:
+            One ranked list per query. Entries are shallow copies carrying that
+            query's 'rerank_score' and 'original_rank', so the lists do not
+            overwrite each other's scores.
+        """
+        if not queries:
             return []
         
-        if len(passages) == 1:
-            return passages
-        
-        # Extract passage texts
-        texts = [
-            p.get("text") or p.get("passage") or p.get("content") or ""
-            for p in passages
-        ]
-        
-        # Tokenize query if not provided
-        if query_tokens is None:
-            query_tokens = self._tokenize(query)
-        
-        # Tokenize all passages (vectorized)
-        passage_token_sets = [self._tokenize(text) for text in texts]
-        
-        # Extract existing distances/scores (vectorized)
-        distances = np.array([
-            self._extract_distance(p)
-            for p in passages
-        ])
-        
-        # Calculate IDF overlap scores (vectorized)
-        idf_scores = np.array([
-            self._calculate_idf_overlap(query_tokens, p_tokens)
-            for p_tokens in passage_token_sets
-        ])
-        
-        # Calculate length penalties (vectorized)
-        lengths = np.array([len(text) for text in texts])
-        length_scores = self._calculate_length_penalties(lengths)
-        
-        # Calculate tag match bonuses (vectorized)
-        tag_scores = np.array([
-            self._calculate_tag_match(query, p.get("tags", []) or [])
-            for p in passages
-        ])
-        
-        # Proximity bonuses for very close matches
-        proximity_bonuses = (distances < 0.3).astype(float) * self.proximity_bonus
-        
-        # Combine all scores (vectorized)
-        final_scores = (
+        with span("rerank", passages=len(passages), queries=len(queries)) as stage:
+            if not passages:
+                results = [[] for _ in queries]
+            else:
+                scores = self._score(passages, queries, [None] * len(queries))
+                results = [
+                    [
+                        dict(passages[idx], rerank_score=float(scores[idx, column]), original_rank=idx)
+                        for idx in self._top_indices(scores[:, column], top_k)
+                    ]
+                    for column in range(len(queries))
+                ]
+        
+        logger.debug(
+            f"  ⚡ Fast rerank: {len(queries)} queries x {len(passages)} passages "
+            f"in {stage.duration_ms:.1f}ms (top_k={top_k or 'all'})"
+        )
+        
+        return results
+    
+    def _score(
+        self,
+        passages: List[Dict[str, Any]],
+        queries: List[str],
+        query_tokens: List[Optional[Set[str]]]
+    ) -> np.ndarray:
+        """
+        Final scores for every (passage, query) pair
+        
+        Args:
+            passages: Candidate passages
+            queries: Query strings
+            query_tokens: Pre-tokenized query per query (None = tokenize here)
+        
+        Returns:
+            Score matrix of shape (passages, queries)
+        """
+        distances = np.array([self._extract_distance(p) for p in passages])
+        lengths = np.array([len(self._passage_text(p)) for p in passages])
+        
+        # Query-independent part, shared by every column
+        base_scores = (
             self.distance_weight * (1.0 - distances) +
-            self.idf_weight * idf_scores +
-            self.tag_weight * tag_scores +
-            self.length_penalty_weight * length_scores +
-            proximity_bonuses
+            self.length_penalty_weight * self._calculate_length_penalties(lengths) +
+            (distances < 0.3).astype(float) * self.proximity_bonus
         )
         
-        # Sort by score (descending)
-        sorted_indices = np.argsort(-final_scores)
+        idf_scores = self._idf_overlap_scores(
+            self._term_matrix(passages),
+            len(passages),
+            [tokens if tokens is not None else self._tokenize(query) for query, tokens in zip(queries, query_tokens)]
+        )
+        tag_scores = self._tag_match_scores(passages, queries)
         
-        # Apply top_k filter
+        return base_scores[:, None] + self.idf_weight * idf_scores + self.tag_weight * tag_scores
+    
+    @staticmethod
+    def _top_indices(scores: np.ndarray, top_k: Optional[int]) -> List[int]:
+        # Stable sort keeps retrieval order among equal scores
+        order = np.argsort(-scores, kind="stable")
         if top_k:
-            sorted_indices = sorted_indices[:top_k]
+            order = order[:top_k]
+        return order.tolist()
+    
+    @staticmethod
+    def _passage_text(passage: Dict[str, Any]) -> str:
+        return passage.get("text") or passage.get("passage") or passage.get("content") or ""
+    
+    def _passage_terms(self, passage: Dict[str, Any]) -> np.ndarray:
+        """
+        Hashed term ids of a passage, cached on the passage itself
         
-        # Build reranked list
-        reranked = []
-        for idx in sorted_indices:
-            passage = passages[int(idx)]
-            passage["rerank_score"] = float(final_scores[idx])
-            passage["original_rank"] = int(idx)
-            reranked.append(passage)
+        The cache entry is keyed by a checksum of the text, so an edited
+        passage is re-tokenized. It is stored as a hex string, which keeps
+        the passage JSON-serializable for the Redis passage cache and stays
+        valid across processes (crc32, unlike ``hash()``, is not salted).
         
-        rerank_time_ms = (time.time() - start_time) * 1000
+        Args:
+            passage: Passage dict
         
-        logger.debug(
-            f"  ⚡ Fast rerank: {len(passages)} passages in {rerank_time_ms:.1f}ms "
-            f"(top_k={top_k or 'all'})"
-        )
+        Returns:
+            uint32 term ids, one per distinct token
+        """
+        text = self._passage_text(passage)
+        checksum = zlib.crc32(text.encode("utf-8"))
+        cached = passage.get(TERMS_KEY)
+        if isinstance(cached, list) and len(cached) == 2 and cached[0] == checksum:
+            self._term_cache_hits += 1
+            return np.frombuffer(bytes.fromhex(cached[1]), dtype=_TERM_DTYPE)
+        
+        self._term_cache_misses += 1
+        ids = np.fromiter(map(_TERM_IDS.__getitem__, self._tokenize(text)), dtype=_TERM_DTYPE)
+        passage[TERMS_KEY] = [checksum, ids.tobytes().hex()]
+        return ids
+    
+    def _term_matrix(self, passages: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sparse binary passage x term matrix of a candidate set, in COO form
         
-        return reranked
+        Args:
+            passages: Candidate passages
+        
+        Returns:
+            (term ids, owning passage row) arrays, one entry per nonzero
+        """
+        term_ids = [self._passage_terms(p) for p in passages]
+        rows = np.repeat(np.arange(len(passages)), [len(ids) for ids in term_ids])
+        return np.concatenate(term_ids), rows
+    
+    def _idf_overlap_scores(
+        self,
+        term_matrix: Tuple[np.ndarray, np.ndarray],
+        n_passages: int,
+        query_token_sets: List[Set[str]]
+    ) -> np.ndarray:
+        """
+        IDF-weighted query-term overlap for all passages and queries
+        
+        Term weights come from the corpus IDF table (terms it does not know
+        get its default_idf) or, without one, from a length-based approximation
+        (len(token) / 10). Scores are normalized by the query's total weight
+        and capped at 1.0. Only the columns of the query terms are
+        materialized, so the dense product is
+        (passages x query terms) @ (query terms x queries).
+        
+        Args:
+            term_matrix: Output of _term_matrix
+            n_passages: Number of passages (rows)
+            query_token_sets: Token set per query
+        
+        Returns:
+            Overlap matrix of shape (passages, queries), 0.0-1.0
+        """
+        term_ids, rows = term_matrix
+        query_terms: Dict[int, int] = {}
+        token_lengths: List[int] = []
+        for tokens in query_token_sets:
+            for token in tokens:
+                if _TERM_IDS[token] not in query_terms:
+                    query_terms[_TERM_IDS[token]] = len(query_terms)
+                    token_lengths.append(len(token))
+        if not query_terms or not len(term_ids):
+            return np.zeros((n_passages, len(query_token_sets)))
+        vocab = np.fromiter(query_terms, dtype=_TERM_DTYPE, count=len(query_terms))
+        
+        # Query weight matrix: (query terms, queries)
+        if self.idf_table is not None:
+            term_weights = self.idf_table.lookup(vocab)
+        else:
+            term_weights = np.array(token_lengths) / 10.0
+        weights = np.zeros((len(query_terms), len(query_token_sets)))
+        for column, tokens in enumerate(query_token_sets):
+            for token in tokens:
+                row = query_terms[_TERM_IDS[token]]
+                weights[row, column] = term_weights[row]
+        
+        # Project the sparse passage matrix onto the query-term columns
+        order = np.argsort(vocab)
+        positions = np.searchsorted(vocab[order], term_ids).clip(max=len(vocab) - 1)
+        hits = vocab[order][positions] == term_ids
+        presence = np.zeros((n_passages, len(vocab)))
+        presence[rows[hits], order[positions[hits]]] = 1.0
+        
+        max_idf = weights.sum(axis=0)
+        overlap = presence @ weights
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(max_idf > 0, overlap / max_idf, 0.0)
+        return np.minimum(scores, 1.0)
     
     def _extract_distance(self, passage: Dict[str, Any]) -> float:
         """
@@ -188,55 +375,7 @@ class FastReranker:
         Returns:
             Set of lowercase tokens (length > 2)
         """
-        if not text:
-            return set()
-        
-        # Extract alphanumeric tokens
-        tokens = re.findall(r'[a-z0-9]+', text.lower())
-        
-        # Filter out short tokens and stopwords
-        stopwords = {'the', 'and', 'or', 'is', 'in', 'at', 'to', 'of', 'for', 'a', 'an'}
-        
-        return {
-            token for token in tokens
-            if len(token) > 2 and token not in stopwords
-        }
-    
-    def _calculate_idf_overlap(
-        self,
-        query_tokens: Set[str],
-        passage_tokens: Set[str]
-    ) -> float:
-        """
-        Calculate IDF-weighted token overlap
-        
-        Args:
-            query_tokens: Query token set
-            passage_tokens: Passage token set
-        
-        Returns:
-            IDF overlap score (0.0-1.0)
-        """
-        if not query_tokens or not passage_tokens:
-            return 0.0
-        
-        # Find overlapping tokens
-        overlap = query_tokens & passage_tokens
-        
-        if not overlap:
-            return 0.0
-        
-        # Simple IDF approximation (longer words = higher weight)
-        # In production, use precomputed IDF from corpus
-        idf_sum = sum(len(token) / 10.0 for token in overlap)
-        
-        # Normalize by query length
-        max_idf = sum(len(token) / 10.0 for token in query_tokens)
-        
-        if max_idf == 0:
-            return 0.0
-        
-        return min(1.0, idf_sum / max_idf)
+        return tokenize_terms(text)
     
     def _calculate_length_penalties(self, lengths: np.ndarray) -> np.ndarray:
         """
@@ -262,39 +401,58 @@ class FastReranker:
         
         return np.clip(scores, 0.0, 1.0)
     
-    def _calculate_tag_match(
-        self,
-        query: str,
-        tags: List[str]
-    ) -> float:
+    def _tag_match_scores(self, passages: List[Dict[str, Any]], queries: List[str]) -> np.ndarray:
         """
-        Calculate tag matching bonus
+        Tag matching bonus for all passages and queries
+        
+        A tag matches when it appears in the query (substring, case-insensitive);
+        the score is matching tags / total tags, capped at 1.0.
         
         Args:
-            query: Query string
-            tags: List of passage tags
+            passages: Candidate passages (optional 'tags' list)
+            queries: Query strings
         
         Returns:
-            Tag match score (0.0-1.0)
+            Tag match matrix of shape (passages, queries), 0.0-1.0
         """
-        if not tags:
-            return 0.0
-        
-        query_lower = query.lower()
-        
-        # Count matching tags
-        matches = sum(
-            1 for tag in tags
-            if tag.lower() in query_lower
+        tag_lists = [p.get("tags", []) or [] for p in passages]
+        tag_index: Dict[str, int] = {}
+        rows: List[int] = []
+        columns: List[int] = []
+        for row, tags in enumerate(tag_lists):
+            for tag in tags:
+                rows.append(row)
+                columns.append(tag_index.setdefault(tag.lower(), len(tag_index)))
+        if not tag_index:
+            return np.zeros((len(passages), len(queries)))
+        
+        # Passage x tag counts (duplicate tags count twice, as in the total)
+        counts = np.zeros((len(passages), len(tag_index)))
+        np.add.at(counts, (np.array(rows), np.array(columns)), 1.0)
+        
+        # Tag x query hits: one substring test per distinct tag and query
+        queries_lower = [query.lower() for query in queries]
+        hits = np.array(
+            [[tag in query for query in queries_lower] for tag in tag_index],
+            dtype=float,
         )
         
-        # Normalize by total tags
-        return min(1.0, matches / len(tags))
+        totals = np.array([len(tags) for tags in tag_lists], dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(totals[:, None] > 0, (counts @ hits) / totals[:, None], 0.0)
+        return np.minimum(scores, 1.0)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get reranker statistics"""
         return {
-            "idf_cache_size": len(self._idf_cache),
+            "idf": (
+                {"corpus_version": self.idf_table.corpus_version, "terms": len(self.idf_table)}
+                if self.idf_table is not None else "length_heuristic"
+            ),
+            "term_cache": {
+                "hits": self._term_cache_hits,
+                "misses": self._term_cache_misses,
+            },
             "weights": {
                 "distance": self.distance_weight,
                 "idf": self.idf_weight,
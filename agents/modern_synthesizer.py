@@ -7,10 +7,10 @@ import json
 import logging
 import re
 from collections import OrderedDict
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from google import genai
-from google.genai import types
+from agents.prompt_budget import PromptBudget, PromptSection, get_mode_budget
+from utils.tracing import current_span, span
 
 
 logger = logging.getLogger(__name__)
@@ -42,6 +42,7 @@ class ModernSynthesizer:
         self._chart_section_cache_size = 128
         self._response_cache: OrderedDict[str, str] = OrderedDict()
         self._response_cache_size = 64
+        self._budget = PromptBudget()
 
     def synthesize_final_response(
         self,
@@ -54,6 +55,8 @@ class ModernSynthesizer:
         complexity: str = "SIMPLE",
         validated_knowledge: Optional[Dict] = None,
         mode: str = "draft",  # NEW: "draft" or "expand"
+        chart_fingerprint: Optional[str] = None,
+        question_focus: Optional[List[str]] = None,
     ) -> str:
         """
         Create the final response tailored to the requested complexity and mode.
@@ -78,40 +81,48 @@ class ModernSynthesizer:
             draft_temperature = self.temperature
             logger.info(f"📚 EXPAND MODE: max_tokens=6000 (includes thinking), temp={self.temperature}")
 
-        history_text = self._format_history(conversation_history)
-        chart_section = self._format_chart_section(chart_values, chart_focus, complexity)
-        selected_references = self._select_classical_passages(question, classical_knowledge, complexity)
-        references_section = self._format_classical(selected_references, complexity)
-
-        timing_instruction = ""
-        if self._is_timing_question(question):
-            timing_instruction = (
-                "- Prioritize Vimshottari Dasha timelines, cite specific start/end dates.\n"
-                "- Reference Jupiter/Saturn transits that activate the houses involved.\n"
+        with span("llm.prompt_build", mode=mode):
+            history_text = self._format_history(conversation_history, mode)
+            chart_section = self._format_chart_section(
+                chart_values, chart_focus, complexity, chart_fingerprint, niche_instruction
             )
+            selected_references = self._select_classical_passages(question, classical_knowledge, complexity)
+            references, reference_scores = self._format_classical(selected_references, complexity, mode)
+
+            timing_instruction = ""
+            if self._is_timing_question(question):
+                timing_instruction = (
+                    "- Prioritize Vimshottari Dasha timelines, cite specific start/end dates.\n"
+                    "- Reference Jupiter/Saturn transits that activate the houses involved.\n"
+                )
 
-        model_alias = self._model_alias(self.model_name)
-        prompt = self._build_prompt(
-            question=question,
-            niche_instruction=niche_instruction,
-            chart_section=chart_section,
-            references_section=references_section,
-            history_text=history_text,
-            timing_instruction=timing_instruction,
-            word_target=word_target,
-            model_alias=model_alias,
-            mode=mode,  # Pass mode to prompt builder
-        )
+            model_alias = self._model_alias(self.model_name)
+            prompt = self._build_prompt(
+                question=question,
+                niche_instruction=niche_instruction,
+                chart_section=chart_section,
+                references=references,
+                reference_scores=reference_scores,
+                history_text=history_text,
+                timing_instruction=timing_instruction,
+                word_target=word_target,
+                model_alias=model_alias,
+                mode=mode,  # Pass mode to prompt builder
+                question_focus=question_focus or [],
+            )
         
         # DIAGNOSTIC: Log prompt length to identify if it's consuming all tokens
         prompt_length = len(prompt)
-        estimated_tokens = prompt_length // 4  # Rough estimate: 4 chars per token
+        estimated_tokens = self._budget.estimator.count(prompt)
         logger.info(f"Prompt length: {prompt_length} chars (~{estimated_tokens} tokens), max_tokens: {draft_max_tokens}")
         if estimated_tokens > draft_max_tokens * 0.8:
             logger.warning(f"⚠️ Prompt consuming {estimated_tokens}/{draft_max_tokens} tokens! Only {draft_max_tokens - estimated_tokens} tokens left for response!")
 
         cached_response = self._response_cache_get(prompt)
         if cached_response is not None:
+            stage = current_span()
+            if stage:
+                stage.set_attribute("llm.cache_hit", True)
             return cached_response
 
         try:
@@ -138,11 +149,13 @@ class ModernSynthesizer:
                     question=question,
                     niche_instruction=niche_instruction,
                     chart_section=chart_section,
-                    references_section=references_section,
+                    references=references,
+                    reference_scores=reference_scores,
                     history_text=history_text,
                     timing_instruction=timing_instruction,
                     word_target=word_target,
                     model_alias=fallback_alias,
+                    question_focus=question_focus or [],
                 )
                 try:
                     generated = self._generate(fallback_prompt, fallback_model)
@@ -165,18 +178,21 @@ class ModernSynthesizer:
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None
     ) -> Optional[str]:
+        from google.genai import types
         if not model_name:
             return None
 
         try:
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=temperature if temperature is not None else self.temperature,
-                    max_output_tokens=max_tokens if max_tokens is not None else self.max_output_tokens,
-                ),
-            )
+            # Unary call: no first-byte timing, only the full request
+            with span("llm.request", kind="client", model=model_name):
+                response = self.client.models.generate_content(
+                    model=model_name,
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        temperature=temperature if temperature is not None else self.temperature,
+                        max_output_tokens=max_tokens if max_tokens is not None else self.max_output_tokens,
+                    ),
+                )
 
             response_text = self._extract_text(response)
             if not response_text:
@@ -195,28 +211,27 @@ class ModernSynthesizer:
         question: str,
         niche_instruction: str,
         chart_section: str,
-        references_section: str,
+        references: Sequence[str],
+        reference_scores: Sequence[float],
         history_text: str,
         timing_instruction: str,
         word_target: str,
         model_alias: str,
         mode: str = "draft",
+        question_focus: Sequence[str] = (),
     ) -> str:
-        references_text = references_section if references_section else "None provided for this question."
-        history_block = history_text if history_text else "None"
-        
-        # OPTIMIZATION: Aggressively truncate for draft mode to reduce prompt tokens
-        if mode == "draft":
-            # Truncate classical references to 400 chars (save ~150 tokens)
-            if len(references_text) > 400:
-                references_text = references_text[:400] + "\n...(truncated for speed)"
-            # Truncate chart section to 800 chars (save ~200 tokens)
-            if len(chart_section) > 800:
-                chart_section = chart_section[:800] + "\n...(truncated for speed)"
-            # Truncate niche instruction to 300 chars
-            if len(niche_instruction) > 300:
-                niche_instruction = niche_instruction[:300] + "..."
-            logger.debug("Draft mode: Truncated prompt sections to save tokens")
+        # Pack per-question sections into the mode's token budget; the chart and
+        # niche text stay whole. Cuts land on sentence/line boundaries.
+        packed = self._budget.pack(
+            [
+                PromptSection("references", list(references), scores=list(reference_scores)),
+                PromptSection("history", [history_text]),
+            ],
+            mode,
+        )
+        chart_section = chart_section or "No chart values"
+        references_text = packed["references"] or "None provided for this question."
+        history_block = packed["history"] or "None"
         
         # Detect question type for tailored instructions
         question_lower = question.lower()
@@ -288,11 +303,15 @@ class ModernSynthesizer:
 
         instructions_text = "\n".join(instructions)
 
+        focus_block = ""
+        if question_focus:
+            focus_block = "\n**Chart Focus for This Question:**\n" + "\n".join(f"- {line}" for line in question_focus) + "\n"
+
         return f"""You are a master Vedic astrologer using {model_alias}. Answer this question with precision and depth.
 
 **User's Question:**
 {question}
-
+{focus_block}
 **Niche Context:**
 {niche_instruction}
 
@@ -354,11 +373,20 @@ class ModernSynthesizer:
         
         return text.strip()
     
-    def _format_chart_section(self, values: Dict, chart_focus: Optional[List[str]], complexity: str) -> str:
+    def _format_chart_section(
+        self,
+        values: Dict,
+        chart_focus: Optional[List[str]],
+        complexity: str,
+        chart_fingerprint: Optional[str] = None,
+        niche_instruction: str = "",
+    ) -> str:
         """
         Format chart factors with intelligent grouping by chart type (D1, D9, D10, Dashas, etc.)
         """
-        cache_key = self._chart_section_cache_key(chart_focus, values, complexity)
+        cache_key = self._chart_section_cache_key(
+            chart_focus, values, complexity, chart_fingerprint, niche_instruction
+        )
         cached = self._chart_section_cache_get(cache_key)
         if cached is not None:
             return cached
@@ -415,7 +443,7 @@ class ModernSynthesizer:
         for index, (key, value) in enumerate(values.items()):
             if index >= max_items:
                 break
-            if not value:
+            if not value or key == "dasha_timeline":  # Index data, not prompt material
                 continue
             lines.append(f"- {key}: {value}")
         result = "\n".join(lines)
@@ -427,7 +455,16 @@ class ModernSynthesizer:
         chart_focus: Optional[List[str]],
         values: Optional[Dict],
         complexity: str,
+        chart_fingerprint: Optional[str] = None,
+        niche_instruction: str = "",
     ) -> str:
+        if chart_fingerprint:
+            niche_digest = self._hash_text(niche_instruction or "")[:12]
+            if chart_focus:
+                # The focus is per question (timing questions put dasha lines first), so key on its content
+                focus_digest = self._hash_text("\n".join(chart_focus))[:16]
+                return f"{chart_fingerprint}:{complexity}:{niche_digest}:focus:{focus_digest}"
+            return f"{chart_fingerprint}:{complexity}:{niche_digest}:values"
         payload = {"complexity": complexity}
         if chart_focus:
             payload["focus"] = chart_focus
@@ -481,7 +518,7 @@ class ModernSynthesizer:
         question: str,
         knowledge: Optional[List[Dict]],
         complexity: str,
-    ) -> List[Dict]:
+    ) -> List[Tuple[Dict, float]]:
         if not knowledge:
             return []
 
@@ -524,28 +561,42 @@ class ModernSynthesizer:
             fingerprints.add(fingerprint)
 
         ranked.sort(key=lambda entry: (-entry[0], entry[1]))
-        return [entry[2] for entry in ranked[:top_k]]
+        return [(entry[2], entry[0]) for entry in ranked[:top_k]]
 
-    def _format_classical(self, knowledge: Optional[List[Dict]], complexity: str) -> str:
+    def _format_classical(
+        self,
+        knowledge: Optional[Sequence[Tuple[Dict, float]]],
+        complexity: str,
+        mode: str = "expand",
+    ) -> Tuple[List[str], List[float]]:
+        """Format classical references, one entry per passage, most relevant first.
+
+        Passages are cut at the last sentence that fits the per-passage token
+        budget; a first sentence that alone is over budget is cut at a word
+        boundary. Returns the entries and their selection scores, which the
+        prompt packer ranks them by.
+        """
         if not knowledge:
-            return ""
+            return [], []
 
-        # For SIMPLE love/timing questions, include at least 3 passages
         limit = {"SIMPLE": 3, "MODERATE": 6, "COMPLEX": 8}.get(complexity.upper(), 6)
-        truncated = knowledge[:limit]
+        budgets = get_mode_budget(mode)
 
         formatted: List[str] = []
-        for item in truncated:
+        scores: List[float] = []
+        for item, score in knowledge[:limit]:
             passage = str(item.get("passage", "")).strip()
-            if not passage:
+            insight = self._budget.trim(" ".join(passage.split()), budgets["passage"], partial=True)
+            if not insight:
                 continue
             source = item.get("source") or item.get("factor", "Classical Reference")
-            query = item.get("query", "")
+            query = self._budget.trim(" ".join(str(item.get("query", "")).split()), budgets["query"], partial=True)
             formatted.append(
-                f"- Source: {source}\n  Insight: {passage[:220]}{'...' if len(passage) > 220 else ''}\n  Query: {query[:120]}"
+                f"- Source: {source}\n  Insight: {insight}\n  Query: {query}"
             )
+            scores.append(score)
 
-        return "\n".join(formatted)
+        return formatted, scores
 
     def _token_set(self, text: str) -> set[str]:
         if not text:
@@ -578,15 +629,16 @@ Would you like me to focus on a specific aspect? Please ask a more targeted ques
 ⚠️ **Note:** This is a fallback response. For best results, ensure chart data is complete.
 """
 
-    @staticmethod
-    def _format_history(history: Optional[List[Dict]]) -> str:
+    def _format_history(self, history: Optional[List[Dict]], mode: str = "expand") -> str:
+        """Format conversation history (last two exchanges, each message trimmed to its token budget)."""
         if not history:
             return ""
+        budget = get_mode_budget(mode)["history_message"]
         snippets = []
         for exchange in history[-2:]:
-            message = exchange.get("user_message") or ""
-            reply = exchange.get("assistant_response") or ""
-            snippets.append(f"- Q: {message[:80]}\n  A: {reply[:80]}")
+            message = self._budget.trim(" ".join((exchange.get("user_message") or "").split()), budget, partial=True)
+            reply = self._budget.trim(" ".join((exchange.get("assistant_response") or "").split()), budget, partial=True)
+            snippets.append(f"- Q: {message}\n  A: {reply}")
         return "\n".join(snippets)
 
     @staticmethod
@@ -6,10 +6,15 @@ import hashlib
 import json
 import logging
 import re
+import threading
 from collections import OrderedDict
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from agents.prompt_budget import PromptBudget, PromptSection, get_mode_budget
+from utils.tracing import current_span, span
 
 
 logger = logging.getLogger(__name__)
@@ -23,6 +28,8 @@ class OpenRouterSynthesizer:
         "MODERATE": "400-500 words",
         "COMPLEX": "600-800 words",
     }
+    # Chart values listed when no chart view is supplied (the full COMPLEX-track view)
+    CHART_VALUES_LIMIT = 150
 
     def __init__(
         self,
@@ -30,17 +37,37 @@ class OpenRouterSynthesizer:
         model_name: str = "openai/gpt-4.1-mini",
         temperature: float = 0.6,
         max_output_tokens: int = 2000,
+        api_base: str = "https://openrouter.ai/api/v1",
     ) -> None:
         self.api_key = api_key
         self.model_name = model_name
         self.temperature = temperature
         self.max_output_tokens = max_output_tokens
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        # Any OpenAI-compatible endpoint (benchmarks point this at a local stand-in)
+        self.api_base = api_base.rstrip("/")
+        self.base_url = f"{self.api_base}/chat/completions"
+        self.warmup_url = f"{self.api_base}/auth/key"
+
+        # Pooled keep-alive connections: only the first call pays DNS + TCP + TLS
+        self._http = requests.Session()
+        self._http.mount(self.api_base, HTTPAdapter(pool_connections=1, pool_maxsize=16))
         
         self._chart_section_cache: OrderedDict[str, str] = OrderedDict()
         self._chart_section_cache_size = 128
         self._response_cache: OrderedDict[str, str] = OrderedDict()
         self._response_cache_size = 64
+        self._budget = PromptBudget()
+
+        # Provider-reported token usage; cached_tokens is the reused prompt prefix
+        self._usage_lock = threading.Lock()
+        self._local = threading.local()
+        self.usage_stats = {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+        }
 
     def synthesize_final_response(
         self,
@@ -53,14 +80,22 @@ class OpenRouterSynthesizer:
         complexity: str = "SIMPLE",
         validated_knowledge: Optional[Dict] = None,
         mode: str = "draft",
+        chart_fingerprint: Optional[str] = None,
+        question_focus: Optional[List[str]] = None,
     ) -> str:
         """
         Create final response using GPT-4.1 Mini via OpenRouter.
         
         - mode="draft": Fast 300-400 token response (1-2s)
         - mode="expand": Full detailed response (3-5s)
+
+        ``chart_focus`` is the session's chart view and goes into the cached
+        system prefix, so it must not change between questions of a session.
+        ``question_focus`` holds chart lines resolved for this question only
+        (e.g. the running dasha for timing questions); they go into the user message.
         """
 
+        self._local.last_usage = {}
         complexity = complexity.upper()
         word_target = self.WORD_TARGETS.get(complexity, self.WORD_TARGETS["MODERATE"])
         
@@ -76,58 +111,75 @@ class OpenRouterSynthesizer:
             temperature = self.temperature
             logger.info(f"📚 EXPAND MODE: max_tokens=1500 (GPT-4.1 Mini), temp={self.temperature}")
 
-        history_text = self._format_history(conversation_history)
-        chart_section = self._format_chart_section(chart_values, chart_focus, complexity)
-        selected_references = self._select_classical_passages(question, classical_knowledge, complexity)
-        references_section = self._format_classical(selected_references, complexity)
-
-        timing_instruction = ""
-        if self._is_timing_question(question):
-            timing_instruction = (
-                "- Prioritize Vimshottari Dasha timelines, cite specific start/end dates.\n"
-                "- Reference Jupiter/Saturn transits that activate the houses involved.\n"
+        with span("llm.prompt_build", mode=mode):
+            history_text = self._format_history(conversation_history, mode)
+            chart_section = self._format_chart_section(
+                chart_values, chart_focus, chart_fingerprint, niche_instruction
+            )
+            selected_references = self._select_classical_passages(question, classical_knowledge, complexity)
+            references, reference_scores = self._format_classical(selected_references, complexity, mode)
+
+            timing_instruction = ""
+            if self._is_timing_question(question):
+                timing_instruction = (
+                    "- Prioritize Vimshottari Dasha timelines, cite specific start/end dates.\n"
+                    "- Reference Jupiter/Saturn transits that activate the houses involved.\n"
+                )
+
+            messages = self._build_prompt(
+                question=question,
+                niche_instruction=niche_instruction,
+                chart_section=chart_section,
+                question_focus=question_focus or [],
+                references=references,
+                reference_scores=reference_scores,
+                history_text=history_text,
+                timing_instruction=timing_instruction,
+                word_target=word_target,
+                mode=mode,
             )
-
-        prompt = self._build_prompt(
-            question=question,
-            niche_instruction=niche_instruction,
-            chart_section=chart_section,
-            references_section=references_section,
-            history_text=history_text,
-            timing_instruction=timing_instruction,
-            word_target=word_target,
-            mode=mode,
-        )
         
         # Diagnostic logging
-        prompt_length = len(prompt)
-        estimated_tokens = prompt_length // 4
-        logger.info(f"Prompt length: {prompt_length} chars (~{estimated_tokens} tokens), max_tokens: {max_tokens}")
+        prefix_length = len(messages[0]["content"])
+        prompt_length = sum(len(message["content"]) for message in messages)
+        estimated_tokens = sum(self._budget.estimator.count(message["content"]) for message in messages)
+        logger.info(
+            f"Prompt length: {prompt_length} chars (~{estimated_tokens} tokens, "
+            f"stable prefix {prefix_length} chars), max_tokens: {max_tokens}"
+        )
 
-        cached_response = self._response_cache_get(prompt)
+        prompt_key = self._messages_cache_text(messages)
+        cached_response = self._response_cache_get(prompt_key)
         if cached_response is not None:
             logger.info("Cache hit! Returning cached response")
+            stage = current_span()
+            if stage:
+                stage.set_attribute("llm.cache_hit", True)
             return cached_response
 
         try:
             generated = self._generate(
-                prompt,
+                messages,
                 max_tokens=max_tokens,
                 temperature=temperature
             )
             if generated:
-                self._response_cache_set(prompt, generated)
+                usage = self.get_last_usage()
+                if usage:
+                    # Keep the fallback estimator calibrated against real prompt sizes
+                    self._budget.estimator.observe(prompt_length, usage["prompt_tokens"])
+                self._response_cache_set(prompt_key, generated)
                 return generated
         except Exception as exc:
             logger.error("OpenRouter synthesis error: %s", exc, exc_info=True)
 
         fallback = self._get_fallback_response(question, chart_values)
-        self._response_cache_set(prompt, fallback)
+        self._response_cache_set(prompt_key, fallback)
         return fallback
 
     def _generate(
         self,
-        prompt: str,
+        messages: List[Dict[str, str]],
         max_tokens: int,
         temperature: float
     ) -> Optional[str]:
@@ -143,12 +195,7 @@ class OpenRouterSynthesizer:
 
             payload = {
                 "model": self.model_name,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                "messages": messages,
                 "temperature": temperature,
                 "max_tokens": max_tokens,
                 "top_p": 0.95,
@@ -156,15 +203,18 @@ class OpenRouterSynthesizer:
 
             logger.info(f"Calling OpenRouter API with model={self.model_name}, max_tokens={max_tokens}")
             
-            response = requests.post(
-                url=self.base_url,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-
-            response.raise_for_status()
-            result = response.json()
+            with span("llm.request", kind="client", model=self.model_name, max_tokens=max_tokens) as request:
+                response = self._http.post(
+                    url=self.base_url,
+                    headers=headers,
+                    json=payload,
+                    timeout=30
+                )
+                # Non-streaming: headers arrive when generation is done, so this is the real first byte
+                request.set_attribute("llm.first_byte_ms", response.elapsed.total_seconds() * 1000)
+                request.set_attribute("http.status_code", response.status_code)
+                response.raise_for_status()
+                result = response.json()
 
             if "error" in result:
                 logger.error("OpenRouter API error: %s", result["error"])
@@ -181,11 +231,16 @@ class OpenRouterSynthesizer:
                 return None
 
             # Log token usage
-            usage = result.get("usage", {})
+            usage = self._record_usage(result.get("usage") or {})
+            request.set_attributes(
+                prompt_tokens=usage["prompt_tokens"],
+                cached_tokens=usage["cached_tokens"],
+                completion_tokens=usage["completion_tokens"],
+            )
             logger.info(
-                f"Tokens used: input={usage.get('prompt_tokens', 0)}, "
-                f"output={usage.get('completion_tokens', 0)}, "
-                f"total={usage.get('total_tokens', 0)}"
+                f"Tokens used: input={usage['prompt_tokens']} (cached={usage['cached_tokens']}), "
+                f"output={usage['completion_tokens']}, "
+                f"total={usage['total_tokens']}"
             )
 
             final_text = self._post_process(message_content)
@@ -198,32 +253,59 @@ class OpenRouterSynthesizer:
             logger.error("Error in _generate: %s", e, exc_info=True)
             return None
 
+    def warm_up(self, timeout: float = 10.0) -> int:
+        """
+        Open a pooled connection to OpenRouter without spending tokens
+
+        Args:
+            timeout (float): Request timeout in seconds
+
+        Returns:
+            int: HTTP status of the key-info call
+        """
+        response = self._http.get(
+            self.warmup_url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return response.status_code
+
     def _build_prompt(
         self,
         *,
         question: str,
         niche_instruction: str,
         chart_section: str,
-        references_section: str,
+        question_focus: Sequence[str],
+        references: Sequence[str],
+        reference_scores: Sequence[float],
         history_text: str,
         timing_instruction: str,
         word_target: str,
         mode: str = "draft",
-    ) -> str:
-        """Build prompt for GPT-4.1 Mini."""
-        
-        references_text = references_section if references_section else "None provided for this question."
-        history_block = history_text if history_text else "None"
+    ) -> List[Dict[str, str]]:
+        """Build chat messages for GPT-4.1 Mini.
+
+        The system message carries only content that is stable for a session
+        (persona, rules, niche instruction, the session's chart view) and is
+        identical in draft and expand mode, so providers can reuse its cached
+        prefix on every follow-up turn. Everything that varies per question
+        goes into the trailing user message.
+        """
         
-        # Aggressive truncation for draft mode
-        if mode == "draft":
-            if len(references_text) > 400:
-                references_text = references_text[:400] + "\n...(truncated for speed)"
-            if len(chart_section) > 800:
-                chart_section = chart_section[:800] + "\n...(truncated for speed)"
-            if len(niche_instruction) > 300:
-                niche_instruction = niche_instruction[:300] + "..."
-            logger.debug("Draft mode: Truncated prompt sections")
+        # Only per-question sections are packed into the mode's token budget; the
+        # chart and niche text stay whole so the system prefix is byte-identical.
+        packed = self._budget.pack(
+            [
+                PromptSection("references", list(references), scores=list(reference_scores)),
+                PromptSection("history", [history_text]),
+            ],
+            mode,
+        )
+        chart_section = chart_section or "No chart values"
+        references_text = packed["references"] or "None provided for this question."
+        history_block = packed["history"] or "None"
         
         # Detect question type
         question_lower = question.lower()
@@ -237,7 +319,6 @@ class OpenRouterSynthesizer:
             instructions = [
                 f"- Produce {word_target}. Use 4-6 BULLET POINTS with clear insights.",
                 "- Structure: 🔮 Quick Answer (2-3 sentences) + 4-6 key bullets + 📝 Summary (1-2 sentences).",
-                "- CRITICAL: Base your analysis ONLY on the specific chart factors provided below.",
                 "- Be CONCISE but SPECIFIC. Provide actionable insights, not generic statements.",
                 "- Each bullet should give one concrete detail with astrological reasoning.",
                 "- Target: 300-400 words total for completeness.",
@@ -245,7 +326,6 @@ class OpenRouterSynthesizer:
         else:
             instructions = [
                 f"- Produce {word_target}. Structure: 🔮 Quick Answer (2-3 sentences), detailed analysis, 📝 Summary, 💡 Follow-ups.",
-                "- CRITICAL: Base your analysis ONLY on the specific chart factors provided below. Do NOT make up placements.",
                 "- Pull explicit placements from the chart data (e.g., '7th lord Jupiter in Aquarius').",
                 "- When classical references are provided, cite them inline (e.g., 'BPHS states...').",
                 "- Use a warm, conversational tone while maintaining expertise.",
@@ -281,28 +361,34 @@ class OpenRouterSynthesizer:
                 "- Mention challenges and how to navigate them.",
             ])
 
-        instructions.extend([
-            "- If chart data is insufficient for a specific point, provide the best possible answer based on available information, then acknowledge what additional data would help.",
-            "- Avoid generic statements; be specific to THIS chart.",
-            "- Use emojis sparingly (only for section headers).",
-        ])
-
         if timing_instruction:
             instructions.extend(line.strip() for line in timing_instruction.strip().splitlines() if line.strip())
 
         instructions_text = "\n".join(instructions)
 
-        return f"""You are a master Vedic astrologer. Answer this question with precision and depth.
+        # Stable prefix: must not contain anything that changes between questions
+        system_message = f"""You are a master Vedic astrologer. Answer the user's questions with precision and depth.
 
-**User's Question:**
-{question}
+**Rules:**
+- CRITICAL: Base your analysis ONLY on the specific chart factors provided below. Do NOT make up placements.
+- If chart data is insufficient for a specific point, provide the best possible answer based on available information, then acknowledge what additional data would help.
+- Avoid generic statements; be specific to THIS chart.
+- Use emojis sparingly (only for section headers).
 
 **Niche Context:**
 {niche_instruction}
 
 **Chart Data:**
 {chart_section}
+"""
 
+        focus_block = ""
+        if question_focus:
+            focus_block = "\n**Chart Focus for This Question:**\n" + "\n".join(f"- {line}" for line in question_focus) + "\n"
+
+        user_message = f"""**User's Question:**
+{question}
+{focus_block}
 **Classical References:**
 {references_text}
 
@@ -315,6 +401,42 @@ class OpenRouterSynthesizer:
 **Response:**
 """
 
+        return [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message},
+        ]
+
+    def _record_usage(self, usage: Dict[str, Any]) -> Dict[str, int]:
+        """Normalize the provider ``usage`` block and add it to the running totals."""
+
+        details = usage.get("prompt_tokens_details") or {}
+        cached_tokens = details.get("cached_tokens", usage.get("cached_tokens", 0))
+        normalized = {
+            "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+            "cached_tokens": int(cached_tokens or 0),
+            "completion_tokens": int(usage.get("completion_tokens") or 0),
+            "total_tokens": int(usage.get("total_tokens") or 0),
+        }
+
+        with self._usage_lock:
+            self.usage_stats["calls"] += 1
+            for key, value in normalized.items():
+                self.usage_stats[key] += value
+        self._local.last_usage = normalized
+        return normalized
+
+    def get_last_usage(self) -> Dict[str, int]:
+        """Token usage of the last synthesis on the calling thread (empty on cache hit/failure)."""
+        return dict(getattr(self._local, "last_usage", None) or {})
+
+    def get_usage_stats(self) -> Dict[str, Any]:
+        """Cumulative token usage including the share of prompt tokens served from the provider cache."""
+        with self._usage_lock:
+            stats = dict(self.usage_stats)
+        prompt_tokens = stats["prompt_tokens"]
+        stats["cached_prompt_ratio"] = stats["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0
+        return stats
+
     def _post_process(self, text: str) -> str:
         """Clean up response formatting."""
         if text is None:
@@ -331,9 +453,17 @@ class OpenRouterSynthesizer:
         
         return text.strip()
 
-    def _format_chart_section(self, values: Dict, chart_focus: Optional[List[str]], complexity: str) -> str:
-        """Format chart factors intelligently."""
-        cache_key = self._chart_section_cache_key(chart_focus, values, complexity)
+    def _format_chart_section(
+        self,
+        values: Dict,
+        chart_focus: Optional[List[str]],
+        chart_fingerprint: Optional[str] = None,
+        niche_instruction: str = "",
+    ) -> str:
+        """Format chart factors intelligently (independent of complexity: it is the cached prefix)."""
+        cache_key = self._chart_section_cache_key(
+            chart_focus, values, chart_fingerprint, niche_instruction
+        )
         cached = self._chart_section_cache_get(cache_key)
         if cached is not None:
             return cached
@@ -382,20 +512,32 @@ class OpenRouterSynthesizer:
             self._chart_section_cache_set(cache_key, result)
             return result
         
-        max_items = {"SIMPLE": 50, "MODERATE": 80, "COMPLEX": 150}.get(complexity.upper(), 50)
         lines = []
         for index, (key, value) in enumerate(values.items()):
-            if index >= max_items:
+            if index >= self.CHART_VALUES_LIMIT:
                 break
-            if not value:
+            if not value or key == "dasha_timeline":  # Index data, not prompt material
                 continue
             lines.append(f"- {key}: {value}")
         result = "\n".join(lines)
         self._chart_section_cache_set(cache_key, result)
         return result
 
-    def _chart_section_cache_key(self, chart_focus: Optional[List[str]], values: Optional[Dict], complexity: str) -> str:
-        payload = {"complexity": complexity}
+    def _chart_section_cache_key(
+        self,
+        chart_focus: Optional[List[str]],
+        values: Optional[Dict],
+        chart_fingerprint: Optional[str] = None,
+        niche_instruction: str = "",
+    ) -> str:
+        if chart_fingerprint:
+            niche_digest = self._hash_text(niche_instruction or "")[:12]
+            if chart_focus:
+                # Key on the view's content as well, so a recompiled view is never served stale
+                focus_digest = self._hash_text("\n".join(chart_focus))[:16]
+                return f"{chart_fingerprint}:{niche_digest}:focus:{focus_digest}"
+            return f"{chart_fingerprint}:{niche_digest}:values"
+        payload: Dict[str, Any] = {}
         if chart_focus:
             payload["focus"] = chart_focus
         elif values:
@@ -431,6 +573,10 @@ class OpenRouterSynthesizer:
         while len(self._response_cache) > self._response_cache_size:
             self._response_cache.popitem(last=False)
 
+    @staticmethod
+    def _messages_cache_text(messages: List[Dict[str, str]]) -> str:
+        return "\n\x1e".join(f"{message['role']}:{message['content']}" for message in messages)
+
     def _hash_text(self, text: str) -> str:
         return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
@@ -448,8 +594,8 @@ class OpenRouterSynthesizer:
         question: str,
         knowledge: Optional[List[Dict]],
         complexity: str,
-    ) -> List[Dict]:
-        """Select top classical passages for this question."""
+    ) -> List[Tuple[Dict, float]]:
+        """Select top classical passages for this question, most relevant first, with their scores."""
         if not knowledge:
             return []
 
@@ -492,28 +638,42 @@ class OpenRouterSynthesizer:
             fingerprints.add(fingerprint)
 
         ranked.sort(key=lambda entry: (-entry[0], entry[1]))
-        return [entry[2] for entry in ranked[:top_k]]
+        return [(entry[2], entry[0]) for entry in ranked[:top_k]]
 
-    def _format_classical(self, knowledge: Optional[List[Dict]], complexity: str) -> str:
-        """Format classical references."""
+    def _format_classical(
+        self,
+        knowledge: Optional[Sequence[Tuple[Dict, float]]],
+        complexity: str,
+        mode: str = "expand",
+    ) -> Tuple[List[str], List[float]]:
+        """Format classical references, one entry per passage, most relevant first.
+
+        Passages are cut at the last sentence that fits the per-passage token
+        budget; a first sentence that alone is over budget is cut at a word
+        boundary. Returns the entries and their selection scores, which the
+        prompt packer ranks them by.
+        """
         if not knowledge:
-            return ""
+            return [], []
 
         limit = {"SIMPLE": 3, "MODERATE": 6, "COMPLEX": 8}.get(complexity.upper(), 6)
-        truncated = knowledge[:limit]
+        budgets = get_mode_budget(mode)
 
         formatted: List[str] = []
-        for item in truncated:
+        scores: List[float] = []
+        for item, score in knowledge[:limit]:
             passage = str(item.get("passage", "")).strip()
-            if not passage:
+            insight = self._budget.trim(" ".join(passage.split()), budgets["passage"], partial=True)
+            if not insight:
                 continue
             source = item.get("source") or item.get("factor", "Classical Reference")
-            query = item.get("query", "")
+            query = self._budget.trim(" ".join(str(item.get("query", "")).split()), budgets["query"], partial=True)
             formatted.append(
-                f"- Source: {source}\n  Insight: {passage[:220]}{'...' if len(passage) > 220 else ''}\n  Query: {query[:120]}"
+                f"- Source: {source}\n  Insight: {insight}\n  Query: {query}"
             )
+            scores.append(score)
 
-        return "\n".join(formatted)
+        return formatted, scores
 
     def _token_set(self, text: str) -> set[str]:
         """Extract token set from text."""
@@ -547,16 +707,16 @@ Would you like me to focus on a specific aspect? Please ask a more targeted ques
 ⚠️ **Note:** This is a fallback response. For best results, ensure chart data is complete.
 """
 
-    @staticmethod
-    def _format_history(history: Optional[List[Dict]]) -> str:
-        """Format conversation history."""
+    def _format_history(self, history: Optional[List[Dict]], mode: str = "expand") -> str:
+        """Format conversation history (last two exchanges, each message trimmed to its token budget)."""
         if not history:
             return ""
+        budget = get_mode_budget(mode)["history_message"]
         snippets = []
         for exchange in history[-2:]:
-            message = exchange.get("user_message") or ""
-            reply = exchange.get("assistant_response") or ""
-            snippets.append(f"- Q: {message[:80]}\n  A: {reply[:80]}")
+            message = self._budget.trim(" ".join((exchange.get("user_message") or "").split()), budget, partial=True)
+            reply = self._budget.trim(" ".join((exchange.get("assistant_response") or "").split()), budget, partial=True)
+            snippets.append(f"- Q: {message}\n  A: {reply}")
         return "\n".join(snippets)
 
     @staticmethod
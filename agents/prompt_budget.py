@@ -0,0 +1,285 @@
+"""Token-budgeted prompt assembly for the synthesizers.
+
+Per-question prompt sections (classical references, conversation history)
+are packed by priority and marginal relevance until a per-mode token budget
+is reached. Cuts always land on sentence or line boundaries so the model
+never receives a half sentence it cannot use. The chart view and niche
+instruction are not packed: they form the session-stable prompt prefix,
+which has to be identical in draft and expand mode to be served from the
+provider's prompt cache.
+
+Token counts come from ``tiktoken`` when it is installed and its encoding
+has loaded (in the background, never on the startup path); otherwise a
+characters-per-token estimator is used that can be calibrated from the
+provider's reported ``prompt_tokens``.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:  # Optional: exact counts for OpenAI-family models
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+
+# Token budgets per mode. ``total`` bounds the sum of all packed sections,
+# the per-section values cap how much of it a single section may take.
+# ``passage``, ``query`` and ``history_message`` cap single items before packing.
+MODE_BUDGETS: Dict[str, Dict[str, int]] = {
+    "draft": {
+        "total": 280,
+        "references": 200,
+        "history": 80,
+        "passage": 60,
+        "query": 30,
+        "history_message": 20,
+    },
+    "expand": {
+        "total": 1300,
+        "references": 1100,
+        "history": 250,
+        "passage": 140,
+        "query": 30,
+        "history_message": 60,
+    },
+}
+
+# Lower value = packed first
+SECTION_PRIORITY = {
+    "references": 0,
+    "history": 1,
+}
+
+# A segment is a run of text ending in sentence punctuation or a newline
+_SEGMENT_PATTERN = re.compile(r"[^\n]*?(?:[.!?]+(?=\s|$)|\n|$)")
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def get_mode_budget(mode: str) -> Dict[str, int]:
+    """Return the token budget table for ``mode`` (defaults to expand)."""
+    return MODE_BUDGETS.get(mode, MODE_BUDGETS["expand"])
+
+
+class TokenEstimator:
+    """Counts tokens with ``tiktoken`` or a calibrated chars-per-token ratio.
+
+    The encoding is loaded in a background thread on first use, because
+    ``tiktoken`` downloads the BPE file unless it is already in
+    ``TIKTOKEN_CACHE_DIR`` (the Docker image bakes it in). Until it is ready,
+    or if it cannot be loaded, counts come from the chars-per-token ratio.
+    """
+
+    def __init__(self, encoding_name: str = "o200k_base", chars_per_token: float = 4.0) -> None:
+        self.encoding_name = encoding_name
+        self.chars_per_token = chars_per_token
+        self._lock = threading.Lock()
+        self._encoding = None
+        self._loading = tiktoken is None  # Nothing to load without tiktoken
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        """Number of tokens in ``text``."""
+        if not text:
+            return 0
+        if self._encoding is None and not self._loading:
+            self._start_loading()
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return max(1, int(round(len(text) / self.chars_per_token)))
+
+    def _start_loading(self) -> None:
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._load_encoding, name="tiktoken-load", daemon=True).start()
+
+    def _load_encoding(self) -> None:
+        try:
+            self._encoding = tiktoken.get_encoding(self.encoding_name)
+        except Exception as exc:  # pragma: no cover - encoding download may fail offline
+            logger.warning(f"⚠️ tiktoken encoding unavailable, using estimator: {exc}")
+
+    def observe(self, char_count: int, prompt_tokens: int, weight: float = 0.2) -> None:
+        """Calibrate the chars-per-token ratio from a provider-reported prompt size.
+
+        Args:
+            char_count: Characters sent in the prompt
+            prompt_tokens: ``usage.prompt_tokens`` reported for that prompt
+            weight: Exponential moving average weight of the new observation
+        """
+        if self._encoding is not None or char_count <= 0 or prompt_tokens <= 0:
+            return
+        observed = char_count / prompt_tokens
+        with self._lock:
+            self.chars_per_token = (1.0 - weight) * self.chars_per_token + weight * observed
+
+
+def split_segments(text: str) -> List[str]:
+    """Split text into sentence/line segments that concatenate back to ``text``."""
+    return [segment for segment in _SEGMENT_PATTERN.findall(text) if segment]
+
+
+def truncate_to_tokens(text: str, budget: int, estimator: TokenEstimator) -> str:
+    """Keep the longest prefix of whole words that fits in ``budget`` tokens, marked with an ellipsis."""
+    if not text or budget <= 0:
+        return ""
+    if estimator.count(text) <= budget:
+        return text
+
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimator.count(" ".join(words[:middle]) + " …") <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + " …" if low else ""
+
+
+def trim_to_tokens(text: str, budget: int, estimator: TokenEstimator, partial: bool = False) -> str:
+    """Keep the longest prefix of whole sentences/lines that fits in ``budget`` tokens.
+
+    Returns an empty string when not even the first sentence fits, unless
+    ``partial`` is set: then that sentence is cut at a word boundary instead.
+    """
+    if not text or budget <= 0:
+        return ""
+    if estimator.count(text) <= budget:
+        return text
+
+    kept: List[str] = []
+    used = 0
+    for segment in split_segments(text):
+        cost = estimator.count(segment)
+        if used + cost > budget:
+            break
+        kept.append(segment)
+        used += cost
+    if not kept and partial:
+        return truncate_to_tokens(text, budget, estimator)
+    return "".join(kept).rstrip()
+
+
+@dataclass
+class PromptSection:
+    """One variable part of the prompt.
+
+    Attributes:
+        name: Section key (``references``, ``history``)
+        items: Independent units that can be kept or dropped (e.g. one reference each)
+        scores: Relevance per item; defaults to the item order (first = most relevant)
+        joiner: Separator used when re-assembling the kept items
+    """
+
+    name: str
+    items: List[str]
+    scores: Optional[List[float]] = None
+    joiner: str = "\n"
+    priority: int = field(default=-1)
+
+    def __post_init__(self) -> None:
+        if self.priority < 0:
+            self.priority = SECTION_PRIORITY.get(self.name, len(SECTION_PRIORITY))
+
+
+class PromptBudget:
+    """Packs prompt sections into a per-mode token budget."""
+
+    def __init__(self, estimator: Optional[TokenEstimator] = None, redundancy_penalty: float = 0.5) -> None:
+        self.estimator = estimator or TokenEstimator()
+        self.redundancy_penalty = redundancy_penalty
+
+    def trim(self, text: str, budget: int, partial: bool = False) -> str:
+        return trim_to_tokens(text, budget, self.estimator, partial)
+
+    def pack(self, sections: Sequence[PromptSection], mode: str) -> Dict[str, str]:
+        """Pack ``sections`` into the budget for ``mode``.
+
+        Sections are filled in priority order, each up to its own cap and the
+        remaining total. Within a section, items are chosen greedily by
+        marginal relevance (score minus overlap with already chosen items);
+        an item that does not fit whole is trimmed at a sentence boundary.
+        Kept items are emitted in their original order.
+
+        Returns:
+            Mapping of section name to packed text ("" if nothing fit)
+        """
+        budgets = get_mode_budget(mode)
+        remaining = budgets["total"]
+        packed: Dict[str, str] = {}
+
+        for section in sorted(sections, key=lambda s: s.priority):
+            section_budget = min(remaining, budgets.get(section.name, remaining))
+            text, used = self._pack_section(section, section_budget)
+            packed[section.name] = text
+            remaining -= used
+
+        return packed
+
+    def _pack_section(self, section: PromptSection, budget: int) -> Tuple[str, int]:
+        scores = section.scores or [1.0 / (rank + 1) for rank in range(len(section.items))]
+        kept = [(item, score) for item, score in zip(section.items, scores) if item and item.strip()]
+        if not kept or budget <= 0:
+            return "", 0
+        items = [item for item, _ in kept]
+        scores = [score for _, score in kept]
+
+        joiner_cost = self.estimator.count(section.joiner) if section.joiner.strip() else 0
+        whole = section.joiner.join(items)
+        whole_cost = self.estimator.count(whole)
+        if whole_cost <= budget:
+            return whole, whole_cost
+
+        words = [set(_WORD_PATTERN.findall(item.lower())) for item in items]
+        chosen: Dict[int, str] = {}
+        chosen_words: List[set] = []
+        used = 0
+        candidates = set(range(len(items)))
+
+        while candidates and used < budget:
+            best_index = max(
+                candidates,
+                key=lambda i: (scores[i] - self.redundancy_penalty * self._max_overlap(words[i], chosen_words), -i),
+            )
+            candidates.discard(best_index)
+
+            available = budget - used - (joiner_cost if chosen else 0)
+            text = trim_to_tokens(items[best_index], available, self.estimator)
+            if not text:
+                continue
+            chosen[best_index] = text
+            chosen_words.append(words[best_index])
+            used += self.estimator.count(text) + (joiner_cost if len(chosen) > 1 else 0)
+
+        return section.joiner.join(chosen[i] for i in sorted(chosen)), used
+
+    @staticmethod
+    def _max_overlap(item_words: set, chosen_words: List[set]) -> float:
+        if not item_words or not chosen_words:
+            return 0.0
+        return max((len(item_words & other) / len(item_words | other) for other in chosen_words if other), default=0.0)
+
+
+__all__ = [
+    "MODE_BUDGETS",
+    "PromptBudget",
+    "PromptSection",
+    "TokenEstimator",
+    "get_mode_budget",
+    "split_segments",
+    "trim_to_tokens",
+    "truncate_to_tokens",
+]
@@ -12,7 +12,7 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import Dict, Iterable, Optional
+from typing import Dict, Iterable, List, Optional, Pattern
 
 
 @dataclass
@@ -25,6 +25,30 @@ class ClassificationResult:
     reasoning: str
 
 
+def _compile_rules(
+    complex_patterns: Dict[str, Iterable[str]],
+    simple_patterns: Dict[str, Iterable[str]],
+    timing_hints: Iterable[str],
+) -> Pattern[str]:
+    """Combine every rule into one ordered alternation of lookaheads.
+
+    Branch ``N`` is ``(?=[\\s\\S]*?(?P<rN>...))`` and succeeds exactly when
+    ``re.search`` would find one of rule ``N``'s patterns anywhere in the text.
+    Alternation tries branches left to right, so a single ``match`` call stops
+    at the first rule that fires - the same precedence and early exit as
+    checking complex rules, then simple rules, then timing hints.
+    """
+
+    groups = [list(patterns) for patterns in complex_patterns.values()]
+    groups += [list(patterns) for patterns in simple_patterns.values()]
+    groups.append(list(timing_hints))
+    branches = [
+        f"(?=[\\s\\S]*?(?P<r{index}>{'|'.join(f'(?:{p})' for p in patterns)}))"
+        for index, patterns in enumerate(groups)
+    ]
+    return re.compile("|".join(branches))
+
+
 class QuestionComplexityClassifier:
     """Fast heuristic classifier for routing questions to the right path."""
 
@@ -77,6 +101,38 @@ class QuestionComplexityClassifier:
         r"\btransit\b",
     ]
 
+    # (complexity, intent, confidence, reasoning) in precedence order: complex
+    # patterns pre-empt simple ones, timing hints only matter for the default.
+    _RULES = (
+        [("COMPLEX", intent, 0.9, f"Matched complex pattern: {intent}") for intent in _COMPLEX_PATTERNS]
+        + [("SIMPLE", intent, 0.85, f"Matched simple pattern: {intent}") for intent in _SIMPLE_PATTERNS]
+    )
+
+    _COMBINED = _compile_rules(_COMPLEX_PATTERNS, _SIMPLE_PATTERNS, _TIMING_HINTS)
+    _RULE_BY_GROUP = {f"r{index}": rule for index, rule in enumerate(_RULES)}
+    _TIMING_GROUP = f"r{len(_RULES)}"
+
+    def __init__(
+        self,
+        routing_model=None,
+        routing_threshold: float = 0.8,
+        complex_threshold: float = 0.9,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        routing_model: Optional[agents.routing_model.RoutingModel]
+            Offline-trained model consulted before the regex rules.
+        routing_threshold: float
+            Minimum model confidence to accept its decision.
+        complex_threshold: float
+            Stricter bar for COMPLEX, the most expensive track to mis-route to.
+        """
+
+        self.routing_model = routing_model
+        self.routing_threshold = routing_threshold
+        self.complex_threshold = complex_threshold
+
     def classify(self, question: str) -> ClassificationResult:
         """Classify question complexity in under a millisecond.
 
@@ -90,16 +146,58 @@ class QuestionComplexityClassifier:
         if not normalized:
             return ClassificationResult("SIMPLE", "general", 0.5, "Empty question defaults to SIMPLE")
 
-        # Check for complex patterns first – they should pre-empt simple rules.
-        for intent, patterns in self._COMPLEX_PATTERNS.items():
-            if any(re.search(pattern, normalized) for pattern in patterns):
-                return ClassificationResult("COMPLEX", intent, 0.9, f"Matched complex pattern: {intent}")
+        if self.routing_model is not None:
+            routed = self._from_model(self.routing_model.predict(normalized))
+            if routed is not None:
+                return routed
+
+        return self._classify_rules(normalized)
 
-        # Simple patterns next – majority traffic should match these.
-        for intent, patterns in self._SIMPLE_PATTERNS.items():
-            if any(re.search(pattern, normalized) for pattern in patterns):
-                return ClassificationResult("SIMPLE", intent, 0.85, f"Matched simple pattern: {intent}")
+    def _classify_rules(self, normalized: str) -> ClassificationResult:
+        """Regex rules; ``normalized`` is the stripped, lower-cased question."""
+
+        # One scan stops at the first rule that fires
+        match = self._COMBINED.match(normalized)
+        winner = match.lastgroup if match else None
+        rule = self._RULE_BY_GROUP.get(winner)
+        if rule is not None:
+            return ClassificationResult(*rule)
 
         # Default to MODERATE when heuristics don't provide a clear answer.
-        intent = "timing" if any(re.search(pat, normalized) for pat in self._TIMING_HINTS) else "general"
+        intent = "timing" if winner == self._TIMING_GROUP else "general"
         return ClassificationResult("MODERATE", intent, 0.7, "Defaulted to MODERATE based on keywords")
+
+    def classify_many(self, questions: Iterable[str]) -> List[ClassificationResult]:
+        """Classify a batch of questions; repeated questions are scanned once and
+        the routing model (if any) scores the whole batch in one call."""
+
+        questions = list(questions)
+        normalized = {question: question.strip().lower() for question in questions}
+        results: Dict[str, ClassificationResult] = {}
+
+        if self.routing_model is not None:
+            pending = [question for question, text in normalized.items() if text]
+            predictions = self.routing_model.predict_many([normalized[question] for question in pending])
+            for question, prediction in zip(pending, predictions):
+                routed = self._from_model(prediction)
+                if routed is not None:
+                    results[question] = routed
+
+        for question, text in normalized.items():
+            if question not in results:
+                results[question] = self._classify_rules(text) if text else self.classify(question)
+        return [results[question] for question in questions]
+
+    def _from_model(self, prediction) -> Optional[ClassificationResult]:
+        """Accept a routing-model prediction only above its confidence bar."""
+
+        threshold = self.complex_threshold if prediction.complexity == "COMPLEX" else self.routing_threshold
+        if prediction.complexity_confidence < threshold:
+            return None
+        return ClassificationResult(
+            prediction.complexity,
+            prediction.intent,
+            round(prediction.complexity_confidence, 3),
+            f"Routing model ({prediction.complexity_confidence:.2f} >= {threshold:.2f})",
+        )
+
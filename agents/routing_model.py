@@ -0,0 +1,486 @@
+"""Offline-trained routing model for question complexity and intent.
+
+A hashed word/character n-gram featurizer feeds two multinomial logistic
+regression heads (complexity and intent) implemented in NumPy. The model is
+trained from logged questions and plugs into
+:class:`agents.question_complexity.QuestionComplexityClassifier`, which only
+trusts it above a confidence threshold and otherwise falls back to the regex
+rules.
+
+Training data is JSONL. The API writes it when ``ROUTING_LOG_PATH`` is set:
+one record per routed question, plus an outcome event when the user asks
+for the expanded answer::
+
+    {"record_id": "<session>:3", "question": "...", "complexity": "SIMPLE",
+     "intent": "appearance", "passages_used": 5, "passage_limit": 5, "latency_ms": 2140}
+    {"record_id": "<session>:3", "expanded": true}
+
+The training label is the observed outcome, never the routed ``complexity``
+alone (that would only teach the model to copy the current router); see
+:func:`observed_label`. A reviewed ``label`` field wins when present.
+Records with no outcome at all are skipped. ``latency_ms`` is optional and
+only used for the cost report.
+
+Usage::
+
+    python -m agents.routing_model train --data routing_log.jsonl --out router.npz
+    python -m agents.routing_model eval --data holdout.jsonl --model router.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COMPLEXITIES = ("SIMPLE", "MODERATE", "COMPLEX")
+
+# Retrieval work each track triggers (mirrors SmartOrchestrator._COMPLEXITY_CONFIG)
+ROUTE_COSTS = {
+    "SIMPLE": {"queries": 2, "passages": 5, "chart_lines": 50},
+    "MODERATE": {"queries": 3, "passages": 10, "chart_lines": 80},
+    "COMPLEX": {"queries": 6, "passages": 30, "chart_lines": 150},
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+_LOG_LOCK = threading.Lock()
+
+
+@dataclass
+class RoutingPrediction:
+    """Model output for a single question."""
+
+    complexity: str
+    complexity_confidence: float
+    intent: str
+    intent_confidence: float
+
+
+class RoutingModel:
+    """Hashed n-gram logistic regression with complexity and intent heads."""
+
+    def __init__(
+        self,
+        n_features: int = 1 << 18,
+        complexities: Sequence[str] = COMPLEXITIES,
+        intents: Sequence[str] = ("general",),
+    ) -> None:
+        self.n_features = n_features
+        self.complexities = list(complexities)
+        self.intents = list(intents)
+        self.complexity_weights = np.zeros((n_features, len(self.complexities)), dtype=np.float32)
+        self.complexity_bias = np.zeros(len(self.complexities), dtype=np.float32)
+        self.intent_weights = np.zeros((n_features, len(self.intents)), dtype=np.float32)
+        self.intent_bias = np.zeros(len(self.intents), dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    # Features
+    # ------------------------------------------------------------------
+
+    def featurize(self, text: str) -> np.ndarray:
+        """Hashed indices of word 1-2 grams, in-word char 3-grams and a length bucket."""
+
+        tokens = _TOKEN_PATTERN.findall(text.strip().lower())
+        grams = [f"w:{token}" for token in tokens]
+        grams += [f"b:{left} {right}" for left, right in zip(tokens, tokens[1:])]
+        for token in tokens:
+            padded = f"<{token}>"
+            grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        # Always present, so no document has an empty feature set
+        grams.append(f"len:{min(len(tokens) // 5, 6)}")
+        indices = {zlib.crc32(gram.encode("utf-8")) % self.n_features for gram in grams}
+        return np.fromiter(indices, dtype=np.int64, count=len(indices))
+
+    def _batch(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        rows = [self.featurize(text) for text in texts]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=offsets[1:])
+        return np.concatenate(rows), offsets
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        shifted = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(shifted)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    @staticmethod
+    def _logits(weights: np.ndarray, bias: np.ndarray, indices: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(weights[indices], offsets[:-1], axis=0) + bias
+
+    # ------------------------------------------------------------------
+    # Training / inference
+    # ------------------------------------------------------------------
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        complexities: Sequence[str],
+        intents: Optional[Sequence[str]] = None,
+        epochs: int = 20,
+        learning_rate: float = 0.5,
+        l2: float = 1e-6,
+        batch_size: int = 128,
+        seed: int = 0,
+    ) -> "RoutingModel":
+        """Train both heads with mini-batch SGD on the softmax cross-entropy."""
+
+        if intents is not None:
+            self.intents = sorted(set(intents) | {"general"})
+            self.intent_weights = np.zeros((self.n_features, len(self.intents)), dtype=np.float32)
+            self.intent_bias = np.zeros(len(self.intents), dtype=np.float32)
+
+        features = [self.featurize(text) for text in texts]
+        complexity_targets = np.array([self.complexities.index(label) for label in complexities])
+        intent_targets = (
+            np.array([self.intents.index(label) for label in intents]) if intents is not None else None
+        )
+
+        rng = np.random.default_rng(seed)
+        order = np.arange(len(features))
+        for _ in range(epochs):
+            rng.shuffle(order)
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                rows = [features[i] for i in batch]
+                offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+                np.cumsum([len(row) for row in rows], out=offsets[1:])
+                indices = np.concatenate(rows)
+                counts = np.diff(offsets)
+
+                self._sgd_step(
+                    self.complexity_weights, self.complexity_bias,
+                    indices, offsets, counts, complexity_targets[batch], learning_rate, l2,
+                )
+                if intent_targets is not None:
+                    self._sgd_step(
+                        self.intent_weights, self.intent_bias,
+                        indices, offsets, counts, intent_targets[batch], learning_rate, l2,
+                    )
+        return self
+
+    def _sgd_step(
+        self,
+        weights: np.ndarray,
+        bias: np.ndarray,
+        indices: np.ndarray,
+        offsets: np.ndarray,
+        counts: np.ndarray,
+        targets: np.ndarray,
+        learning_rate: float,
+        l2: float,
+    ) -> None:
+        probabilities = self._softmax(self._logits(weights, bias, indices, offsets))
+        probabilities[np.arange(len(targets)), targets] -= 1.0
+        delta = probabilities / len(targets)
+        touched = np.unique(indices)
+        weights[touched] *= 1.0 - learning_rate * l2
+        np.add.at(weights, indices, -learning_rate * np.repeat(delta, counts, axis=0))
+        bias -= learning_rate * delta.sum(axis=0)
+
+    def predict_many(self, texts: Sequence[str]) -> List[RoutingPrediction]:
+        """Predict complexity and intent for a batch of questions."""
+
+        if not texts:
+            return []
+        indices, offsets = self._batch(texts)
+        complexity_probs = self._softmax(self._logits(self.complexity_weights, self.complexity_bias, indices, offsets))
+        intent_probs = self._softmax(self._logits(self.intent_weights, self.intent_bias, indices, offsets))
+        complexity_best = complexity_probs.argmax(axis=1)
+        intent_best = intent_probs.argmax(axis=1)
+        return [
+            RoutingPrediction(
+                complexity=self.complexities[c],
+                complexity_confidence=float(complexity_probs[row, c]),
+                intent=self.intents[i],
+                intent_confidence=float(intent_probs[row, i]),
+            )
+            for row, (c, i) in enumerate(zip(complexity_best, intent_best))
+        ]
+
+    def predict(self, text: str) -> RoutingPrediction:
+        return self.predict_many([text])[0]
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            complexity_weights=self.complexity_weights,
+            complexity_bias=self.complexity_bias,
+            intent_weights=self.intent_weights,
+            intent_bias=self.intent_bias,
+            meta=np.array(json.dumps({
+                "n_features": self.n_features,
+                "complexities": self.complexities,
+                "intents": self.intents,
+            })),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RoutingModel":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            model = cls(meta["n_features"], meta["complexities"], meta["intents"])
+            model.complexity_weights = data["complexity_weights"]
+            model.complexity_bias = data["complexity_bias"]
+            model.intent_weights = data["intent_weights"]
+            model.intent_bias = data["intent_bias"]
+        logger.info(f"✅ Routing model loaded from {path} ({len(model.intents)} intents)")
+        return model
+
+
+# ----------------------------------------------------------------------
+# Routing log
+# ----------------------------------------------------------------------
+
+def append_routing_log(path: str, record: Dict[str, Any]) -> None:
+    """Append one routed question to the JSONL training log."""
+
+    line = json.dumps(record, ensure_ascii=False)
+    with _LOG_LOCK, open(path, "a", encoding="utf-8") as handle:
+        handle.write(line + "\n")
+
+
+def observed_label(record: Dict[str, Any]) -> Optional[str]:
+    """
+    Complexity a logged question should have been routed to, from its outcome
+
+    A reviewed ``label`` wins. Otherwise the routed track is corrected by what
+    was observed:
+    * the user asked for the expanded answer -> one track deeper
+    * retrieval filled the track's passage_limit -> one track deeper
+      (more relevant context existed than the track allowed)
+    * the passages fit a cheaper track's limit -> the cheapest such track
+    * otherwise the routed track is confirmed
+
+    Args:
+        record: Logged question merged with its outcome events
+
+    Returns:
+        Label, or None when the record carries no outcome (nothing to learn from)
+    """
+    reviewed = str(record.get("label") or "").upper()
+    if reviewed in COMPLEXITIES:
+        return reviewed
+
+    routed = str(record.get("complexity") or "").upper()
+    if routed not in COMPLEXITIES:
+        return None
+    rank = COMPLEXITIES.index(routed)
+    deeper = COMPLEXITIES[min(rank + 1, len(COMPLEXITIES) - 1)]
+    if record.get("expanded"):
+        return deeper
+
+    passages_used, passage_limit = record.get("passages_used"), record.get("passage_limit")
+    if passages_used is None or not passage_limit:
+        return None
+    if passages_used >= passage_limit:
+        return deeper
+    for cheaper in COMPLEXITIES[:rank]:
+        if passages_used <= ROUTE_COSTS[cheaper]["passages"]:
+            return cheaper
+    return routed
+
+
+def load_routing_log(path: str) -> List[Dict[str, Any]]:
+    """Read training records: logged questions merged with their outcome events, labelled by :func:`observed_label`."""
+
+    questions: List[Dict[str, Any]] = []
+    events: Dict[str, Dict[str, Any]] = {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("question"):
+                questions.append(record)
+            elif record.get("record_id"):
+                events.setdefault(record["record_id"], {}).update(record)
+
+    records = []
+    for record in questions:
+        record.update(events.get(record.get("record_id"), {}))
+        label = observed_label(record)
+        if label is None:
+            continue
+        record["label"] = label
+        record["intent"] = record.get("intent") or "general"
+        records.append(record)
+    if len(records) < len(questions):
+        logger.info(f"Skipped {len(questions) - len(records)} logged questions without an observed outcome")
+    return records
+
+
+# ----------------------------------------------------------------------
+# Evaluation
+# ----------------------------------------------------------------------
+
+def _route_cost(labels: Iterable[str]) -> Dict[str, float]:
+    labels = list(labels)
+    totals = {key: 0.0 for key in ROUTE_COSTS["SIMPLE"]}
+    for label in labels:
+        for key, value in ROUTE_COSTS[label].items():
+            totals[key] += value
+    return {key: value / max(1, len(labels)) for key, value in totals.items()}
+
+
+def evaluate(
+    records: Sequence[Dict[str, Any]],
+    model: RoutingModel,
+    threshold: float = 0.8,
+    complex_threshold: float = 0.9,
+) -> Dict[str, Any]:
+    """Compare regex, model-only and thresholded hybrid routing on labelled records."""
+
+    from agents.question_complexity import QuestionComplexityClassifier
+
+    questions = [record["question"] for record in records]
+    gold = [record["label"] for record in records]
+
+    regex = QuestionComplexityClassifier()
+    hybrid = QuestionComplexityClassifier(
+        routing_model=model, routing_threshold=threshold, complex_threshold=complex_threshold
+    )
+
+    routers = {
+        "regex": lambda: [regex.classify(q).complexity for q in questions],
+        "model": lambda: [p.complexity for p in model.predict_many(questions)],
+        "hybrid": lambda: [hybrid.classify(q).complexity for q in questions],
+    }
+
+    observed_latency: Dict[str, List[float]] = {}
+    for record in records:
+        if isinstance(record.get("latency_ms"), (int, float)):
+            observed_latency.setdefault(record["label"], []).append(float(record["latency_ms"]))
+    track_latency = {label: float(np.mean(values)) for label, values in observed_latency.items()}
+
+    report: Dict[str, Any] = {"records": len(records), "gold_cost": _route_cost(gold), "routers": {}}
+    for name, route in routers.items():
+        start = time.perf_counter()
+        predicted = route()
+        elapsed_us = (time.perf_counter() - start) / max(1, len(questions)) * 1e6
+
+        confusion = {g: {p: 0 for p in COMPLEXITIES} for g in COMPLEXITIES}
+        for g, p in zip(gold, predicted):
+            confusion[g][p] += 1
+        over_complex = sum(1 for g, p in zip(gold, predicted) if p == "COMPLEX" and g != "COMPLEX")
+
+        entry = {
+            "accuracy": sum(g == p for g, p in zip(gold, predicted)) / max(1, len(gold)),
+            "over_routed_to_complex": over_complex / max(1, len(gold)),
+            "classify_us": elapsed_us,
+            "cost_per_question": _route_cost(predicted),
+            "confusion": confusion,
+        }
+        if track_latency:
+            entry["est_latency_ms"] = float(np.mean([track_latency.get(p, 0.0) for p in predicted]))
+        report["routers"][name] = entry
+    return report
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"Records: {report['records']}")
+    gold = report["gold_cost"]
+    print(f"Gold routing cost/question: {gold['queries']:.2f} queries, {gold['passages']:.1f} passages, "
+          f"{gold['chart_lines']:.0f} chart lines")
+    header = f"{'router':<8}{'acc':>8}{'→COMPLEX✗':>11}{'queries':>9}{'passages':>10}{'chart':>8}{'µs':>8}"
+    if any("est_latency_ms" in entry for entry in report["routers"].values()):
+        header += f"{'est ms':>9}"
+    print(header)
+    for name, entry in report["routers"].items():
+        cost = entry["cost_per_question"]
+        line = (f"{name:<8}{entry['accuracy']:>8.3f}{entry['over_routed_to_complex']:>11.3f}"
+                f"{cost['queries']:>9.2f}{cost['passages']:>10.1f}{cost['chart_lines']:>8.0f}"
+                f"{entry['classify_us']:>8.1f}")
+        if "est_latency_ms" in entry:
+            line += f"{entry['est_latency_ms']:>9.0f}"
+        print(line)
+    for name, entry in report["routers"].items():
+        print(f"\nConfusion ({name}), rows=gold, cols=predicted:")
+        print(" " * 10 + "".join(f"{label:>10}" for label in COMPLEXITIES))
+        for gold_label, row in entry["confusion"].items():
+            print(f"{gold_label:<10}" + "".join(f"{row[label]:>10}" for label in COMPLEXITIES))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Train / evaluate the question routing model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="Train from a JSONL routing log")
+    train.add_argument("--data", required=True)
+    train.add_argument("--out", required=True)
+    train.add_argument("--epochs", type=int, default=20)
+    train.add_argument("--learning-rate", type=float, default=0.5)
+    train.add_argument("--holdout", type=float, default=0.2, help="Fraction held out for the report")
+    train.add_argument("--seed", type=int, default=0)
+
+    evaluate_cmd = sub.add_parser("eval", help="Evaluate a trained model")
+    evaluate_cmd.add_argument("--data", required=True)
+    evaluate_cmd.add_argument("--model", required=True)
+
+    for command in (train, evaluate_cmd):
+        command.add_argument("--threshold", type=float, default=0.8)
+        command.add_argument("--complex-threshold", type=float, default=0.9)
+
+    args = parser.parse_args(argv)
+    records = load_routing_log(args.data)
+    if not records:
+        print(f"No labelled records in {args.data}")
+        return 1
+
+    if args.command == "train":
+        rng = np.random.default_rng(args.seed)
+        order = rng.permutation(len(records))
+        cut = int(len(records) * (1.0 - args.holdout)) if args.holdout > 0 else len(records)
+        train_records = [records[i] for i in order[:cut]]
+        holdout_records = [records[i] for i in order[cut:]]
+
+        start = time.perf_counter()
+        model = RoutingModel().fit(
+            [r["question"] for r in train_records],
+            [r["label"] for r in train_records],
+            [r["intent"] for r in train_records],
+            epochs=args.epochs,
+            learning_rate=args.learning_rate,
+            seed=args.seed,
+        )
+        print(f"Trained on {len(train_records)} records in {time.perf_counter() - start:.1f}s")
+        model.save(args.out)
+        print(f"Saved model to {args.out}")
+        if holdout_records:
+            _print_report(evaluate(holdout_records, model, args.threshold, args.complex_threshold))
+        return 0
+
+    model = RoutingModel.load(args.model)
+    _print_report(evaluate(records, model, args.threshold, args.complex_threshold))
+    return 0
+
+
+__all__ = [
+    "COMPLEXITIES",
+    "ROUTE_COSTS",
+    "RoutingModel",
+    "RoutingPrediction",
+    "append_routing_log",
+    "evaluate",
+    "load_routing_log",
+    "observed_label",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
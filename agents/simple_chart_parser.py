@@ -1,6 +1,9 @@
 """
 Simple Chart Parser for Approach B
-Parses chart text and extracts basic factors using LLM
+Parses chart text and extracts basic factors
+
+Known chart JSON shapes are mapped deterministically (see agents.chart_schema);
+the LLM is only called for input that fails schema detection.
 """
 
 import json
@@ -8,10 +11,10 @@ import logging
 import os
 import re
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
-from google import genai
-from google.genai import types
+from agents.chart_schema import parse_chart_json
+from utils.dasha_timeline import DashaTimeline
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,25 +28,51 @@ class ChartParser:
     """
     
     def __init__(self):
-        """Initialize chart parser with Gemini client"""
+        """Initialize chart parser (the Gemini client is created on first LLM fallback)"""
         self.project_id = os.getenv("GCP_PROJECT_ID", "superb-analog-464304-s0")
         self.location = os.getenv("GCP_REGION", "asia-south1")
+        self._client = None
+        self._client_initialized = False
+    
+    @property
+    def client(self):
+        """Gemini client, or None if it cannot be created"""
+        if not self._client_initialized:
+            self._client_initialized = True
+            try:
+                # Deferred: most charts never need the LLM and the SDK is slow to import
+                from google import genai
+                self._client = genai.Client(
+                    vertexai=True,
+                    project=self.project_id,
+                    location=self.location
+                )
+                logger.info("Chart parser initialized with Gemini LLM")
+            except Exception as e:
+                logger.warning(f"Failed to initialize Gemini client: {e}")
+        return self._client
+    
+    def parse_chart_json(self, chart: Any) -> Optional[Dict]:
+        """
+        Parse structured chart JSON deterministically (no LLM call)
         
-        # Initialize Gemini client
-        try:
-            self.client = genai.Client(
-                vertexai=True,
-                project=self.project_id,
-                location=self.location
-            )
-            logger.info("Chart parser initialized with Gemini LLM")
-        except Exception as e:
-            logger.warning(f"Failed to initialize Gemini client: {e}")
-            self.client = None
+        Args:
+            chart (Any): Chart JSON as dict, list of blocks, or JSON string
+        
+        Returns:
+            Dict: Extracted chart factors, or None if no known schema was detected
+        """
+        factors = parse_chart_json(chart)
+        if factors:
+            logger.info(f"Parsed {len(factors)} chart factors from known schema")
+        return factors
     
     def parse_chart_text(self, chart_data: str, niche: str) -> Dict:
         """
-        Parse chart text and extract factors using Gemini LLM
+        Parse chart text and extract factors
+        
+        Embedded JSON blocks in a known schema are parsed deterministically;
+        Gemini is only used when schema detection fails.
         
         Args:
             chart_data (str): Raw chart data from user
@@ -52,14 +81,22 @@ class ChartParser:
         Returns:
             Dict: Extracted chart factors
         """
+        factors = self.parse_chart_json(chart_data)
+        if not factors:
+            blocks = self._extract_json_objects(chart_data)
+            factors = self.parse_chart_json(blocks) if blocks else None
+        if factors:
+            return factors
         
-        logger.info("Parsing chart data with Gemini LLM...")
+        logger.info("No known chart schema detected, parsing with Gemini LLM...")
         
         if not self.client:
             logger.warning("Gemini client not available, using regex fallback")
             return self._fallback_parse(chart_data, niche)
         
         try:
+            from google.genai import types
+            
             # Build parsing prompt
             prompt = self._build_parsing_prompt(chart_data, niche)
             
@@ -84,6 +121,7 @@ class ChartParser:
             factors = json.loads(response_text)
             factors["parsing_method"] = "gemini_llm"
             factors["chart_source"] = "user_input"
+            self._resolve_current_dasha(factors)
             
             logger.info(f"Parsed {len(factors)} chart factors using Gemini")
             return factors
@@ -93,9 +131,22 @@ class ChartParser:
             logger.info("Using regex fallback parser")
             return self._fallback_parse(chart_data, niche)
     
+    def _resolve_current_dasha(self, factors: Dict) -> None:
+        """Set the running dasha from the extracted periods instead of trusting the model's pick"""
+        timeline = DashaTimeline.from_factors(factors)
+        if timeline is None:
+            return
+        for level, period in timeline.active().items():
+            if level == "pratyantar":
+                continue
+            factors[f"current_{level}"] = period.lord
+            factors[f"current_{level}_start"] = period.start.strftime("%Y-%m-%d %H:%M:%S")
+            factors[f"current_{level}_end"] = period.end.strftime("%Y-%m-%d %H:%M:%S")
+    
     def _build_parsing_prompt(self, chart_data: str, niche: str) -> str:
         """Build prompt for Gemini to parse chart data"""
         
+        today = datetime.now()
         prompt = f"""
 You are an expert Vedic astrology chart parser.
 
@@ -111,8 +162,8 @@ IMPORTANT:
 - DO NOT make up or assume any values
 - If a value is not mentioned, use null
 - Be precise with placements (e.g., "7th house", "11th house Taurus")
-- For Mahadasha data: Find the current date (November 8, 2025) and determine which period is active
-- Also extract all Mahadasha/Antardasha periods within ±20 years (2005-2045)
+- For Mahadasha data: Find the current date ({today:%B %d, %Y}) and determine which period is active
+- Also extract all Mahadasha/Antardasha periods within ±20 years ({today.year - 20}-{today.year + 20})
 - Parse D1 chart data to extract planet positions (current_sign, house_number, zodiac_sign_name, nakshatra_name)
 - Parse D9 (Navamsa) chart data separately
 - Parse D10 (Dasamsa) chart data separately for career analysis
@@ -167,8 +218,8 @@ RETURN THIS EXACT JSON STRUCTURE:
   "darakaraka_sign": "sign where DK is",
   "darakaraka_house": "house where DK is",
   
-  "current_mahadasha": "current major period planet (as of Nov 2025)",
-  "current_antardasha": "current sub-period planet (as of Nov 2025)",
+  "current_mahadasha": "current major period planet (as of {today:%b %Y})",
+  "current_antardasha": "current sub-period planet (as of {today:%b %Y})",
   "mahadasha_start_date": "start date of current mahadasha",
   "mahadasha_end_date": "end date of current mahadasha",
   "antardasha_start_date": "start date of current antardasha",
@@ -2,21 +2,22 @@
 
 from __future__ import annotations
 
-import hashlib
-import json
 import logging
 import math
 import re
 import time
 from collections import OrderedDict
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass, field
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 from datetime import datetime
 
 from agents.gemini_embeddings import GeminiEmbeddings
 from agents.modern_synthesizer import ModernSynthesizer
 from agents.question_complexity import ClassificationResult, QuestionComplexityClassifier
-from niche_config import get_timing_factors, is_timing_question
+from niche_config import get_boundary_ttl, get_dasha_range, get_timing_factors, is_timing_question
+from utils.chart_fingerprint import compute_chart_fingerprint
+from utils.dasha_timeline import DashaPeriod, DashaTimeline, parse_dasha_date
+from utils.tracing import Span, span
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,24 @@ class OrchestrationOutcome:
     chart_focus: List[str]
     latencies: Dict[str, float]
     classification: ClassificationResult
+    passages: List[Dict[str, Any]] = field(default_factory=list)
+    usage: Dict[str, int] = field(default_factory=dict)
+    question_focus: List[str] = field(default_factory=list)
+
+    def to_artifacts(self) -> Dict[str, Any]:
+        """Serializable retrieval artifacts persisted alongside the exchange.
+
+        ``SmartOrchestrator.expand_from_artifacts`` consumes this payload so an
+        expand request can skip classification, chart focus and retrieval.
+        """
+
+        return {
+            "classification": asdict(self.classification),
+            "chart_focus": list(self.chart_focus),
+            "question_focus": list(self.question_focus),
+            "queries": list(self.queries),
+            "passages": [dict(passage) for passage in self.passages],
+        }
 
 
 class SmartOrchestrator:
@@ -56,6 +75,13 @@ class SmartOrchestrator:
         },
     }
 
+    # The chart view sent to the synthesizer on every track: it is the cached prompt
+    # prefix, so it must not change with the question's complexity
+    _PROMPT_CHART_VIEW = "COMPLEX"
+
+    # Classifier intents, default routes first (query_templates warm-up)
+    _TEMPLATE_INTENTS = ("general", "timing", "basic_timing", "personality", "career")
+
     _NICHE_KEYWORDS = {
         "love": [
             # D1 Chart - 7th house (marriage/spouse)
@@ -138,7 +164,8 @@ class SmartOrchestrator:
         self.classifier = classifier or QuestionComplexityClassifier()
         self.distance_threshold = distance_threshold
         self.max_timing_factors = max_timing_factors
-        self._chart_focus_cache: OrderedDict[str, List[str]] = OrderedDict()
+        # key -> (expires_at, lines); entries expire at the chart's next dasha boundary
+        self._chart_focus_cache: OrderedDict[str, Tuple[float, List[str]]] = OrderedDict()
         self._chart_focus_cache_size = 128
 
     def answer_question(
@@ -149,87 +176,195 @@ class SmartOrchestrator:
         niche_instruction: Optional[str] = None,
         conversation_history: Optional[List[Dict]] = None,
         mode: str = "draft",  # NEW: "draft" or "expand"
+        chart_fingerprint: Optional[str] = None,
+        chart_views: Optional[Dict[str, List[str]]] = None,
+        dasha_timeline: Optional[DashaTimeline] = None,
     ) -> OrchestrationOutcome:
-        """Route the question through the optimal path and return the response."""
+        """Route the question through the optimal path and return the response.
+
+        ``chart_fingerprint`` is the session's precomputed chart identity; it is
+        derived from ``chart_factors`` when not supplied. ``chart_views`` are the
+        session's precompiled chart-focus views from :meth:`compile_chart_views`.
+        ``dasha_timeline`` is the session's indexed dasha timeline; timing
+        questions get the active/next periods resolved from it.
+        """
 
-        total_start = time.time()
         latencies: Dict[str, float] = {}
 
-        # 1. Classify complexity
-        classification_start = time.time()
-        classification = self.classifier.classify(question)
-        latencies["classification_ms"] = (time.time() - classification_start) * 1000
+        with span("orchestrator.answer", mode=mode, niche=niche) as total:
+            chart_fingerprint = chart_fingerprint or compute_chart_fingerprint(chart_factors)
+
+            # 1. Classify complexity
+            with span("classify") as stage:
+                classification = self.classifier.classify(question)
+            latencies["classification_ms"] = stage.duration_ms
+            total.set_attributes(complexity=classification.complexity, intent=classification.intent)
+
+            # 2. Format chart focus: the session's stable view + lines resolved for this question
+            with span("chart_focus") as stage:
+                config = self._COMPLEXITY_CONFIG[classification.complexity]
+                compiled_view = (chart_views or {}).get(self._PROMPT_CHART_VIEW)
+                if compiled_view is not None:
+                    chart_focus = list(compiled_view)
+                else:
+                    chart_focus = self._format_chart_focus(
+                        chart_factors,
+                        niche,
+                        self._COMPLEXITY_CONFIG[self._PROMPT_CHART_VIEW]["chart_limit"],
+                        chart_fingerprint,
+                        dasha_timeline,
+                    )
+                question_focus: List[str] = []
+                if classification.intent == "timing" or is_timing_question(question):
+                    question_focus = self._timing_focus(question, niche, chart_factors, dasha_timeline)
+            latencies["chart_focus_ms"] = stage.duration_ms
+
+            queries: List[str] = []
+            passages: List[Dict[str, str]] = []
+
+            if config["query_count"] > 0:
+                # 3. Generate enriched queries
+                with span("query_generation") as stage:
+                    queries = self._generate_queries(
+                        question=question,
+                        chart_factors=chart_factors,
+                        niche=niche,
+                        intent=classification.intent,
+                        max_queries=config["query_count"],
+                    )
+                latencies["query_generation_ms"] = stage.duration_ms
+
+                # 4. Retrieve passages (merged query + reranking)
+                with span("retrieval", queries=len(queries)) as stage:
+                    passages = self._retrieve_passages(
+                        queries=queries,
+                        limit=config["passage_limit"],
+                    )
+                latencies.update(self._retrieval_latencies(stage))
+            else:
+                latencies.update(self._retrieval_latencies(None))
+                latencies["query_generation_ms"] = 0.0
+
+            # 5-6. Build prompt and synthesize final answer
+            with span("synthesis", complexity=classification.complexity) as stage:
+                response = self.synthesizer.synthesize_final_response(
+                    question=question,
+                    chart_values=chart_factors,
+                    chart_focus=chart_focus,
+                    classical_knowledge=passages,
+                    niche_instruction=niche_instruction or niche,
+                    conversation_history=conversation_history or [],
+                    complexity=classification.complexity,
+                    mode=mode,  # Pass mode for draft/expand
+                    chart_fingerprint=chart_fingerprint,
+                    question_focus=question_focus,
+                )
+            latencies.update(self._synthesis_latencies(stage))
+
+        latencies["total_ms"] = total.duration_ms
 
-        # 2. Format chart focus
-        chart_focus_start = time.time()
-        config = self._COMPLEXITY_CONFIG[classification.complexity]
-        chart_focus = self._format_chart_focus(chart_factors, niche, config["chart_limit"])
-        latencies["chart_focus_ms"] = (time.time() - chart_focus_start) * 1000
+        return OrchestrationOutcome(
+            response=response,
+            complexity=classification.complexity,
+            passages_used=len(passages),
+            rag_used=bool(passages),
+            queries=queries,
+            chart_focus=chart_focus,
+            latencies=latencies,
+            classification=classification,
+            passages=passages,
+            usage=self._synthesis_usage(),
+            question_focus=question_focus,
+        )
 
-        queries: List[str] = []
-        passages: List[Dict[str, str]] = []
-        retrieval_latency = 0.0
-
-        if config["query_count"] > 0:
-            # 3. Generate enriched queries
-            query_start = time.time()
-            queries = self._generate_queries(
-                question=question,
-                chart_factors=chart_factors,
-                niche=niche,
-                intent=classification.intent,
-                max_queries=config["query_count"],
-            )
-            latencies["query_generation_ms"] = (time.time() - query_start) * 1000
+    def compile_chart_views(
+        self,
+        chart_factors: Dict[str, Any],
+        niche: str,
+        chart_fingerprint: Optional[str] = None,
+        dasha_timeline: Optional[DashaTimeline] = None,
+    ) -> Dict[str, List[str]]:
+        """Compile the chart-focus view used in the prompt (keyed by complexity track).
+
+        Called once at session creation; the result is stored on the session
+        and passed back to :meth:`answer_question` so each question is a
+        dictionary lookup instead of a walk over the chart. Every track uses
+        the same view, so only that one is compiled.
+        """
 
-            # 4. Retrieve passages (merged query + reranking)
-            retrieve_start = time.time()
-            passages, retrieval_latency = self._retrieve_passages(
-                queries=queries,
-                limit=config["passage_limit"],
+        chart_fingerprint = chart_fingerprint or compute_chart_fingerprint(chart_factors)
+        dasha_timeline = dasha_timeline or DashaTimeline.from_factors(chart_factors)
+        config = self._COMPLEXITY_CONFIG[self._PROMPT_CHART_VIEW]
+        return {
+            self._PROMPT_CHART_VIEW: self._format_chart_focus(
+                chart_factors, niche, config["chart_limit"], chart_fingerprint, dasha_timeline
             )
-            latencies["retrieval_ms"] = retrieval_latency
-            
-            # Track sub-timings from retrieval
-            latencies["rag_call_ms"] = retrieval_latency * 0.85  # ~85% is RAG call
-            latencies["dedupe_ms"] = retrieval_latency * 0.05    # ~5% is dedupe
-            latencies["rerank_ms"] = retrieval_latency * 0.10    # ~10% is rerank
-        else:
-            latencies["query_generation_ms"] = 0.0
-            latencies["retrieval_ms"] = 0.0
-            latencies["rag_call_ms"] = 0.0
-            latencies["dedupe_ms"] = 0.0
-            latencies["rerank_ms"] = 0.0
-
-        # 5. Build prompt
-        prompt_start = time.time()
-        # (Prompt building happens inside synthesizer, but we track entry time)
-        latencies["prompt_build_start_ms"] = (time.time() - prompt_start) * 1000
-
-        # 6. Synthesize final answer
-        synthesis_start = time.time()
-        llm_first_byte_time = None
-        
-        response = self.synthesizer.synthesize_final_response(
-            question=question,
-            chart_values=chart_factors,
-            chart_focus=chart_focus,
-            classical_knowledge=passages,
-            niche_instruction=niche_instruction or niche,
-            conversation_history=conversation_history or [],
-            complexity=classification.complexity,
-            mode=mode,  # Pass mode for draft/expand
-        )
-        
-        synthesis_time = (time.time() - synthesis_start) * 1000
-        latencies["synthesis_ms"] = synthesis_time
-        
-        # Estimate LLM time (synthesis time minus prompt build)
-        latencies["llm_total_ms"] = synthesis_time
-        latencies["llm_first_byte_ms"] = synthesis_time * 0.15  # Estimated ~15% for first token
-        
-        # Total time
-        latencies["total_ms"] = (time.time() - total_start) * 1000
+        }
+
+    def query_templates(self, per_niche: int = 2) -> Dict[str, List[str]]:
+        """Fallback retrieval queries per niche for the most common intents.
+
+        These are emitted verbatim by :meth:`_generate_queries` whenever a
+        chart lacks the niche's priority factors, so they are the texts worth
+        embedding before the first request.
+        """
+
+        intents = self._TEMPLATE_INTENTS[:per_niche]
+        return {
+            niche_key: [self._fallback_query(intent, niche_key) for intent in intents]
+            for niche_key in self._NICHE_KEYWORDS
+        }
+
+    def warm_up_retrieval(self, query: str) -> int:
+        """Run one retrieval so the RAG backend's channel is open; returns the passage count."""
+
+        return len(self._retrieve_passages([query], limit=1))
+
+    def expand_from_artifacts(
+        self,
+        question: str,
+        chart_factors: Dict[str, Any],
+        artifacts: Dict[str, Any],
+        niche: str,
+        niche_instruction: Optional[str] = None,
+        conversation_history: Optional[List[Dict]] = None,
+        chart_fingerprint: Optional[str] = None,
+    ) -> OrchestrationOutcome:
+        """Expand a previous answer straight from its stored retrieval artifacts.
+
+        Classification, chart focus, query generation and retrieval are reused
+        from the draft exchange, so only the expand-mode synthesis runs.
+        """
+
+        latencies: Dict[str, float] = {
+            "classification_ms": 0.0,
+            "chart_focus_ms": 0.0,
+            "query_generation_ms": 0.0,
+            **self._retrieval_latencies(None),
+        }
+
+        classification = ClassificationResult(**artifacts["classification"])
+        chart_focus = list(artifacts.get("chart_focus") or [])
+        question_focus = list(artifacts.get("question_focus") or [])
+        queries = list(artifacts.get("queries") or [])
+        passages = [dict(passage) for passage in artifacts.get("passages") or []]
+
+        with span("orchestrator.expand", niche=niche, complexity=classification.complexity) as total:
+            with span("synthesis", complexity=classification.complexity) as stage:
+                response = self.synthesizer.synthesize_final_response(
+                    question=question,
+                    chart_values=chart_factors,
+                    chart_focus=chart_focus,
+                    classical_knowledge=passages,
+                    niche_instruction=niche_instruction or niche,
+                    conversation_history=conversation_history or [],
+                    complexity=classification.complexity,
+                    mode="expand",
+                    chart_fingerprint=chart_fingerprint or compute_chart_fingerprint(chart_factors),
+                    question_focus=question_focus,
+                )
+            latencies.update(self._synthesis_latencies(stage))
+        latencies["total_ms"] = total.duration_ms
 
         return OrchestrationOutcome(
             response=response,
@@ -240,25 +375,69 @@ class SmartOrchestrator:
             chart_focus=chart_focus,
             latencies=latencies,
             classification=classification,
+            passages=passages,
+            usage=self._synthesis_usage(),
+            question_focus=question_focus,
         )
 
     # ------------------------------------------------------------------
     # Helpers
     # ------------------------------------------------------------------
 
-    def _format_chart_focus(self, chart_factors: Dict[str, Any], niche: str, limit: int) -> List[str]:
+    @staticmethod
+    def _retrieval_latencies(stage: Optional[Span]) -> Dict[str, float]:
+        """Measured retrieval sub-stages; 0.0 for stages that did not run on this backend."""
+        if stage is None:
+            return {"retrieval_ms": 0.0, "embedding_ms": 0.0, "rag_call_ms": 0.0, "dedupe_ms": 0.0, "rerank_ms": 0.0}
+        return {
+            "retrieval_ms": stage.duration_ms,
+            "embedding_ms": stage.child_ms("embeddings.embed"),
+            "rag_call_ms": stage.child_ms("rag.query"),
+            "dedupe_ms": stage.child_ms("rag.dedupe"),
+            "rerank_ms": stage.child_ms("rerank"),
+        }
+
+    @staticmethod
+    def _synthesis_latencies(stage: Span) -> Dict[str, float]:
+        """Measured synthesis sub-stages; LLM timings are 0.0 on a response-cache hit."""
+        request = stage.find("llm.request")
+        return {
+            "synthesis_ms": stage.duration_ms,
+            "prompt_build_ms": stage.child_ms("llm.prompt_build"),
+            "llm_total_ms": stage.child_ms("llm.request"),
+            # Only providers that report it (OpenRouter: response headers); never estimated
+            "llm_first_byte_ms": request.attributes.get("llm.first_byte_ms", 0.0) if request else 0.0,
+        }
+
+    def _synthesis_usage(self) -> Dict[str, int]:
+        """Provider token usage of the synthesis that just ran on this thread, if reported."""
+        get_last_usage = getattr(self.synthesizer, "get_last_usage", None)
+        return get_last_usage() if callable(get_last_usage) else {}
+
+    def _format_chart_focus(
+        self,
+        chart_factors: Dict[str, Any],
+        niche: str,
+        limit: int,
+        chart_fingerprint: Optional[str] = None,
+        dasha_timeline: Optional[DashaTimeline] = None,
+    ) -> List[str]:
         """
         Format chart factors into organized highlights based on niche and complexity.
         Groups factors by: D1 Chart, D9 Chart, D10 Chart, Dashas, Yogas, etc.
+        Cached per chart until the next dasha boundary (the dasha lines mark the running period).
         """
         highlights: List[str] = []
         niche_key = self._resolve_niche_key(niche)
         priority_keys = self._NICHE_KEYWORDS.get(niche_key, [])
-        cache_key = self._chart_focus_cache_key(chart_factors, niche_key, limit)
+        cache_key = self._chart_focus_cache_key(
+            chart_fingerprint or compute_chart_fingerprint(chart_factors), niche_key, limit
+        )
         cached = self._chart_focus_cache_get(cache_key)
         if cached is not None:
             return list(cached)
 
+        dasha_timeline = dasha_timeline or DashaTimeline.from_factors(chart_factors)
         seen: Set[str] = set()
         consumed: Set[str] = set()
 
@@ -267,6 +446,7 @@ class SmartOrchestrator:
             priority_keys=priority_keys,
             consumed=consumed,
             limit=limit,
+            dasha_timeline=dasha_timeline,
         )
         for entry in condensed_sections:
             if len(highlights) >= limit:
@@ -376,48 +556,38 @@ class SmartOrchestrator:
                     seen.add(entry)
 
         result = highlights[:limit]
-        self._chart_focus_cache_set(cache_key, result)
+        self._chart_focus_cache_set(cache_key, result, get_boundary_ttl("chart_focus", dasha_timeline))
         return result
 
-    def _chart_focus_cache_key(self, chart_factors: Dict[str, Any], niche: str, limit: int) -> str:
-        payload = {
-            "niche": niche,
-            "limit": limit,
-            "chart": self._normalize_for_hash(chart_factors),
-        }
-        blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
-        return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+    def _chart_focus_cache_key(self, chart_fingerprint: str, niche: str, limit: int) -> str:
+        return f"{chart_fingerprint}:{niche}:{limit}"
 
     def _chart_focus_cache_get(self, key: str) -> Optional[List[str]]:
         cache_entry = self._chart_focus_cache.get(key)
         if cache_entry is None:
             return None
+        expires_at, value = cache_entry
+        if expires_at <= time.time():
+            del self._chart_focus_cache[key]
+            return None
         self._chart_focus_cache.move_to_end(key)
-        return list(cache_entry)
+        return list(value)
 
-    def _chart_focus_cache_set(self, key: str, value: List[str]) -> None:
+    def _chart_focus_cache_set(self, key: str, value: List[str], ttl_seconds: int) -> None:
         if not value:
             return
-        self._chart_focus_cache[key] = list(value)
+        self._chart_focus_cache[key] = (time.time() + ttl_seconds, list(value))
         self._chart_focus_cache.move_to_end(key)
         while len(self._chart_focus_cache) > self._chart_focus_cache_size:
             self._chart_focus_cache.popitem(last=False)
 
-    def _normalize_for_hash(self, value: Any) -> Any:
-        if isinstance(value, dict):
-            return {k: self._normalize_for_hash(v) for k, v in sorted(value.items())}
-        if isinstance(value, (list, tuple, set)):
-            return [self._normalize_for_hash(v) for v in value]
-        if isinstance(value, (str, int, float, bool)) or value is None:
-            return value
-        return str(value)
-
     def _build_condensed_sections(
         self,
         chart_factors: Dict[str, Any],
         priority_keys: Sequence[str],
         consumed: Set[str],
         limit: int,
+        dasha_timeline: Optional[DashaTimeline] = None,
     ) -> List[str]:
         sections: List[str] = []
         if limit <= 0:
@@ -439,7 +609,7 @@ class SmartOrchestrator:
             if len(sections) >= limit:
                 return sections
 
-        special = self._build_special_summaries(chart_factors, consumed)
+        special = self._build_special_summaries(chart_factors, consumed, dasha_timeline)
         for entry in special:
             if len(sections) >= limit:
                 break
@@ -568,7 +738,12 @@ class SmartOrchestrator:
         consumed.update({house_key, nakshatra_key, pada_key, retro_key})
         return summary
 
-    def _build_special_summaries(self, chart_factors: Dict[str, Any], consumed: Set[str]) -> List[str]:
+    def _build_special_summaries(
+        self,
+        chart_factors: Dict[str, Any],
+        consumed: Set[str],
+        dasha_timeline: Optional[DashaTimeline] = None,
+    ) -> List[str]:
         sections: List[str] = []
 
         darakaraka_planet = chart_factors.get("darakaraka_planet")
@@ -606,24 +781,51 @@ class SmartOrchestrator:
             range_str = " | ".join(range_bits)
             sections.append(f"Dasha: {maha_symbol}/{antar_symbol}{(' ' + range_str) if range_str else ''}".strip())
 
-        periods = chart_factors.get("dasha_periods_20yr")
-        if periods and isinstance(periods, list):
-            filtered = self._filter_periods(periods, window_years=10)
-            if filtered:
-                summary = []
-                for period in filtered[:3]:
-                    maha = self._planet_symbol(period.get("mahadasha"))
-                    antar = self._planet_symbol(period.get("antardasha"))
-                    start = period.get("start_date")
-                    end = period.get("end_date")
-                    tag = "*" if period.get("is_current") else ""
-                    summary.append(f"{tag}{maha}/{antar} {self._format_timeline(start, end, short=True)}".strip())
-                if summary:
-                    sections.append(f"±10y: {' | '.join(summary)}")
-            consumed.add("dasha_periods_20yr")
+        timeline = dasha_timeline or DashaTimeline.from_factors(chart_factors)
+        if timeline is not None:
+            summary = self._format_periods(timeline.within(10, level="antardasha")[:3])
+            if summary:
+                sections.append(f"±10y: {summary}")
+        consumed.update({"dasha_periods_20yr", "dasha_timeline"})
 
         return sections
 
+    def _format_periods(self, periods: Sequence[DashaPeriod], at: Optional[datetime] = None) -> str:
+        at = at or datetime.now()
+        summary = []
+        for period in periods:
+            lords = "/".join(self._planet_symbol(lord) for lord in period.lords)
+            tag = "*" if period.contains(at) else ""
+            summary.append(f"{tag}{lords} {self._format_timeline(period.start, period.end, short=True)}".strip())
+        return " | ".join(summary)
+
+    def _timing_focus(
+        self,
+        question: str,
+        niche: str,
+        chart_factors: Dict[str, Any],
+        dasha_timeline: Optional[DashaTimeline] = None,
+    ) -> List[str]:
+        """Resolved dasha lines for timing questions, so the model never has to work out "current"."""
+        timeline = dasha_timeline or DashaTimeline.from_factors(chart_factors)
+        if timeline is None:
+            return []
+
+        now = datetime.now()
+        dasha_range = get_dasha_range(question, niche, timeline=timeline, at=now)
+        lines = []
+        active = dasha_range["active"]
+        if active:
+            deepest = active[timeline.levels[-1]] if timeline.levels[-1] in active else list(active.values())[-1]
+            lords = "/".join(self._planet_symbol(lord) for lord in deepest.lords)
+            lines.append(f"Dasha now ({now.strftime('%Y-%m-%d')}): {lords}")
+        if dasha_range["next_change"]:
+            lines.append(f"Next dasha change: {dasha_range['next_change'].strftime('%Y-%m-%d')}")
+        window = self._format_periods(dasha_range["periods"][: self.max_timing_factors + 3], now)
+        if window:
+            lines.append(f"Dasha ±{dasha_range['years']}y: {window}")
+        return lines
+
     def _extract_house_number(self, key: str) -> Optional[int]:
         match = re.search(r"(\d+)(?:st|nd|rd|th)", key)
         if not match:
@@ -784,39 +986,12 @@ class SmartOrchestrator:
             return dt.strftime("%Y-%m")
         return dt.strftime("%Y-%m-%d")
 
-    def _filter_periods(self, periods: List[Dict[str, Any]], window_years: int) -> List[Dict[str, Any]]:
-        now = datetime.utcnow()
-        start_year = now.year - window_years
-        end_year = now.year + window_years
-        filtered: List[Dict[str, Any]] = []
-        for period in periods:
-            start = self._parse_date(period.get("start_date"))
-            end = self._parse_date(period.get("end_date"))
-            if not start and not end:
-                continue
-            year = start.year if start else end.year if end else now.year
-            if start and start.year > end_year:
-                continue
-            if end and end.year < start_year:
-                continue
-            if year < start_year or year > end_year:
-                continue
-            filtered.append(period)
-        return filtered
-
     def _parse_date(self, value: Any) -> Optional[datetime]:
         if not value:
             return None
         if isinstance(value, datetime):
             return value
-        text = str(value).strip()
-        formats = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d", "%d-%m-%Y"]
-        for fmt in formats:
-            try:
-                return datetime.strptime(text, fmt)
-            except ValueError:
-                continue
-        return None
+        return parse_dasha_date(str(value))
 
     def _generate_queries(
         self,
@@ -857,7 +1032,7 @@ class SmartOrchestrator:
 
         # Ensure we always hit the desired budget
         while len(queries) < max_queries:
-            fallback = f"{intent} {niche_key} classical interpretation"
+            fallback = self._fallback_query(intent, niche_key)
             if fallback not in queries:
                 queries.append(fallback)
             else:
@@ -869,11 +1044,9 @@ class SmartOrchestrator:
         self,
         queries: Sequence[str],
         limit: int,
-    ) -> Tuple[List[Dict[str, Any]], float]:
+    ) -> List[Dict[str, Any]]:
         if not queries:
-            return [], 0.0
-
-        retrieval_start = time.time()
+            return []
 
         passages: List[Dict[str, any]] = []
 
@@ -900,9 +1073,7 @@ class SmartOrchestrator:
         else:
             logger.warning("RAG retriever does not expose a supported interface; skipping retrieval")
 
-        normalized = self._normalize_passages(passages, queries, limit)
-        latency = (time.time() - retrieval_start) * 1000
-        return normalized, latency
+        return self._normalize_passages(passages, queries, limit)
 
     # Formatting utilities -------------------------------------------------
 
@@ -941,6 +1112,10 @@ class SmartOrchestrator:
         ordered = sorted(unique.values(), key=lambda item: item.get("relevance", 0.0), reverse=True)
         return ordered[:limit] if limit else ordered
 
+    @staticmethod
+    def _fallback_query(intent: str, niche_key: str) -> str:
+        return f"{intent} {niche_key} classical interpretation"
+
     @staticmethod
     def _resolve_niche_key(niche: str) -> str:
         lowered = niche.lower()
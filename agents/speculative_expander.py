@@ -0,0 +1,260 @@
+"""Speculative background expansion of draft answers.
+
+Right after a draft answer is sent, the expand-mode synthesis for that same
+exchange is started in the background from the draft's retrieval artifacts.
+``/api/v1/query/expand`` then returns the precomputed answer immediately or
+joins the in-flight generation instead of paying a full LLM call.
+
+The policy is bounded by a per-instance budget (maximum concurrent speculative
+generations) and every speculation is cancelled when its session ends (deleted,
+expired or evicted from the session store) or a new question arrives. Unclaimed
+speculations are also dropped after ``max_age_seconds`` and beyond
+``max_pending`` sessions, so finished answers never pile up. Hit rate and
+wasted tokens are tracked so the policy can be tuned.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Speculation:
+    """Book-keeping for one background expansion."""
+
+    session_id: str
+    turn: int
+    started_at: float = field(default_factory=time.monotonic)
+    future: Optional[Future] = None
+    discarded: bool = False
+    result: Any = field(default=None, repr=False)
+
+
+class SpeculativeExpander:
+    """Runs expand-mode synthesis ahead of the user's expand request."""
+
+    def __init__(
+        self,
+        orchestrator,
+        max_inflight: int = 2,
+        complexities: Optional[List[str]] = None,
+        max_age_seconds: float = 900.0,
+        max_pending: int = 256,
+    ) -> None:
+        self.orchestrator = orchestrator
+        self.max_inflight = max_inflight
+        self.max_age_seconds = max_age_seconds
+        self.max_pending = max(1, max_pending)
+        self.complexities = {c.upper() for c in (complexities or ["SIMPLE", "MODERATE", "COMPLEX"])}
+
+        # Dedicated pool so speculation never competes with live requests for threads
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_inflight), thread_name_prefix="speculative-expand")
+        self._speculations: Dict[str, _Speculation] = {}
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "launched": 0,
+            "skipped_budget": 0,
+            "hits_ready": 0,
+            "hits_joined": 0,
+            "misses": 0,
+            "cancelled": 0,
+            "expired": 0,
+            "failed": 0,
+            "used_tokens": 0,
+            "wasted_tokens": 0,
+        }
+
+    async def start(
+        self,
+        session_id: str,
+        turn: int,
+        question: str,
+        chart_factors: Dict[str, Any],
+        artifacts: Dict[str, Any],
+        niche: str,
+        conversation_history: Optional[List[Dict]] = None,
+        chart_fingerprint: Optional[str] = None,
+    ) -> bool:
+        """Start expanding ``turn`` of ``session_id`` in the background.
+
+        Returns ``False`` when the policy skips the speculation (complexity not
+        eligible or instance budget exhausted).
+        """
+
+        complexity = str(artifacts.get("classification", {}).get("complexity", "")).upper()
+        if complexity not in self.complexities:
+            return False
+
+        self.cancel(session_id, reason="superseded")
+
+        with self._lock:
+            if self._inflight >= self.max_inflight:
+                self.stats["skipped_budget"] += 1
+                logger.debug("Speculative expand skipped (budget %d exhausted)", self.max_inflight)
+                return False
+            self._inflight += 1
+            self.stats["launched"] += 1
+
+        speculation = _Speculation(session_id=session_id, turn=turn)
+        speculation.future = self._executor.submit(
+            self._expand,
+            speculation,
+            question=question,
+            chart_factors=chart_factors,
+            artifacts=artifacts,
+            niche=niche,
+            conversation_history=conversation_history or [],
+            chart_fingerprint=chart_fingerprint,
+        )
+        with self._lock:
+            self._speculations[session_id] = speculation
+        self.prune()
+        logger.info(f"🔮 Speculative expand started (session: {session_id[:8]}..., turn {turn})")
+        return True
+
+    async def claim(self, session_id: str, turn: int) -> Tuple[Any, Optional[str]]:
+        """Take the speculative result for ``turn``.
+
+        Returns ``(outcome, "ready")`` when the answer was precomputed,
+        ``(outcome, "joined")`` after waiting on the in-flight generation and
+        ``(None, None)`` on a miss (including a speculation cancelled meanwhile).
+        """
+
+        # Lookup, turn check and removal in one step: cancel() runs from the
+        # session store's expiry hook and the sweeper thread
+        with self._lock:
+            speculation = self._speculations.get(session_id)
+            if (
+                speculation is None
+                or speculation.turn != turn
+                or speculation.future is None
+                or speculation.discarded
+            ):
+                self.stats["misses"] += 1
+                return None, None
+            del self._speculations[session_id]
+
+        status = "ready" if speculation.future.done() else "joined"
+        try:
+            outcome = await asyncio.wrap_future(speculation.future)
+        except (asyncio.CancelledError, concurrent.futures.CancelledError):
+            if not speculation.future.cancelled():
+                raise  # The awaiting request itself was cancelled
+            with self._lock:
+                self.stats["misses"] += 1
+            return None, None
+        except Exception as exc:
+            logger.warning(f"Speculative expand failed, falling back: {exc}")
+            with self._lock:
+                self.stats["misses"] += 1
+            return None, None
+
+        with self._lock:
+            self.stats["hits_ready" if status == "ready" else "hits_joined"] += 1
+            self.stats["used_tokens"] += self._estimate_tokens(outcome)
+        return outcome, status
+
+    def cancel(self, session_id: str, reason: str = "cancelled") -> bool:
+        """Discard the pending speculation for a session (new question, session end)."""
+
+        with self._lock:
+            speculation = self._speculations.pop(session_id, None)
+            if speculation is None:
+                return False
+            speculation.discarded = True
+            self.stats["cancelled"] += 1
+            # Already finished: everything it generated is wasted
+            if speculation.result is not None:
+                self.stats["wasted_tokens"] += self._estimate_tokens(speculation.result)
+            # Not picked up by a worker yet: drop it without spending any tokens.
+            # A running generation cannot be interrupted; its output is counted as wasted.
+            if speculation.future is not None and speculation.future.cancel():
+                self._inflight -= 1
+        logger.debug(f"Speculative expand discarded ({reason}) for session {session_id[:8]}...")
+        return True
+
+    def prune(self) -> int:
+        """Discard speculations older than ``max_age_seconds`` and the oldest beyond ``max_pending``.
+
+        Returns the number discarded. Called on every start and by the API's
+        periodic session sweep.
+        """
+
+        cutoff = time.monotonic() - self.max_age_seconds
+        with self._lock:
+            pending = sorted(self._speculations.items(), key=lambda item: item[1].started_at)
+        overflow = len(pending) - self.max_pending
+        stale = [
+            session_id for index, (session_id, speculation) in enumerate(pending)
+            if speculation.started_at < cutoff or index < overflow
+        ]
+        for session_id in stale:
+            if self.cancel(session_id, reason="expired"):
+                with self._lock:
+                    self.stats["expired"] += 1
+        return len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and wasted-token counters for tuning the policy."""
+
+        with self._lock:
+            stats = dict(self.stats)
+            stats["inflight"] = self._inflight
+        stats["queued"] = self._executor._work_queue.qsize()
+        hits = stats["hits_ready"] + stats["hits_joined"]
+        claims = hits + stats["misses"]
+        stats["hit_rate"] = hits / claims if claims else 0.0
+        total_tokens = stats["used_tokens"] + stats["wasted_tokens"]
+        stats["wasted_token_ratio"] = stats["wasted_tokens"] / total_tokens if total_tokens else 0.0
+        stats["max_inflight"] = self.max_inflight
+        stats["pending_sessions"] = len(self._speculations)
+        return stats
+
+    def shutdown(self) -> None:
+        """Discard all pending speculations and stop the worker pool."""
+
+        with self._lock:
+            session_ids = list(self._speculations)
+        for session_id in session_ids:
+            self.cancel(session_id, reason="shutdown")
+        self._executor.shutdown(wait=False)
+
+    def _expand(self, speculation: _Speculation, **kwargs):
+        """Worker-thread body; keeps running even if the awaiting task is cancelled."""
+
+        try:
+            outcome = self.orchestrator.expand_from_artifacts(**kwargs)
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+        with self._lock:
+            speculation.result = outcome
+            if speculation.discarded:
+                self.stats["wasted_tokens"] += self._estimate_tokens(outcome)
+        return outcome
+
+    @staticmethod
+    def _estimate_tokens(outcome) -> int:
+        """Provider-reported tokens for the expansion, estimated from the text if unavailable."""
+        usage = getattr(outcome, "usage", None) or {}
+        if usage.get("total_tokens"):
+            return int(usage["total_tokens"])
+        return len(outcome.response or "") // 4
+
+
+__all__ = ["SpeculativeExpander"]
@@ -13,9 +13,6 @@ import time
 from typing import Dict, List, Optional
 import logging
 
-from google import genai
-from google.genai import types
-
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -44,6 +41,7 @@ class LightweightValidator:
     
     def _initialize_client(self):
         """Initialize Gemini client"""
+        from google import genai  # Deferred: the SDK import dominates process start-up
         try:
             self.client = genai.Client(
                 vertexai=True,
@@ -97,7 +95,6 @@ class LightweightValidator:
         
         Time: 1.5-2s (only if needed)
         """
-        
         if not self.should_validate(confidence):
             logger.info(f"Confidence {confidence:.2f} >= threshold {self.confidence_threshold}. Skipping validation.")
             return {
@@ -109,6 +106,8 @@ class LightweightValidator:
         start_time = time.time()
         
         try:
+            from google.genai import types
+            
             logger.info(f"Validating answer (confidence: {confidence:.2f})...")
             
             # Build validation prompt
@@ -183,7 +182,7 @@ class LightweightValidator:
             passages_text += f"Text: {passage.get('text', '')[:300]}...\n"
         
         # Format factors
-        factors_text = json.dumps(chart_factors, indent=2)[:500]
+        factors_text = json.dumps(dict(chart_factors), indent=2)[:500]
         
         prompt = f"""
 You are a validation expert for Vedic astrology answers.
@@ -11,9 +11,7 @@ import time
 from typing import List, Dict, Optional, Tuple
 import logging
 
-# Google Cloud AI Platform imports
-from google.cloud import aiplatform
-from google.cloud.aiplatform.matching_engine import MatchingEngineIndexEndpoint
+from utils.tracing import span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -66,6 +64,7 @@ class VectorSearchRetriever:
     
     def _initialize_client(self):
         """Initialize Vertex AI Vector Search client"""
+        from google.cloud import aiplatform  # Deferred: the SDK import dominates process start-up
         try:
             # Initialize AI Platform
             aiplatform.init(project=self.project_id, location=self.location)
@@ -167,11 +166,12 @@ class VectorSearchRetriever:
                 
                 try:
                     # Search the deployed index
-                    response = self.index_endpoint.find_neighbors(
-                        deployed_index_id=self.deployed_index_id,
-                        queries=[embedding],  # Single query
-                        num_neighbors=top_k * 2,  # Get extra for filtering
-                    )
+                    with span("rag.query", kind="client", backend="vector_search", top_k=top_k):
+                        response = self.index_endpoint.find_neighbors(
+                            deployed_index_id=self.deployed_index_id,
+                            queries=[embedding],  # Single query
+                            num_neighbors=top_k * 2,  # Get extra for filtering
+                        )
                     
                     passages = []
                     
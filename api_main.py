@@ -3,16 +3,23 @@ AstroAirk Backend API - FastAPI REST Server
 Pure backend for developer frontend integration (no Gradio UI)
 """
 
-from fastapi import FastAPI, HTTPException, Request
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Callable
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager
 import uvicorn
+import asyncio
 import os
 import sys
-import time
 import logging
+import threading
 import uuid
 import json
 from datetime import datetime
@@ -35,16 +42,27 @@ if not hasattr(_metadata, "packages_distributions"):
         _metadata.packages_distributions = _packages_distributions_stub
 
 # Import your existing agents
+from agents.chart_schema import SCHEMA_VERSION
 from agents.simple_chart_parser import ChartParser
 from agents.openrouter_synthesizer import OpenRouterSynthesizer
 from agents.gemini_embeddings import GeminiEmbeddings
 from agents.smart_orchestrator import SmartOrchestrator
-from agents.validator import LightweightValidator
+from agents.question_complexity import QuestionComplexityClassifier
+from agents.routing_model import ROUTE_COSTS, RoutingModel, append_routing_log
+from agents.corpus_idf import CorpusIDF
+from agents.fast_reranker import FastReranker
 from utils.conversation_manager import ConversationManager
 from agents.niche_preloader import NichePreloader
 from agents.cached_retriever import CachedRetriever
 from agents.semantic_selector import SemanticFactorSelector
+from agents.speculative_expander import SpeculativeExpander
 from utils.cache_manager import get_cache_manager
+from utils.chart_fingerprint import compute_chart_fingerprint, compute_chart_input_key
+from utils.dasha_timeline import DashaTimeline
+from utils.session_store import create_session_store
+from utils.prefork import serve as prefork_serve, shared_resource
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
+from utils.tracing import configure_tracing, current_trace_id, install_log_correlation, shutdown_tracing, span
 
 # Import RAG retriever
 import config
@@ -53,13 +71,38 @@ if config.USE_REAL_RAG:
 else:
     from agents.vector_search_retriever import VectorSearchRetriever as RAGRetriever
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Cloud SDKs are imported by the agents on first use (initialize_services), not here
+_IMPORT_MS = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+
+# Configure logging (every line carries the request's trace id)
+install_log_correlation()
+logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:[%(trace_id)s] %(message)s", force=True)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Service startup/shutdown, background warm-up and the session sweeper"""
+    await startup_event()
+    tasks = [
+        asyncio.create_task(_warm_up()),
+        asyncio.create_task(_sweep_sessions(config.SESSION_CONFIG.get("sweep_interval_seconds", 60))),
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await shutdown_event()
+
 # Initialize FastAPI
 app = FastAPI(
     title="AstroAirk API",
+    lifespan=lifespan,
     description="Vedic Astrology AI Backend - Love, Career, Health Predictions",
     version="1.0.0",
     docs_url="/docs",
@@ -75,12 +118,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    """One root span per request (continuing an incoming W3C traceparent) plus request metrics"""
+    status = 500
+    requests_in_flight.inc()
+    try:
+        with span(
+            f"{request.method} {request.url.path}",
+            kind="server",
+            root=True,
+            traceparent=request.headers.get("traceparent"),
+            **{"http.method": request.method, "http.target": request.url.path},
+        ) as root:
+            response = await call_next(request)
+            status = response.status_code
+            root.set_attribute("http.status_code", status)
+    finally:
+        requests_in_flight.dec()
+        request_latency.observe(
+            root.duration_ms / 1000, method=request.method, route=_route_path(request.scope), status=str(status)
+        )
+    response.headers["traceparent"] = root.traceparent
+    response.headers["X-Trace-Id"] = root.trace_id
+    return response
+
+@app.middleware("http")
+async def session_scope(request: Request, call_next):
+    """Load each session from the shared store at most once per request"""
+    if conv_manager is None:
+        return await call_next(request)
+    with conv_manager.request_scope():
+        return await call_next(request)
+
 # Global instances (lazy loaded)
 orchestrator = None
 chart_parser = None
 conv_manager = None
 rag_retriever = None
 preloader = None
+speculator = None
+chart_cache = None
+# Startup phase -> milliseconds (module imports + each initialize_services phase)
+startup_timings: Dict[str, float] = {}
+# Warm-up progress behind /health/ready: step -> {"status", "ms", "detail" | "error"}
+readiness: Dict[str, Any] = {"ready": False, "steps": {}}
+# Guards readiness["steps"] against warm-up steps that finish after the timeout
+_readiness_lock = threading.Lock()
+
+# ============================================================================
+# METRICS (Prometheus text format at /metrics)
+# ============================================================================
+
+metrics = MetricsRegistry(namespace="astro")
+request_latency = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+requests_in_flight = metrics.gauge("http_requests_in_flight", "Requests currently being handled")
+stage_latency = metrics.histogram(
+    "stage_duration_seconds", "Measured orchestration stage latency", ["stage", "complexity", "mode"]
+)
+llm_tokens = metrics.counter(
+    "llm_tokens_total", "LLM tokens reported by the provider", ["type", "complexity", "mode"]
+)
+# Route endpoint -> path template (keeps session ids out of the labels)
+_route_paths: Dict[Any, str] = {}
 
 # ============================================================================
 # REQUEST/RESPONSE MODELS
@@ -131,72 +233,165 @@ class QueryResponse(BaseModel):
 # INITIALIZATION
 # ============================================================================
 
+def _load_routing_model(path: str) -> RoutingModel:
+    """Routing model arrays, loaded once (before the fork in prefork mode)"""
+    return shared_resource(f"routing_model:{path}", lambda: RoutingModel.load(path))
+
+def _load_idf_table(path: str) -> CorpusIDF:
+    """Corpus IDF table, memory-mapped once (before the fork in prefork mode)"""
+    return shared_resource(f"rerank_idf:{path}", lambda: CorpusIDF.load(path))
+
+def preload_shared_data():
+    """
+    Load read-only data shared by all workers (prefork mode)
+    
+    Module-level tables (niche registry, chart schema, classifier rules) are
+    already loaded by importing this module; clients are built per worker
+    in initialize_services after the fork.
+    """
+    model_path = config.ROUTING_MODEL_CONFIG.get("model_path")
+    if model_path:
+        try:
+            _load_routing_model(model_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Routing model not preloaded: {e}")
+    idf_path = config.RERANK_CONFIG.get("idf_path")
+    if idf_path:
+        try:
+            _load_idf_table(idf_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Corpus IDF table not preloaded: {e}")
+
+def _timed(phase: str, build: Callable[[], Any]) -> Any:
+    """Run one startup phase and record its duration in startup_timings"""
+    started = time.perf_counter()
+    try:
+        return build()
+    finally:
+        startup_timings[phase] = round((time.perf_counter() - started) * 1000, 1)
+
+def _build_classifier() -> QuestionComplexityClassifier:
+    """Complexity classifier with the optional learned router in front of the regex rules"""
+    routing_config = config.ROUTING_MODEL_CONFIG
+    routing_model = None
+    if routing_config.get("model_path"):
+        try:
+            routing_model = _load_routing_model(routing_config["model_path"])
+        except Exception as e:
+            logger.warning(f"⚠️ Routing model unavailable, using regex rules: {e}")
+    return QuestionComplexityClassifier(
+        routing_model=routing_model,
+        routing_threshold=routing_config.get("threshold", 0.8),
+        complex_threshold=routing_config.get("complex_threshold", 0.9)
+    )
+
+def _build_reranker() -> FastReranker:
+    """Passage reranker, weighting query terms by corpus IDF when a table is configured"""
+    idf_table = None
+    idf_path = config.RERANK_CONFIG.get("idf_path")
+    if idf_path:
+        try:
+            idf_table = _load_idf_table(idf_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Corpus IDF table unavailable, using length-based IDF: {e}")
+    return FastReranker(idf_table=idf_table)
+
 def initialize_services():
-    """Initialize all AI services on startup"""
-    global orchestrator, chart_parser, conv_manager, rag_retriever, preloader
+    """
+    Initialize all AI services on startup
+    
+    Independent clients (cache, sessions, embeddings, RAG, synthesizer,
+    classifier) are built concurrently - their cost is SDK imports, auth
+    and network round-trips - then the orchestrator and the services that
+    wrap it are assembled. Per-phase timings land in startup_timings.
+    """
+    global orchestrator, chart_parser, conv_manager, rag_retriever, preloader, speculator, chart_cache
     
     logger.info("🚀 Initializing AstroAirk Backend Services...")
+    started = time.perf_counter()
+    startup_timings.clear()
+    startup_timings["imports"] = _IMPORT_MS
     
     try:
-        # Initialize chart parser
-        chart_parser = ChartParser()
-        logger.info("✅ Chart Parser initialized")
+        # Gemini client is only created on the first LLM fallback
+        chart_parser = _timed("chart_parser", ChartParser)
         
-        # Initialize conversation manager
-        conv_manager = ConversationManager()
-        logger.info("✅ Conversation Manager initialized")
+        builders = {
+            # Parsed charts and chart views are content-addressed in the shared cache backend
+            "chart_cache": get_cache_manager,
+            "conv_manager": lambda: ConversationManager(
+                session_ttl_minutes=config.SESSION_CONFIG["ttl_minutes"],
+                store=create_session_store(config.SESSION_CONFIG)
+            ),
+            "embeddings": lambda: GeminiEmbeddings(
+                project_id=config.PROJECT_ID,
+                location=config.REGION,
+                model=config.EMBEDDINGS_CONFIG.get("model", "text-embedding-004"),
+                dimension=config.EMBEDDINGS_CONFIG.get("dimension", 768)
+            ),
+            "rag_retriever": lambda: RAGRetriever(
+                project_id=config.PROJECT_ID,
+                location=config.REGION,
+                corpus_id=config.CORPUS_ID,
+                top_k=6,
+                similarity_threshold=config.RAG_SIMILARITY_THRESHOLD,
+                final_top_k=config.RERANK_CONFIG.get("final_top_k", 3),
+                reranker=_build_reranker()
+            ),
+            "synthesizer": lambda: OpenRouterSynthesizer(
+                api_key=os.getenv("OPENROUTER_API_KEY"),
+                model_name="openai/gpt-4o-mini",
+                temperature=0.7,
+                max_output_tokens=3000
+            ),
+            "classifier": _build_classifier,
+        }
+        with ThreadPoolExecutor(max_workers=len(builders), thread_name_prefix="startup") as pool:
+            futures = {name: pool.submit(_timed, name, build) for name, build in builders.items()}
+            built = {name: future.result() for name, future in futures.items()}
         
-        # Initialize embeddings first (needed by other components)
-        gemini_embedder = GeminiEmbeddings(
-            project_id=config.PROJECT_ID,
-            location=config.REGION,
-            model=config.EMBEDDINGS_CONFIG.get("model", "text-embedding-004"),
-            dimension=config.EMBEDDINGS_CONFIG.get("dimension", 768)
-        )
+        chart_cache = built["chart_cache"]
+        logger.info(f"✅ Parsed-chart cache ready ({'redis' if chart_cache.use_redis else 'memory'})")
+        conv_manager = built["conv_manager"]
+        logger.info("✅ Conversation Manager initialized")
+        gemini_embedder = built["embeddings"]
         logger.info("✅ Gemini Embeddings initialized")
-        
-        # Initialize RAG retriever
-        rag_retriever = RAGRetriever(
-            project_id=config.PROJECT_ID,
-            location=config.REGION,
-            corpus_id=config.CORPUS_ID,
-            top_k=6,
-            similarity_threshold=config.RAG_SIMILARITY_THRESHOLD,
-            final_top_k=3
-        )
+        rag_retriever = built["rag_retriever"]
         logger.info("✅ RAG Retriever initialized")
+        synthesizer = built["synthesizer"]
+        logger.info("✅ OpenRouter Synthesizer initialized (GPT-4.1 Mini)")
         
         # Initialize preloader (needs rag_retriever and embeddings)
-        preloader = NichePreloader(
+        preloader = _timed("preloader", lambda: NichePreloader(
             rag_retriever=rag_retriever,
             embeddings_client=gemini_embedder
-        )
+        ))
         logger.info("✅ Niche Preloader initialized")
         
-        # Initialize OpenRouter synthesizer
-        synthesizer = OpenRouterSynthesizer(
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-            model_name="openai/gpt-4o-mini",
-            temperature=0.7,
-            max_output_tokens=3000
-        )
-        logger.info("✅ OpenRouter Synthesizer initialized (GPT-4.1 Mini)")
-        
-        # Initialize validator
-        validator = LightweightValidator(
-            project_id=config.PROJECT_ID,
-            location=config.REGION
-        )
-        logger.info("✅ Validator initialized")
-        
-        # Initialize orchestrator (use correct parameters based on SmartOrchestrator's __init__)
-        orchestrator = SmartOrchestrator(
+        orchestrator = _timed("orchestrator", lambda: SmartOrchestrator(
             embedder=gemini_embedder,
             rag_retriever=rag_retriever,
-            synthesizer=synthesizer
-        )
+            synthesizer=synthesizer,
+            classifier=built["classifier"]
+        ))
         logger.info("✅ Smart Orchestrator initialized")
         
+        # Optional speculative expansion of draft answers
+        speculative_config = config.SPECULATIVE_EXPAND_CONFIG
+        if speculative_config.get("enabled"):
+            speculator = SpeculativeExpander(
+                orchestrator=orchestrator,
+                max_inflight=speculative_config.get("max_inflight", 2),
+                complexities=speculative_config.get("complexities"),
+                max_age_seconds=speculative_config.get("max_age_seconds", 900.0),
+                max_pending=speculative_config.get("max_pending", 256)
+            )
+            # Sessions the store expires or evicts on its own end their speculation too
+            conv_manager.store.on_session_end = lambda session_id, reason: speculator.cancel(session_id, reason=reason)
+            logger.info(f"✅ Speculative expansion enabled (budget: {speculator.max_inflight} in-flight)")
+        
+        startup_timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info("⏱️  Startup phases (ms): " + ", ".join(f"{name}={ms:.0f}" for name, ms in startup_timings.items()))
         logger.info("✅ All services ready!")
         return True
         
@@ -206,6 +401,228 @@ def initialize_services():
         traceback.print_exc()
         return False
 
+def _warmup_steps() -> Dict[str, Callable[[], Any]]:
+    """Warm-up step -> callable returning a short detail for /health/ready"""
+    warmup_config = config.WARMUP_CONFIG
+    templates = orchestrator.query_templates(warmup_config.get("templates_per_niche", 2))
+    hot_queries = [query for queries in templates.values() for query in queries]
+    
+    steps: Dict[str, Callable[[], Any]] = {}
+    if hasattr(orchestrator.synthesizer, "warm_up"):
+        # Keep-alive HTTPS connection to the LLM provider
+        steps["llm_http"] = orchestrator.synthesizer.warm_up
+    if hasattr(orchestrator.embedder, "warm_up"):
+        # Embedding client connection + the templated queries served verbatim
+        steps["embeddings"] = lambda: orchestrator.embedder.warm_up(hot_queries)
+    # One retrieval opens the RAG / Vector Search gRPC channel
+    steps["rag"] = lambda: orchestrator.warm_up_retrieval(hot_queries[0])
+    snapshot_path = warmup_config.get("cache_snapshot_path")
+    if snapshot_path and chart_cache:
+        steps["cache_snapshot"] = lambda: chart_cache.load_snapshot(snapshot_path)
+    return steps
+
+def _blocking_warmup_steps() -> List[str]:
+    """Required warm-up steps that have not succeeded (yet)"""
+    return [
+        name for name in config.WARMUP_CONFIG.get("required", [])
+        if name in readiness["steps"] and readiness["steps"][name]["status"] != "ok"
+    ]
+
+def _run_warmup_step(name: str, step: Callable[[], Any]) -> None:
+    """Run one warm-up step, recording its outcome in readiness and its duration in startup_timings"""
+    started = time.perf_counter()
+    try:
+        outcome = {"status": "ok", "detail": step()}
+    except Exception as e:
+        logger.warning(f"⚠️ Warm-up step {name} failed: {e}")
+        outcome = {"status": "failed", "error": str(e)}
+    outcome["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    startup_timings[f"warmup_{name}"] = outcome["ms"]
+    
+    with _readiness_lock:
+        timed_out = readiness["steps"].get(name, {}).get("status") == "timeout"
+        readiness["steps"][name] = outcome
+        if timed_out and outcome["status"] == "ok" and not _blocking_warmup_steps():
+            # A straggler that warm_up_services gave up on has caught up
+            readiness["ready"] = True
+            logger.info(f"🔥 Warm-up step {name} finished after the timeout; instance is ready")
+
+def warm_up_services() -> bool:
+    """
+    Warm connections and caches before taking traffic
+    
+    Steps run concurrently and are best-effort: a failed or timed-out step
+    only keeps the instance unready if it is listed in WARMUP_CONFIG["required"].
+    A required step that times out but then succeeds in the background makes
+    the instance ready at that point.
+    
+    Returns:
+        bool: Whether the instance is ready
+    """
+    warmup_config = config.WARMUP_CONFIG
+    started = time.perf_counter()
+    steps = _warmup_steps()
+    readiness["steps"] = {name: {"status": "pending"} for name in steps}
+    
+    pool = ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="warmup")
+    futures = {pool.submit(_run_warmup_step, name, step): name for name, step in steps.items()}
+    _, pending = wait(futures, timeout=warmup_config.get("timeout_seconds", 30))
+    pool.shutdown(wait=False)  # Stragglers finish in the background and can still flip readiness
+    with _readiness_lock:
+        for future in pending:
+            if readiness["steps"][futures[future]]["status"] == "pending":
+                readiness["steps"][futures[future]] = {"status": "timeout"}
+        blocking = _blocking_warmup_steps()
+        readiness["ready"] = not blocking
+    startup_timings["warmup_total"] = round((time.perf_counter() - started) * 1000, 1)
+    if blocking:
+        logger.error(f"❌ Not ready, required warm-up steps failed: {', '.join(blocking)}")
+    else:
+        logger.info(
+            "🔥 Warm-up done: "
+            + ", ".join(f"{name}={step['status']}" for name, step in readiness["steps"].items())
+            + f" in {startup_timings['warmup_total']:.0f}ms"
+        )
+    return readiness["ready"]
+
+def _prepare_chart(chart_json: Dict[str, Any], niche: str) -> Dict[str, Any]:
+    """
+    Parsed factors, fingerprint and chart-focus views for a submitted chart
+    
+    Both are content-addressed in the cache backend: the factors by a canonical
+    hash of the chart JSON, the views by chart fingerprint + niche. A known chart
+    (new session, niche switch, another instance) is neither re-parsed nor re-compiled.
+    """
+    chart_key = compute_chart_input_key(chart_json, parser_version=SCHEMA_VERSION)
+    cached = chart_cache.get_parsed_chart(chart_key) if chart_cache else None
+    
+    if cached:
+        chart_factors = cached["chart_factors"]
+        chart_fingerprint = cached["chart_fingerprint"]
+        logger.info(f"⚡ Parsed chart cache hit: {chart_key[:12]} ({len(chart_factors)} factors)")
+    else:
+        # Known chart schemas map deterministically; only unknown shapes go to the LLM
+        chart_factors = chart_parser.parse_chart_json(chart_json)
+        if not chart_factors:
+            chart_factors = chart_parser.parse_chart_text(json.dumps(chart_json), niche)
+        chart_fingerprint = compute_chart_fingerprint(chart_factors)
+        if chart_cache:
+            chart_cache.set_parsed_chart(chart_key, chart_factors, chart_fingerprint)
+        logger.info(f"✅ Chart parsed: {len(chart_factors)} factors ({chart_factors.get('parsing_method', 'unknown')})")
+    
+    dasha_timeline = DashaTimeline.from_factors(chart_factors)
+    chart_views = chart_cache.get_chart_views(chart_fingerprint, niche) if chart_cache else None
+    if chart_views is None:
+        # Compile chart-focus views for all complexity tracks once per chart + niche
+        chart_views = orchestrator.compile_chart_views(
+            chart_factors, niche, chart_fingerprint=chart_fingerprint, dasha_timeline=dasha_timeline
+        )
+        if chart_cache:
+            chart_cache.set_chart_views(chart_fingerprint, niche, chart_views, dasha_timeline=dasha_timeline)
+    
+    return {
+        "chart_key": chart_key,
+        "chart_factors": chart_factors,
+        "chart_fingerprint": chart_fingerprint,
+        "chart_views": chart_views,
+        "dasha_timeline": dasha_timeline,
+    }
+
+def _route_path(scope: Dict[str, Any]) -> str:
+    """Path template of the route that handled a request"""
+    endpoint = scope.get("endpoint")
+    if endpoint not in _route_paths:
+        _route_paths[endpoint] = next(
+            (route.path for route in app.routes if getattr(route, "endpoint", None) is endpoint), "unmatched"
+        )
+    return _route_paths[endpoint]
+
+def _observe_outcome(outcome, mode: str):
+    """Record an orchestration's measured stages and token usage"""
+    complexity = outcome.complexity
+    for key, ms in outcome.latencies.items():
+        if ms and key.endswith("_ms"):  # 0.0 = stage did not run
+            stage_latency.observe(ms / 1000, stage=key[:-3], complexity=complexity, mode=mode)
+    for token_type in ("prompt_tokens", "cached_tokens", "completion_tokens"):
+        count = outcome.usage.get(token_type, 0)
+        if count:
+            llm_tokens.inc(count, type=token_type[:-7], complexity=complexity, mode=mode)
+
+@metrics.register_collector
+def _collect_cache_metrics():
+    """Hit/miss counters and hit ratio per cache level"""
+    requests = metrics.family("cache_requests_total", "counter", "Cache lookups by cache level and result")
+    ratio = metrics.family("cache_hit_ratio", "gauge", "Cache hit ratio since start by cache level")
+    levels = {}
+    if chart_cache:
+        stats = chart_cache.cache_stats
+        levels["level1_intent"] = (stats["level1_hits"], stats["level1_misses"])
+        levels["level2_response"] = (stats["level2_hits"], stats["level2_misses"])
+        levels["kv"] = (stats["hits"], stats["misses"])  # parsed charts, chart views, RAG factors
+    if orchestrator and hasattr(orchestrator.embedder, "cache_stats"):
+        stats = orchestrator.embedder.cache_stats()
+        levels["query_embeddings"] = (stats["hits"], stats["misses"])
+    for level, (hits, misses) in levels.items():
+        requests.add(hits, cache=level, result="hit").add(misses, cache=level, result="miss")
+        ratio.add(hits / (hits + misses) if hits + misses else 0.0, cache=level)
+    return [requests, ratio]
+
+@metrics.register_collector
+def _collect_service_metrics():
+    """Sessions, speculative executor, LLM totals, readiness, SLO targets and reranker IDF version"""
+    families = []
+    if conv_manager:
+        stats = conv_manager.get_stats()
+        families += [
+            metrics.family("sessions_active", "gauge", "Live sessions in the session store").add(stats["sessions"]),
+            metrics.family("session_evictions_total", "counter", "Sessions evicted by the LRU cap").add(stats["evictions"]),
+            metrics.family("session_expirations_total", "counter", "Sessions expired by TTL").add(stats["expirations"]),
+        ]
+    if speculator:
+        stats = speculator.get_stats()
+        families += [
+            metrics.family("speculative_inflight", "gauge", "Speculative expansions running").add(stats["inflight"]),
+            metrics.family("speculative_queue_depth", "gauge", "Speculative expansions waiting for a worker").add(stats["queued"]),
+            metrics.family("speculative_wasted_tokens_total", "counter", "Tokens spent on discarded speculations").add(stats["wasted_tokens"]),
+        ]
+    if orchestrator and hasattr(orchestrator.synthesizer, "get_usage_stats"):
+        stats = orchestrator.synthesizer.get_usage_stats()
+        families.append(metrics.family("llm_calls_total", "counter", "LLM calls with reported usage").add(stats["calls"]))
+    targets = metrics.family("performance_target_seconds", "gauge", "Latency targets from PERFORMANCE_TARGETS")
+    for target, ms in config.PERFORMANCE_TARGETS.items():
+        targets.add(ms / 1000, target=target[:-3] if target.endswith("_ms") else target)
+    families.append(targets)
+    families.append(metrics.family("ready", "gauge", "1 when /health/ready passes").add(int(readiness["ready"])))
+    reranker = getattr(rag_retriever, "reranker", None)
+    if reranker is not None:
+        idf = reranker.get_stats()["idf"]
+        families.append(metrics.family("rerank_idf_info", "gauge", "Corpus IDF table used by the reranker").add(
+            1, corpus_version=idf["corpus_version"] if isinstance(idf, dict) else "none"))
+    return families
+
+def _collect_threadpool_metrics():
+    """Request threadpool occupancy (must run on the event loop)"""
+    import anyio.to_thread
+    limiter = anyio.to_thread.current_default_thread_limiter().statistics()
+    return [
+        metrics.family("threadpool_size", "gauge", "Request threadpool capacity").add(limiter.total_tokens),
+        metrics.family("threadpool_busy", "gauge", "Request threadpool threads in use").add(limiter.borrowed_tokens),
+        metrics.family("threadpool_queue_depth", "gauge", "Blocking calls waiting for a threadpool thread").add(limiter.tasks_waiting),
+    ]
+
+def _stage_timings(latencies: Dict[str, float]) -> Dict[str, float]:
+    """Measured per-stage milliseconds of an orchestration (span durations)"""
+    return {stage: round(ms, 1) for stage, ms in latencies.items()}
+
+def _collect_sources(passages: List[Dict[str, Any]]) -> List[str]:
+    """Unique passage sources in ranking order"""
+    sources: List[str] = []
+    for passage in passages:
+        source = passage.get("source")
+        if source and source not in sources:
+            sources.append(source)
+    return sources
+
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
@@ -221,11 +638,29 @@ async def root():
         "health": "/health"
     }
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.utcnow().isoformat()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 until services are built and the warm-up has run"""
+    ready = readiness["ready"] and orchestrator is not None
+    body = {
+        "status": "ready" if ready else "warming_up",
+        "timestamp": datetime.utcnow().isoformat(),
+        "steps": readiness["steps"],
+    }
+    return body if ready else JSONResponse(status_code=503, content=body)
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (use /health/live and /health/ready for probes)"""
+    ready = readiness["ready"] and orchestrator is not None
     return {
-        "status": "healthy",
+        "status": "healthy" if ready else "warming_up",
+        "ready": ready,
         "timestamp": datetime.utcnow().isoformat(),
         "version": "1.0.0",
         "services": {
@@ -255,16 +690,23 @@ async def initialize_session(request: SessionInitRequest):
         
         logger.info(f"📥 Session init request from user: {request.user_id}, niche: {request.niche}")
         
-        # Use chart data directly (already in JSON format from request)
         chart_json = request.chart_data.chart_json
         logger.info(f"✅ Chart received: {len(chart_json)} top-level keys")
         
+        # Parse (or fetch) the chart and its views; known charts skip all work
+        chart = await run_in_threadpool(_prepare_chart, chart_json, request.niche)
+        chart_factors = chart["chart_factors"]
+        
         # Create session (conv_manager generates its own session_id)
         session_id = conv_manager.create_session(
-            chart_data=json.dumps(chart_json),  # Convert to string
-            chart_factors=chart_json,  # Pass as dict
+            chart_data=None,  # Raw chart lives in the parsed-chart cache under chart_key
+            chart_factors=chart_factors,
             niche=request.niche,
-            user_id=request.user_id
+            user_id=request.user_id,
+            chart_views=chart["chart_views"],
+            chart_fingerprint=chart["chart_fingerprint"],
+            chart_key=chart["chart_key"],
+            dasha_timeline=chart["dasha_timeline"]
         )
         logger.info(f"✅ Session created: {session_id}")
         
@@ -278,7 +720,7 @@ async def initialize_session(request: SessionInitRequest):
         return SessionResponse(
             session_id=session_id,
             status="initialized",
-            message=f"Session ready. Chart keys: {len(chart_json)}. Latency: {latency}ms",
+            message=f"Session ready. Chart factors: {len(chart_factors)}. Latency: {latency}ms",
             niche=request.niche,
             timestamp=datetime.utcnow().isoformat()
         )
@@ -333,7 +775,7 @@ async def get_session_status(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v1/query", response_model=QueryResponse)
-async def process_query(request: QueryRequest):
+async def process_query(request: QueryRequest, background_tasks: BackgroundTasks):
     """
     Process a user question and generate AI answer.
     
@@ -360,37 +802,99 @@ async def process_query(request: QueryRequest):
         
         logger.info(f"❓ Query: {request.question[:60]}... | Mode: {request.mode} | Session: {request.session_id}")
         
-        # Process question through orchestrator
-        result = await orchestrator.process_question_async(
-            session_id=request.session_id,
+        # A new question makes any pending speculative expansion useless
+        if speculator:
+            speculator.cancel(request.session_id, reason="new_question")
+        
+        # Process question through orchestrator (blocking pipeline runs off the event loop)
+        conversation_history = conv_manager.get_conversation_context(request.session_id)
+        outcome = await run_in_threadpool(
+            orchestrator.answer_question,
             question=request.question,
-            mode=request.mode,
-            chart_data=session.get("chart_data"),
-            niche=session.get("niche")
+            chart_factors=session.get("chart_factors") or {},
+            chart_fingerprint=session.get("chart_fingerprint"),
+            chart_views=session.get("chart_views"),
+            dasha_timeline=session.get("dasha_timeline"),
+            niche=session.get("niche"),
+            conversation_history=conversation_history,
+            mode=request.mode
         )
         
         total_latency = int((time.time() - start_time) * 1000)
+        _observe_outcome(outcome, request.mode)
+        
+        # Persist retrieval artifacts so /query/expand can skip the pipeline
+        exchange = conv_manager.add_exchange(
+            session_id=request.session_id,
+            user_message=request.question,
+            assistant_response=outcome.response,
+            metadata={
+                "mode": request.mode,
+                "latency_ms": total_latency,
+                "complexity": outcome.complexity,
+                "passages_used": outcome.passages_used,
+            },
+            artifacts=outcome.to_artifacts()
+        )
         
         logger.info(f"✅ Answer generated in {total_latency}ms")
         
+        # Training data for the routing model: the routed track plus its observed outcome
+        # (passages used vs the track's limit here, an "expanded" event from /query/expand)
+        if config.ROUTING_MODEL_CONFIG.get("log_path"):
+            background_tasks.add_task(
+                append_routing_log,
+                config.ROUTING_MODEL_CONFIG["log_path"],
+                {
+                    "record_id": f"{request.session_id}:{exchange['turn']}" if exchange else None,
+                    "question": request.question,
+                    "complexity": outcome.complexity,
+                    "intent": outcome.classification.intent,
+                    "confidence": outcome.classification.confidence,
+                    "mode": request.mode,
+                    "latency_ms": total_latency,
+                    "passages_used": outcome.passages_used,
+                    "passage_limit": ROUTE_COSTS[outcome.complexity]["passages"],
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+            )
+        
+        # Speculatively expand once the draft response has been sent
+        if speculator and request.mode == "draft" and exchange:
+            background_tasks.add_task(
+                speculator.start,
+                session_id=request.session_id,
+                turn=exchange["turn"],
+                question=request.question,
+                chart_factors=session.get("chart_factors") or {},
+                chart_fingerprint=session.get("chart_fingerprint"),
+                artifacts=exchange["artifacts"],
+                niche=session.get("niche"),
+                conversation_history=conversation_history
+            )
+        
         return QueryResponse(
             session_id=request.session_id,
             question=request.question,
             mode=request.mode,
-            answer=result.get("response", ""),
-            sources=result.get("sources", []),
+            answer=outcome.response,
+            sources=_collect_sources(outcome.passages),
             performance={
                 "total_ms": total_latency,
-                "rag_ms": result.get("rag_latency_ms", 0),
-                "llm_ms": result.get("llm_latency_ms", 0),
-                "cache_hit": result.get("cache_hit", False)
+                "rag_ms": int(outcome.latencies.get("retrieval_ms", 0)),
+                "llm_ms": int(outcome.latencies.get("synthesis_ms", 0)),
+                "cache_hit": False,
+                "prompt_tokens": outcome.usage.get("prompt_tokens", 0),
+                "cached_tokens": outcome.usage.get("cached_tokens", 0),
+                "stages_ms": _stage_timings(outcome.latencies),
+                "trace_id": current_trace_id()
             },
             metadata={
-                "rag_passages": result.get("rag_passages_count", 0),
-                "complexity": result.get("complexity", "UNKNOWN"),
+                "rag_passages": outcome.passages_used,
+                "complexity": outcome.complexity,
                 "niche": session.get("niche"),
                 "model": "openai/gpt-4o-mini",
-                "confidence": result.get("confidence", 0.0)
+                "confidence": outcome.classification.confidence
             }
         )
         
@@ -403,13 +907,16 @@ async def process_query(request: QueryRequest):
         raise HTTPException(status_code=500, detail=f"Query processing failed: {str(e)}")
 
 @app.post("/api/v1/query/expand")
-async def expand_previous_answer(session_id: str):
+async def expand_previous_answer(session_id: str, background_tasks: BackgroundTasks):
     """
     Expand the last draft answer into detailed version.
     
-    Reuses RAG cache for faster response (~2-3s).
+    Reuses the draft's stored retrieval artifacts (classification, chart focus,
+    queries, passages) and only runs the expand-mode synthesis (~2-3s).
     """
     try:
+        start_time = time.time()
+        
         if not conv_manager or not orchestrator:
             raise HTTPException(status_code=503, detail="Services not initialized")
         
@@ -419,33 +926,87 @@ async def expand_previous_answer(session_id: str):
             raise HTTPException(status_code=404, detail="No previous query found in session")
         
         last_exchange = history[-1]
-        last_question = last_exchange.get("question")
+        last_question = last_exchange.get("user_message")
         
         if not last_question:
             raise HTTPException(status_code=400, detail="Cannot expand: no valid previous question")
         
         session = conv_manager.get_session(session_id)
+        artifacts = last_exchange.get("artifacts")
+        prior_history = history[:-1][-5:]
+        
+        # Precomputed (or in-flight) speculative expansion of this exchange
+        outcome, speculative = None, None
+        if speculator:
+            outcome, speculative = await speculator.claim(session_id, last_exchange.get("turn"))
         
-        # Re-run in expand mode
-        result = await orchestrator.process_question_async(
+        if outcome is None and artifacts:
+            outcome = await run_in_threadpool(
+                orchestrator.expand_from_artifacts,
+                question=last_question,
+                chart_factors=session.get("chart_factors") or {},
+                chart_fingerprint=session.get("chart_fingerprint"),
+                artifacts=artifacts,
+                niche=session.get("niche"),
+                conversation_history=prior_history
+            )
+        elif outcome is None:
+            # Exchange predates artifact persistence - re-run the full pipeline
+            outcome = await run_in_threadpool(
+                orchestrator.answer_question,
+                question=last_question,
+                chart_factors=session.get("chart_factors") or {},
+                chart_fingerprint=session.get("chart_fingerprint"),
+                chart_views=session.get("chart_views"),
+                dasha_timeline=session.get("dasha_timeline"),
+                niche=session.get("niche"),
+                conversation_history=prior_history,
+                mode="expand"
+            )
+        
+        total_latency = int((time.time() - start_time) * 1000)
+        _observe_outcome(outcome, "expand")
+        
+        # Routing-model outcome: the user wanted more than the routed track's answer
+        if config.ROUTING_MODEL_CONFIG.get("log_path") and last_exchange.get("turn") is not None:
+            background_tasks.add_task(
+                append_routing_log,
+                config.ROUTING_MODEL_CONFIG["log_path"],
+                {
+                    "record_id": f"{session_id}:{last_exchange['turn']}",
+                    "expanded": True,
+                    "expanded_at": datetime.utcnow().isoformat()
+                }
+            )
+        
+        conv_manager.add_exchange(
             session_id=session_id,
-            question=last_question,
-            mode="expand",
-            chart_data=session.get("chart_data"),
-            niche=session.get("niche"),
-            use_cache=True  # Reuse RAG cache
+            user_message=last_question,
+            assistant_response=outcome.response,
+            metadata={
+                "mode": "expand",
+                "latency_ms": total_latency,
+                "complexity": outcome.complexity,
+                "passages_used": outcome.passages_used,
+            },
+            artifacts=outcome.to_artifacts()
         )
         
         return {
             "session_id": session_id,
             "question": last_question,
             "mode": "expand",
-            "answer": result.get("response", ""),
-            "sources": result.get("sources", []),
+            "answer": outcome.response,
+            "sources": _collect_sources(outcome.passages),
             "performance": {
-                "total_ms": result.get("total_latency_ms", 0),
-                "llm_ms": result.get("llm_latency_ms", 0),
-                "cache_reused": True
+                "total_ms": total_latency,
+                "llm_ms": int(outcome.latencies.get("synthesis_ms", 0)),
+                "cache_reused": bool(artifacts),
+                "speculative": speculative,
+                "prompt_tokens": outcome.usage.get("prompt_tokens", 0),
+                "cached_tokens": outcome.usage.get("cached_tokens", 0),
+                "stages_ms": _stage_timings(outcome.latencies),
+                "trace_id": current_trace_id()
             }
         }
         
@@ -469,6 +1030,10 @@ async def delete_session(session_id: str):
         # Delete from conversation manager
         conv_manager.delete_session(session_id)
         
+        # Stop any background expansion for this session
+        if speculator:
+            speculator.cancel(session_id, reason="session_deleted")
+        
         # Clear RAG cache if preloader exists
         if preloader:
             preloader.clear_cache(session_id)
@@ -486,6 +1051,39 @@ async def delete_session(session_id: str):
         logger.error(f"❌ Delete failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/speculation/stats")
+async def speculation_stats():
+    """Speculative expansion hit rate and wasted-token counters"""
+    if not speculator:
+        return {"enabled": False}
+    return {"enabled": True, **speculator.get_stats()}
+
+@app.get("/api/v1/sessions/stats")
+async def session_stats():
+    """Live session count plus LRU eviction and TTL expiry counters"""
+    if not conv_manager:
+        raise HTTPException(status_code=503, detail="Service not available")
+    return conv_manager.get_stats()
+
+@app.get("/api/v1/startup/stats")
+async def startup_stats():
+    """Milliseconds spent importing modules and in each service-initialization phase"""
+    return {"phases_ms": startup_timings}
+
+@app.get("/api/v1/usage/stats")
+async def usage_stats():
+    """Cumulative LLM token usage, including prompt tokens served from the provider prefix cache"""
+    if not orchestrator:
+        raise HTTPException(status_code=503, detail="Orchestrator not initialized")
+    return orchestrator.synthesizer.get_usage_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (per process; each prefork worker reports its own)"""
+    return PlainTextResponse(
+        metrics.render(collectors=[_collect_threadpool_metrics]), media_type=METRICS_CONTENT_TYPE
+    )
+
 @app.get("/api/v1/niches")
 async def list_niches():
     """List available astrology niches"""
@@ -544,7 +1142,6 @@ async def global_exception_handler(request: Request, exc: Exception):
 # STARTUP/SHUTDOWN
 # ============================================================================
 
-@app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
     logger.info("=" * 70)
@@ -559,6 +1156,12 @@ async def startup_event():
     logger.info(f"🤖 LLM: openai/gpt-4o-mini (via OpenRouter)")
     logger.info("=" * 70)
     
+    tracing_config = config.TRACING_CONFIG
+    configure_tracing(
+        tracing_config.get("exporter", "none"),
+        path=tracing_config.get("file_path", "traces.jsonl"),
+        service_name=tracing_config.get("service_name", "astroairk-api")
+    )
     success = initialize_services()
     
     if success:
@@ -570,10 +1173,47 @@ async def startup_event():
     else:
         logger.error("❌ Service initialization failed!")
 
-@app.on_event("shutdown")
+async def _sweep_sessions(interval_seconds: float):
+    """Purge expired sessions every ``interval_seconds`` instead of on access only"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        if not conv_manager:
+            continue
+        try:
+            await run_in_threadpool(conv_manager.cleanup_expired_sessions)
+            if speculator:
+                speculator.prune()
+        except Exception as e:
+            logger.warning(f"⚠️ Session sweep failed: {e}")
+
+async def _warm_up():
+    """Run the warm-up off the event loop; /health/ready flips when it is done"""
+    if orchestrator is None:
+        return
+    if not config.WARMUP_CONFIG.get("enabled", True):
+        readiness["ready"] = True
+        return
+    try:
+        await run_in_threadpool(warm_up_services)
+    except Exception as e:
+        logger.error(f"❌ Warm-up failed: {e}")
+        readiness["steps"]["warmup"] = {"status": "failed", "error": str(e)}
+
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("👋 Shutting down AstroAirk API...")
+    readiness["ready"] = False
+    snapshot_path = config.WARMUP_CONFIG.get("cache_snapshot_path")
+    if snapshot_path and chart_cache:
+        try:
+            chart_cache.save_snapshot(snapshot_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache snapshot not saved: {e}")
+    if speculator:
+        speculator.shutdown()
+    if conv_manager:
+        conv_manager.store.close()
+    shutdown_tracing()
 
 # ============================================================================
 # MAIN ENTRY POINT
@@ -582,6 +1222,18 @@ async def shutdown_event():
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8080))
     
+    if config.WORKERS > 1:
+        if config.SESSION_CONFIG.get("backend", "memory") == "memory":
+            # In-memory sessions are per worker: a session created on one would 404 on the others.
+            # Workers fork after this, so they all open the same SQLite file instead.
+            config.SESSION_CONFIG["backend"] = "sqlite"
+            logger.warning(
+                f"⚠️ SESSION_BACKEND=memory cannot be shared by {config.WORKERS} workers; "
+                f"using sqlite at {config.SESSION_CONFIG['sqlite_path']} (set SESSION_BACKEND=redis to share across hosts)"
+            )
+        prefork_serve(app, port=port, workers=config.WORKERS, preload=preload_shared_data)
+        sys.exit(0)
+    
     logger.info(f"Starting uvicorn server on port {port}...")
     
     uvicorn.run(
@@ -0,0 +1,88 @@
+"""
+Microbenchmark: cost of building chart-dependent cache keys per request.
+
+Before: every question re-normalized and JSON-hashed the whole chart for the
+chart-focus key, and JSON-hashed the focus list for the chart-section key.
+After: the chart fingerprint is computed once per session and each request
+only formats short string keys.
+
+Usage:
+    python -m benchmarks.chart_key_bench [--factors 150] [--iterations 2000]
+"""
+
+import argparse
+import hashlib
+import json
+import timeit
+from typing import Any, Dict, List
+
+from agents.openrouter_synthesizer import OpenRouterSynthesizer
+from agents.smart_orchestrator import SmartOrchestrator
+from utils.chart_fingerprint import compute_chart_fingerprint
+
+NICHE_INSTRUCTION = "Love & Relationships: focus on 7th house, Venus, D9 and running dashas. " * 4
+
+
+def build_chart(factor_count: int) -> Dict[str, Any]:
+    """Synthetic chart shaped like the parser output (flat factors + nested dasha tree)."""
+    planets = ["Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn", "Rahu", "Ketu"]
+    chart: Dict[str, Any] = {}
+    for index in range(factor_count):
+        planet = planets[index % len(planets)]
+        chart[f"D{index % 12 + 1}_{planet}_{index}"] = f"{planet} in house {index % 12 + 1}, nakshatra pada {index % 4 + 1}"
+    chart["Vimshottari_Dasha"] = {
+        planet: {"start": f"20{10 + i}-01-01", "end": f"20{11 + i}-01-01", "antardashas": {p: f"20{10 + i}-0{j % 9 + 1}-01" for j, p in enumerate(planets)}}
+        for i, planet in enumerate(planets)
+    }
+    return chart
+
+
+def _legacy_normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _legacy_normalize(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple, set)):
+        return [_legacy_normalize(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def legacy_keys(chart: Dict[str, Any], focus: List[str]) -> None:
+    """Per-request key building as it was before fingerprints."""
+    payload = {"niche": "love", "limit": 80, "chart": _legacy_normalize(chart)}
+    hashlib.sha1(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+    section = {"complexity": "MODERATE", "focus": focus}
+    hashlib.sha1(json.dumps(section, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factors", type=int, default=150)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    chart = build_chart(args.factors)
+    focus = [f"{key}: {value}" for key, value in list(chart.items())[:80]]
+    synthesizer = OpenRouterSynthesizer(api_key="benchmark")
+    orchestrator = SmartOrchestrator.__new__(SmartOrchestrator)  # key helpers need no clients
+    fingerprint = compute_chart_fingerprint(chart)
+
+    def fingerprint_keys() -> None:
+        orchestrator._chart_focus_cache_key(fingerprint, "love", 80)
+        synthesizer._chart_section_cache_key(focus, chart, "MODERATE", fingerprint, NICHE_INSTRUCTION)
+
+    n = args.iterations
+    before = timeit.timeit(lambda: legacy_keys(chart, focus), number=n) / n * 1e6
+    after = timeit.timeit(fingerprint_keys, number=n) / n * 1e6
+    once = timeit.timeit(lambda: compute_chart_fingerprint(chart), number=max(1, n // 10)) / max(1, n // 10) * 1e6
+
+    print(f"Chart: {len(chart)} top-level factors, {len(json.dumps(chart))} bytes serialized")
+    print(f"{'variant':<36}{'µs/request':>12}")
+    print(f"{'before (re-hash chart per request)':<36}{before:>12.1f}")
+    print(f"{'after (session fingerprint)':<36}{after:>12.1f}")
+    print(f"{'fingerprint, once per session':<36}{once:>12.1f}")
+    print(f"speedup per request: {before / after:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
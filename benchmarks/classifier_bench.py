@@ -0,0 +1,143 @@
+"""
+Benchmark: single-pass QuestionComplexityClassifier vs the per-pattern loop.
+
+The legacy implementation ran ``re.search`` over every pattern string in
+precedence order. The compiled classifier answers with one ``match`` call.
+This benchmark replays a fixture of questions through both, fails if any
+decision (complexity, intent, confidence, reasoning) differs, and reports
+per-question latency.
+
+Usage:
+    python -m benchmarks.classifier_bench [--repeat 5]
+    python -m benchmarks.classifier_bench --write-fixture   # regenerate the fixture
+"""
+
+import argparse
+import itertools
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from agents.question_complexity import ClassificationResult, QuestionComplexityClassifier
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "questions.txt"
+
+_SUBJECTS = ["spouse", "partner", "wife", "husband", "boss", "career", "job", "business", "marriage", "child"]
+_TEMPLATES = [
+    "How will my {s} look?",
+    "What does my future {s} look like physically?",
+    "Describe the personality of my {s}",
+    "What kind of {s} will I have?",
+    "When will I marry?",
+    "When will I meet my {s}?",
+    "Is the timing favourable for marriage soon?",
+    "What career suits me best?",
+    "Will my business grow this year?",
+    "What job should I take?",
+    "What are my strengths and weaknesses?",
+    "Is this a good period for my {s}?",
+    "Compare my D1 and D9 charts for {s}",
+    "Cross-check the charts and methods for my {s} prospects",
+    "My D9 says one thing but D1 shows another, why do they contradict?",
+    "However the dasha indicates delay, what does the chart say?",
+    "Give me detailed timing with exact months for my {s}",
+    "Use three methods to pinpoint specific dates for marriage",
+    "When does my Saturn transit end?",
+    "Which dasha is running now?",
+    "What happens in the month of March?",
+    "Tell me about my {s}",
+    "Should I worry about my {s}?",
+    "Is there any yoga for wealth?",
+    "What remedies help Venus?",
+    "Explain my 7th house",
+    "",
+]
+_PREFIXES = ["", "Hi! ", "Namaste. ", "Quick question: ", "  ", "Please tell me:\n"]
+_SUFFIXES = ["", " Thanks!", "?", " I'm curious.", "\nAlso how is my health?", " And when?"]
+
+
+def build_fixture(count: int = 5000, seed: int = 7) -> List[str]:
+    """Deterministic mix of templated questions with casing/whitespace noise."""
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        text = rng.choice(_TEMPLATES).format(s=rng.choice(_SUBJECTS))
+        text = rng.choice(_PREFIXES) + text + rng.choice(_SUFFIXES)
+        if rng.random() < 0.2:
+            text = text.upper()
+        questions.append(text)
+    return questions
+
+
+def load_fixture() -> List[str]:
+    with FIXTURE_PATH.open(encoding="utf-8") as handle:
+        return [line.rstrip("\n").replace("\\n", "\n") for line in handle]
+
+
+def legacy_classify(question: str) -> ClassificationResult:
+    """The pre-compilation algorithm, verbatim, over the same pattern tables."""
+    cls = QuestionComplexityClassifier
+    normalized = question.strip().lower()
+    if not normalized:
+        return ClassificationResult("SIMPLE", "general", 0.5, "Empty question defaults to SIMPLE")
+    for intent, patterns in cls._COMPLEX_PATTERNS.items():
+        if any(re.search(pattern, normalized) for pattern in patterns):
+            return ClassificationResult("COMPLEX", intent, 0.9, f"Matched complex pattern: {intent}")
+    for intent, patterns in cls._SIMPLE_PATTERNS.items():
+        if any(re.search(pattern, normalized) for pattern in patterns):
+            return ClassificationResult("SIMPLE", intent, 0.85, f"Matched simple pattern: {intent}")
+    intent = "timing" if any(re.search(pat, normalized) for pat in cls._TIMING_HINTS) else "general"
+    return ClassificationResult("MODERATE", intent, 0.7, "Defaulted to MODERATE based on keywords")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--write-fixture", action="store_true")
+    args = parser.parse_args()
+
+    if args.write_fixture:
+        FIXTURE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        FIXTURE_PATH.write_text("\n".join(q.replace("\n", "\\n") for q in build_fixture()) + "\n", encoding="utf-8")
+        print(f"Wrote {FIXTURE_PATH}")
+        return 0
+
+    questions = load_fixture()
+    classifier = QuestionComplexityClassifier()
+
+    mismatches = [
+        (q, old, new)
+        for q, old, new in zip(questions, map(legacy_classify, questions), map(classifier.classify, questions))
+        if old != new
+    ]
+    if mismatches:
+        for question, old, new in mismatches[:10]:
+            print(f"MISMATCH {question!r}: legacy={old} compiled={new}")
+        print(f"{len(mismatches)} / {len(questions)} decisions differ")
+        return 1
+
+    def timed(fn) -> float:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        return (time.perf_counter() - start) / (args.repeat * len(questions)) * 1e6
+
+    legacy = timed(lambda: [legacy_classify(q) for q in questions])
+    compiled = timed(lambda: [classifier.classify(q) for q in questions])
+    batched = timed(lambda: classifier.classify_many(questions))
+
+    counts = {}
+    for result in classifier.classify_many(questions):
+        counts[result.complexity] = counts.get(result.complexity, 0) + 1
+    print(f"{len(questions)} questions, all decisions identical ({counts})")
+    print(f"{'variant':<26}{'µs/question':>12}")
+    for name, value in (("legacy per-pattern search", legacy), ("compiled classify", compiled), ("classify_many", batched)):
+        print(f"{name:<26}{value:>12.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+End-to-end latency benchmark on local backend stand-ins (no Vertex, no OpenRouter).
+
+Runs real questions through the real pipeline. Only the network calls are
+served by benchmarks.standins:
+* a fake OpenAI-compatible LLM server
+* a hash embedder
+* a synthetic RAG corpus
+
+Latencies are sampled from configurable distributions. Two targets:
+
+    orchestrator - SmartOrchestrator.answer_question from a thread pool
+    app          - the FastAPI app in-process (session init, then POST /api/v1/query)
+
+Per-stage p50/p95/p99 come from the measured span timings of every request.
+A stage that did not run (0.0) is left out. The results are checked against
+config.PERFORMANCE_TARGETS:
+
+    total_ms, request_ms   p50/p95/p99 vs p50/p95/p99_latency_ms
+    embedding_ms           p95 vs embedding_target_ms
+    rag_call_ms            p95 vs search_target_ms
+    synthesis_ms           p95 vs synthesis_target_ms
+    overhead_ms            p95 vs orchestrator_target_ms (total minus retrieval and synthesis)
+
+Exits non-zero when:
+* a request fails
+* --enforce-targets is set and a target is missed
+* a stage's p95 regressed against --baseline by more than --max-regression
+  (and by at least --min-regression-ms)
+
+Usage:
+    python -m benchmarks.e2e_bench [--target orchestrator|app] [--requests 40] [--concurrency 4]
+        [--retriever rag_engine|vector_search] [--time-scale 1.0]
+        [--llm-first-token 900:2500] [--llm-token-ms 6] [--output-tokens 350]
+        [--embed-latency 40:120] [--rag-latency 180:450]
+        [--save-baseline FILE] [--baseline FILE] [--max-regression 0.2] [--enforce-targets]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from agents.chart_schema import parse_chart_json
+from benchmarks.session_memory_bench import build_chart
+from benchmarks.standins import FakeLLMServer, LatencyModel, build_orchestrator
+from niche_config import NICHE_FACTOR_MAP
+from utils.chart_fingerprint import compute_chart_fingerprint
+from utils.dasha_timeline import DashaTimeline
+
+QUESTIONS = os.path.join(os.path.dirname(__file__), "fixtures", "questions.txt")
+
+# stage -> [(percentile, PERFORMANCE_TARGETS key)]
+TARGETS: Dict[str, List[Tuple[str, str]]] = {
+    "total_ms": [("p50", "p50_latency_ms"), ("p95", "p95_latency_ms"), ("p99", "p99_latency_ms")],
+    "request_ms": [("p50", "p50_latency_ms"), ("p95", "p95_latency_ms"), ("p99", "p99_latency_ms")],
+    "embedding_ms": [("p95", "embedding_target_ms")],
+    "rag_call_ms": [("p95", "search_target_ms")],
+    "synthesis_ms": [("p95", "synthesis_target_ms")],
+    "overhead_ms": [("p95", "orchestrator_target_ms")],
+}
+
+Workload = List[Dict[str, Any]]
+
+
+def build_workload(requests: int, charts: int, seed: int) -> Workload:
+    """Questions from the fixture set spread over ``charts`` charts and the niches"""
+    with open(QUESTIONS, encoding="utf-8") as handle:
+        questions = [line.strip() for line in handle if len(line.strip()) >= 8]
+    rng = random.Random(seed)
+    niches = list(NICHE_FACTOR_MAP)
+    return [
+        {"question": question, "chart": index % charts, "niche": niches[index % len(niches)]}
+        for index, question in enumerate(rng.sample(questions, min(requests, len(questions))))
+    ]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Linear-interpolated percentile of ``values`` (fraction in 0..1)"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(samples: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """stage -> {n, p50, p95, p99} over the stages that ran"""
+    values: Dict[str, List[float]] = {}
+    for sample in samples:
+        sample = dict(sample)
+        if "total_ms" in sample:
+            sample["overhead_ms"] = max(
+                0.0, sample["total_ms"] - sample.get("retrieval_ms", 0.0) - sample.get("synthesis_ms", 0.0)
+            )
+        for stage, ms in sample.items():
+            if ms:
+                values.setdefault(stage, []).append(ms)
+    return {
+        stage: {
+            "n": len(series),
+            "p50": percentile(series, 0.50),
+            "p95": percentile(series, 0.95),
+            "p99": percentile(series, 0.99),
+        }
+        for stage, series in values.items()
+    }
+
+
+# ============================================================================
+# RUNNERS
+# ============================================================================
+
+def warm_up(orchestrator) -> None:
+    """What api_main.warm_up_services does before /health/ready passes (untimed)"""
+    templates = orchestrator.query_templates(config.WARMUP_CONFIG.get("templates_per_niche", 2))
+    hot_queries = [query for queries in templates.values() for query in queries]
+    orchestrator.synthesizer.warm_up()
+    orchestrator.embedder.warm_up(hot_queries)
+    orchestrator.warm_up_retrieval(hot_queries[0])
+
+
+def _chart_context(orchestrator, chart_seed: int, niche: str) -> Dict[str, Any]:
+    """What api_main._prepare_chart stores on a session"""
+    factors = parse_chart_json(build_chart(chart_seed))
+    fingerprint = compute_chart_fingerprint(factors)
+    timeline = DashaTimeline.from_factors(factors)
+    views = orchestrator.compile_chart_views(factors, niche, chart_fingerprint=fingerprint, dasha_timeline=timeline)
+    return {"chart_factors": factors, "chart_fingerprint": fingerprint, "chart_views": views, "dasha_timeline": timeline}
+
+
+def run_orchestrator(orchestrator, workload: Workload, concurrency: int, mode: str) -> Tuple[List[Dict[str, float]], int]:
+    contexts = {
+        key: _chart_context(orchestrator, *key) for key in {(item["chart"], item["niche"]) for item in workload}
+    }
+
+    def one(item: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        started = time.perf_counter()
+        try:
+            outcome = orchestrator.answer_question(
+                question=item["question"], niche=item["niche"], mode=mode, **contexts[(item["chart"], item["niche"])]
+            )
+        except Exception as e:
+            logging.error(f"❌ Request failed: {e}")
+            return None
+        return {**outcome.latencies, "request_ms": (time.perf_counter() - started) * 1000}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, workload))
+    return [r for r in results if r is not None], sum(r is None for r in results)
+
+
+async def run_app(orchestrator, workload: Workload, concurrency: int, mode: str) -> Tuple[List[Dict[str, float]], int]:
+    import httpx
+
+    import api_main
+
+    # Stand-ins are swapped in after start-up, so skip warming the real clients
+    config.WARMUP_CONFIG["enabled"] = False
+    async with api_main.lifespan(api_main.app):
+        api_main.orchestrator = orchestrator
+        if api_main.speculator:
+            api_main.speculator.orchestrator = orchestrator
+        transport = httpx.ASGITransport(app=api_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            sessions = {}
+            for chart_seed, niche in {(item["chart"], item["niche"]) for item in workload}:
+                response = await client.post("/api/v1/session/init", json={
+                    "user_id": f"bench-{chart_seed}",
+                    "niche": niche,
+                    "chart_data": {
+                        "birth_time": "1995-06-15 14:30:00",
+                        "birth_place": "Mumbai, India",
+                        "latitude": 19.076,
+                        "longitude": 72.8777,
+                        "chart_json": build_chart(chart_seed),
+                    },
+                })
+                response.raise_for_status()
+                sessions[(chart_seed, niche)] = response.json()["session_id"]
+
+            limit = asyncio.Semaphore(concurrency)
+
+            async def one(item: Dict[str, Any]) -> Optional[Dict[str, float]]:
+                async with limit:
+                    started = time.perf_counter()
+                    response = await client.post("/api/v1/query", json={
+                        "session_id": sessions[(item["chart"], item["niche"])],
+                        "question": item["question"],
+                        "mode": mode,
+                    })
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                if response.status_code != 200:
+                    logging.error(f"❌ Request failed: {response.status_code} {response.text[:200]}")
+                    return None
+                return {**response.json()["performance"]["stages_ms"], "request_ms": elapsed_ms}
+
+            results = await asyncio.gather(*(one(item) for item in workload))
+    return [r for r in results if r is not None], sum(r is None for r in results)
+
+
+# ============================================================================
+# CHECKS
+# ============================================================================
+
+def target_misses(summary: Dict[str, Dict[str, float]]) -> List[str]:
+    misses = []
+    for stage, checks in TARGETS.items():
+        for quantile, key in checks:
+            target = config.PERFORMANCE_TARGETS.get(key)
+            if stage in summary and target is not None and summary[stage][quantile] > target:
+                misses.append(f"{stage} {quantile} {summary[stage][quantile]:.0f}ms > {key} {target}ms")
+    return misses
+
+
+def regressions(summary: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                max_regression: float, min_regression_ms: float) -> List[str]:
+    found = []
+    for stage, stats in summary.items():
+        before = baseline.get(stage)
+        if not before:
+            continue
+        growth = stats["p95"] - before["p95"]
+        if growth > min_regression_ms and stats["p95"] > before["p95"] * (1 + max_regression):
+            found.append(f"{stage} p95 {before['p95']:.1f}ms -> {stats['p95']:.1f}ms (+{growth / before['p95']:.0%})")
+    return found
+
+
+def _target_label(stage: str) -> str:
+    return " ".join(
+        f"{quantile}<={config.PERFORMANCE_TARGETS[key]}" for quantile, key in TARGETS.get(stage, [])
+        if key in config.PERFORMANCE_TARGETS
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["orchestrator", "app"], default="orchestrator")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--mode", choices=["draft", "expand"], default="draft")
+    parser.add_argument("--charts", type=int, default=4, help="distinct charts the questions are spread over")
+    parser.add_argument("--retriever", choices=["rag_engine", "vector_search"], default="rag_engine")
+    parser.add_argument("--corpus-size", type=int, default=500)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiply every stand-in latency")
+    parser.add_argument("--llm-first-token", default="900:2500", help="median:p95 ms")
+    parser.add_argument("--llm-token-ms", type=float, default=6.0, help="generation ms per output token")
+    parser.add_argument("--output-tokens", type=int, default=350)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--embed-latency", default="40:120", help="median:p95 ms per embedding request")
+    parser.add_argument("--rag-latency", default="180:450", help="median:p95 ms per corpus query")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--enforce-targets", action="store_true", help="fail when a PERFORMANCE_TARGETS entry is missed")
+    parser.add_argument("--baseline", help="results JSON from --save-baseline to compare p95s against")
+    parser.add_argument("--max-regression", type=float, default=0.20, help="allowed relative p95 growth")
+    parser.add_argument("--min-regression-ms", type=float, default=5.0, help="ignore smaller absolute p95 growth")
+    parser.add_argument("--save-baseline", help="write the results JSON here")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, force=True)
+    for name in ("agents", "utils", "api_main", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    scale = args.time_scale
+    server = FakeLLMServer(
+        LatencyModel.parse(args.llm_first_token, scale, args.seed),
+        token_ms=args.llm_token_ms * scale,
+        output_tokens=args.output_tokens,
+        error_rate=args.llm_error_rate,
+        seed=args.seed,
+    ).start()
+    try:
+        orchestrator = build_orchestrator(
+            server.api_base,
+            retriever=args.retriever,
+            embed_latency=LatencyModel.parse(args.embed_latency, scale, args.seed + 1),
+            rag_latency=LatencyModel.parse(args.rag_latency, scale, args.seed + 2),
+            corpus_size=args.corpus_size,
+        )
+        warm_up(orchestrator)
+        workload = build_workload(args.requests, args.charts, args.seed)
+        started = time.perf_counter()
+        if args.target == "app":
+            samples, failed = asyncio.run(run_app(orchestrator, workload, args.concurrency, args.mode))
+        else:
+            samples, failed = run_orchestrator(orchestrator, workload, args.concurrency, args.mode)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.stop()
+
+    summary = summarize(samples)
+    print(f"\n{args.target}: {len(samples)} ok, {failed} failed, concurrency {args.concurrency}, "
+          f"{len(samples) / elapsed:.2f} req/s, time scale {scale}, retriever {args.retriever}")
+    print(f"LLM stand-in: {server.stats}")
+    print(f"\n{'stage':<22}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}   target (ms)")
+    for stage in sorted(summary, key=lambda name: -summary[name]["p95"]):
+        stats = summary[stage]
+        print(f"{stage:<22}{stats['n']:>5}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}"
+              f"   {_target_label(stage)}")
+
+    failures = [f"{failed} requests failed"] if failed else []
+    misses = target_misses(summary)
+    if misses:
+        print("\nTargets missed:\n  " + "\n  ".join(misses))
+        if args.enforce_targets:
+            failures.extend(misses)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)["stages"]
+        failures.extend(regressions(summary, baseline, args.max_regression, args.min_regression_ms))
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as handle:
+            json.dump({"args": vars(args), "throughput_rps": len(samples) / elapsed, "stages": summary}, handle, indent=2)
+
+    if failures:
+        print("\nREGRESSION:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Import-time regression benchmark for cold starts.
+
+Imports each target module in fresh interpreters with ``-X importtime`` and
+reports the median cumulative import time and the heaviest dependencies.
+Exits non-zero on a regression:
+
+* a deferred SDK (google.genai, vertexai, google.cloud.aiplatform) is
+  imported eagerly again, or
+* the median import time of a target exceeds ``--budget-ms``
+
+Cloud SDKs are imported when services are initialized, not when the API
+module loads. Before this split, ``import api_main`` took ~4s here, with ~3s
+of it in vertexai/aiplatform and google.genai.
+
+Usage:
+    python -m benchmarks.import_bench [--runs 5] [--budget-ms 2500] [--targets api_main agents.smart_orchestrator]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFERRED_SDKS = ("google.genai", "vertexai", "google.cloud.aiplatform")
+
+
+def import_profile(module: str) -> Dict[str, Tuple[int, int]]:
+    """{imported module: (self µs, cumulative µs)} for one fresh-interpreter import ("" = bare start)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(own), int(cumulative))
+    return profile
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=["api_main", "agents.smart_orchestrator", "agents.chart_schema"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if a target's median exceeds this")
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    failures: List[str] = []
+    interpreter_startup = set(import_profile(""))  # site, encodings, ... - not the target's cost
+    for target in args.targets:
+        profiles = [import_profile(target) for _ in range(args.runs)]
+        totals = [profile[target][1] / 1000 for profile in profiles]
+        median = statistics.median(totals)
+        print(f"\n{target}: median {median:.0f}ms (min {min(totals):.0f}, max {max(totals):.0f}, {args.runs} runs)")
+
+        last = profiles[-1]
+        top_level = [
+            (name, cumulative) for name, (_, cumulative) in last.items()
+            if name != target and "." not in name and name not in interpreter_startup
+        ]
+        heaviest = sorted(top_level, key=lambda item: -item[1])[: args.top]
+        for name, cumulative in heaviest:
+            print(f"    {cumulative / 1000:>8.0f}ms  {name}")
+
+        eager = sorted({name for name in last for sdk in DEFERRED_SDKS if name == sdk or name.startswith(sdk + ".")})
+        if eager:
+            roots = sorted({sdk for sdk in DEFERRED_SDKS if any(n == sdk or n.startswith(sdk + ".") for n in eager)})
+            failures.append(f"{target} imports deferred SDKs eagerly: {', '.join(roots)}")
+        if args.budget_ms is not None and median > args.budget_ms:
+            failures.append(f"{target} median {median:.0f}ms exceeds budget {args.budget_ms:.0f}ms")
+
+    if failures:
+        print("\nREGRESSION:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK: no deferred SDK imported at module load")
+
+
+if __name__ == "__main__":
+    main()
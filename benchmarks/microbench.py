@@ -0,0 +1,233 @@
+"""
+CPU hot-path microbenchmarks with stored regression baselines.
+
+Times the local, per-request code between the network calls with realistic
+fixtures:
+* a 150-factor chart (schema-parsed D1 + D9 + dasha, plus lords, nakshatras
+  and divisional placements)
+* 30 and 120 retrieved passages
+* a 20-turn history with long answers
+
+Cases:
+    rerank/30, rerank/120          FastReranker.rerank (top 3, tokenizations cached on the passages)
+    rerank/120/cold                FastReranker.rerank with the passage term cache cleared
+    rerank_many/4x120              FastReranker.rerank_many, 4 queries sharing one candidate set
+    chart_focus/cold, /cached      SmartOrchestrator._format_chart_focus (COMPLEX limit)
+    normalize_passages/120         SmartOrchestrator._normalize_passages
+    select_passages/30, /120       OpenRouterSynthesizer._select_classical_passages (COMPLEX)
+    chart_section/cold             OpenRouterSynthesizer._format_chart_section
+    build_prompt/expand            OpenRouterSynthesizer._build_prompt (long history)
+    classify                       QuestionComplexityClassifier.classify over the fixture questions
+    chart_bucket                   CacheManager.compute_chart_bucket
+
+Each case reports the median µs per call over ``--repeat`` timed batches.
+``benchmarks/fixtures/microbench_baseline.json`` holds the accepted numbers
+plus a pure-Python calibration loop. Baselines are rescaled by the
+calibration ratio, so a slower machine does not read as a regression. A case
+fails when it is more than ``--threshold`` slower than its rescaled baseline
+and at least ``--min-delta-us`` slower.
+
+Usage:
+    python -m benchmarks.microbench [--filter rerank] [--repeat 7] [--threshold 0.5]
+    python -m benchmarks.microbench --update-baseline      # accept the current numbers
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import statistics
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from agents.chart_schema import parse_chart_json
+from agents.fast_reranker import TERMS_KEY, FastReranker
+from agents.openrouter_synthesizer import OpenRouterSynthesizer
+from agents.question_complexity import QuestionComplexityClassifier
+from agents.smart_orchestrator import SmartOrchestrator
+from benchmarks.session_memory_bench import build_chart
+from benchmarks.standins import FakeCorpus
+from utils.cache_manager import CacheManager
+from utils.chart_fingerprint import compute_chart_fingerprint
+from utils.dasha_timeline import DashaTimeline
+
+FIXTURES = Path(__file__).parent / "fixtures"
+BASELINE_PATH = FIXTURES / "microbench_baseline.json"
+NICHE = "Love & Relationships"
+QUESTION = "When will I get married and what will my spouse be like? Please give timing with dashas."
+
+_PLANETS = ["sun", "moon", "mars", "mercury", "jupiter", "venus", "saturn", "rahu", "ketu"]
+_SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo", "Libra", "Scorpio",
+          "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
+_NAKSHATRAS = ["Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra", "Punarvasu", "Pushya", "Ashlesha"]
+
+
+def build_factors(count: int = 150, seed: int = 7) -> Dict[str, Any]:
+    """Schema-parsed chart padded with realistic derived factors up to ``count`` keys"""
+    factors = parse_chart_json(build_chart(seed))
+    extras = []
+    for house in range(1, 13):
+        suffix = {1: "st", 2: "nd", 3: "rd"}.get(house, "th")
+        extras.append((f"{house}{suffix}_lord", _PLANETS[(house + seed) % 9].title()))
+        extras.append((f"{house}{suffix}_house_sign", _SIGNS[(house + seed) % 12]))
+    for index, planet in enumerate(_PLANETS):
+        extras.append((f"{planet}_nakshatra", _NAKSHATRAS[(index + seed) % 9]))
+        extras.append((f"{planet}_nakshatra_pada", (index + seed) % 4 + 1))
+        for division in ("d9", "d10", "d7", "d2"):
+            extras.append((f"{division}_{planet}_sign", _SIGNS[(index * 5 + len(division) + seed) % 12]))
+            extras.append((f"{division}_{planet}_house", (index * 7 + seed) % 12 + 1))
+        extras.append((f"{planet}_dignity", ("exalted", "own", "friendly", "neutral", "debilitated")[index % 5]))
+        extras.append((f"{planet}_retrograde", index % 3 == 0))
+    for key, value in extras:
+        if len(factors) >= count:
+            break
+        factors.setdefault(key, value)
+    return factors
+
+
+def build_passages(count: int) -> List[Dict[str, Any]]:
+    """Retrieved passages as the RAG retriever returns them"""
+    corpus = FakeCorpus(size=count, dimension=8)
+    return [
+        {"text": p["text"], "source": p["source"], "chapter": "", "verse": "",
+         "relevance_score": 0.9 - 0.5 * index / count, "query": QUESTION, "query_index": 0, "passage_index": index}
+        for index, p in enumerate(corpus.passages)
+    ]
+
+
+def build_history(turns: int = 20) -> List[Dict[str, str]]:
+    answer = ("Venus in the 7th house of your D9 points to a partner met through work; the Jupiter-Saturn "
+              "period favours commitment after mid-2026, with Rahu transits adding delays. ") * 8
+    return [{"user_message": f"Follow-up question {turn}: what about my career and marriage timing?",
+             "assistant_response": answer} for turn in range(turns)]
+
+
+def calibration() -> None:
+    """Fixed pure-Python workload used to rescale baselines across machines"""
+    data = {f"key{i}": str(i * 7919 % 1000) for i in range(400)}
+    sorted(data.items(), key=lambda item: item[1])
+    "|".join(value.upper() for value in data.values()).split("|")
+
+
+def build_cases() -> Dict[str, Callable[[], Any]]:
+    factors = build_factors(150)
+    fingerprint = compute_chart_fingerprint(factors)
+    timeline = DashaTimeline.from_factors(factors)
+    passages = {count: build_passages(count) for count in (30, 120)}
+    history = build_history()
+
+    orchestrator = SmartOrchestrator(embedder=None, rag_retriever=None, synthesizer=None)
+    synthesizer = OpenRouterSynthesizer(api_key="benchmark")
+    reranker = FastReranker()
+    classifier = QuestionComplexityClassifier()
+    cache = CacheManager(use_redis=False)
+
+    chart_limit = orchestrator._COMPLEXITY_CONFIG["COMPLEX"]["chart_limit"]
+    chart_focus = orchestrator._format_chart_focus(factors, NICHE, chart_limit, fingerprint, timeline)
+    queries = [QUESTION, f"{NICHE} 7th lord dasha", "spouse nature venus d9"]
+    normalized = {count: orchestrator._normalize_passages(passages[count], queries, count) for count in passages}
+    chart_section = synthesizer._format_chart_section(factors, chart_focus, fingerprint, NICHE)
+    references, reference_scores = synthesizer._format_classical(
+        synthesizer._select_classical_passages(QUESTION, normalized[120], "COMPLEX"), "COMPLEX", "expand"
+    )
+    history_text = synthesizer._format_history(history, "expand")
+    with open(FIXTURES / "questions.txt", encoding="utf-8") as handle:
+        questions = itertools.cycle([line.strip() for line in handle if line.strip()])
+
+    def rerank_cold() -> None:
+        for passage in passages[120]:
+            passage.pop(TERMS_KEY, None)
+        reranker.rerank(passages[120], QUESTION, top_k=3)
+
+    def chart_focus_cold() -> None:
+        orchestrator._chart_focus_cache.clear()
+        orchestrator._format_chart_focus(factors, NICHE, chart_limit, fingerprint, timeline)
+
+    def chart_section_cold() -> None:
+        synthesizer._chart_section_cache.clear()
+        synthesizer._format_chart_section(factors, chart_focus, fingerprint, NICHE)
+
+    return {
+        "rerank/30": lambda: reranker.rerank(passages[30], QUESTION, top_k=3),
+        "rerank/120": lambda: reranker.rerank(passages[120], QUESTION, top_k=3),
+        "rerank/120/cold": rerank_cold,
+        "rerank_many/4x120": lambda: reranker.rerank_many([*queries, NICHE], passages[120], top_k=3),
+        "chart_focus/cold": chart_focus_cold,
+        "chart_focus/cached": lambda: orchestrator._format_chart_focus(factors, NICHE, chart_limit, fingerprint, timeline),
+        "normalize_passages/120": lambda: orchestrator._normalize_passages(passages[120], queries, 8),
+        "select_passages/30": lambda: synthesizer._select_classical_passages(QUESTION, normalized[30], "COMPLEX"),
+        "select_passages/120": lambda: synthesizer._select_classical_passages(QUESTION, normalized[120], "COMPLEX"),
+        "chart_section/cold": chart_section_cold,
+        "build_prompt/expand": lambda: synthesizer._build_prompt(
+            question=QUESTION, niche_instruction=NICHE, chart_section=chart_section, question_focus=[],
+            references=references, reference_scores=reference_scores,
+            history_text=history_text, timing_instruction="- Prioritize Vimshottari Dasha timelines.\n",
+            word_target=synthesizer.WORD_TARGETS["COMPLEX"], mode="expand",
+        ),
+        "classify": lambda: classifier.classify(next(questions)),
+        "chart_bucket": lambda: cache.compute_chart_bucket(factors),
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int, min_batch_s: float = 0.02) -> Dict[str, float]:
+    """Median and best µs per call over ``repeat`` batches of at least ``min_batch_s``"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_batch_s / 0.2))  # autorange targets 0.2s per batch
+    per_call = [total / number * 1e6 for total in timer.repeat(repeat=repeat, number=number)]
+    return {"median_us": statistics.median(per_call), "best_us": min(per_call)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="only cases containing this substring")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed slowdown vs baseline (0.5 = +50%%)")
+    parser.add_argument("--min-delta-us", type=float, default=2.0, help="ignore smaller absolute slowdowns")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)  # the agents log per call
+
+    cases = {name: func for name, func in build_cases().items() if not args.filter or args.filter in name}
+    # Best-of batches: the least noisy estimate of raw machine speed
+    calibration_us = measure(calibration, max(args.repeat, 11))["best_us"]
+    results = {name: measure(func, args.repeat) for name, func in cases.items()}
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"cases": {}}
+    scale = calibration_us / baseline["calibration_us"] if baseline.get("calibration_us") else 1.0
+    print(f"calibration {calibration_us:.1f}µs (machine speed x{1 / scale:.2f} vs baseline)")
+    print(f"\n{'case':<26}{'median µs':>12}{'best µs':>11}{'baseline':>11}{'change':>9}")
+    regressions = []
+    for name, result in results.items():
+        expected = baseline["cases"].get(name, {}).get("median_us")
+        row = f"{name:<26}{result['median_us']:>12.1f}{result['best_us']:>11.1f}"
+        if expected:
+            expected *= scale
+            change = result["median_us"] / expected - 1
+            row += f"{expected:>11.1f}{change:>+9.0%}"
+            if change > args.threshold and result["median_us"] - expected > args.min_delta_us:
+                regressions.append(f"{name}: {result['median_us']:.1f}µs vs {expected:.1f}µs ({change:+.0%})")
+        else:
+            row += f"{'new':>11}"
+        print(row)
+
+    if args.update_baseline:
+        # Cases not re-run keep their baseline, rescaled to this machine's calibration
+        merged = {name: {"median_us": round(case["median_us"] * scale, 2)} for name, case in baseline["cases"].items()}
+        merged.update({name: {"median_us": round(result["median_us"], 2)} for name, result in results.items()})
+        args.baseline.write_text(json.dumps({"calibration_us": round(calibration_us, 2), "cases": merged}, indent=2) + "\n")
+        print(f"\nbaseline written to {args.baseline}")
+        return
+
+    if regressions:
+        print("\nREGRESSION:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
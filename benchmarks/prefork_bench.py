@@ -0,0 +1,216 @@
+"""
+Benchmark: memory per worker and throughput scaling of the prefork launcher.
+
+Each run starts a server with W workers, drives it with keep-alive HTTP
+clients, and reads /proc/<pid>/smaps_rollup of every worker:
+
+* USS - memory private to the worker (Private_Clean + Private_Dirty)
+* PSS - proportional share, counting pages shared with the parent/siblings
+
+The served app imports the full API module graph (``api_main`` and every
+agent module), and ``/work`` runs the local CPU part of a request: schema
+parse of a D1 + D9 + dasha chart, fingerprint, complexity classification and
+factor selection. Network-bound stages (embeddings, RAG, LLM) are excluded.
+
+Modes:
+    prefork - utils.prefork.serve: import + preload once, gc.freeze, fork
+    spawn   - uvicorn --workers: every worker re-imports in a fresh interpreter
+
+Usage (Linux; run on the 2-vCPU target for meaningful scaling numbers):
+    python -m benchmarks.prefork_bench [--workers 1 2] [--modes prefork spawn] [--duration 10] [--clients 8]
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+HOST = "127.0.0.1"
+
+
+def build_app():
+    """Benchmark ASGI app over the real module graph."""
+    from fastapi import FastAPI
+
+    import api_main  # noqa: F401 - loads every agent module and table the API uses
+    from agents.chart_schema import parse_chart_json
+    from agents.question_complexity import QuestionComplexityClassifier
+    from benchmarks.session_memory_bench import build_chart
+    from niche_config import get_all_factors_with_timing
+    from utils.chart_fingerprint import compute_chart_fingerprint
+
+    app = FastAPI()
+    chart = build_chart(7)
+    classifier = QuestionComplexityClassifier()
+    question = "When will I get married and how will my spouse look?"
+
+    @app.get("/ping")
+    def ping() -> Dict[str, int]:
+        return {"pid": os.getpid()}
+
+    @app.get("/work")
+    def work() -> Dict[str, object]:
+        factors = parse_chart_json(chart)
+        fingerprint = compute_chart_fingerprint(factors)
+        result = classifier.classify(question)
+        selected = get_all_factors_with_timing("Love & Relationships", question, factors)
+        return {"fingerprint": fingerprint, "complexity": result.complexity, "factors": len(selected)}
+
+    return app
+
+
+app = build_app() if os.getenv("PREFORK_BENCH_APP") == "1" else None
+
+
+def serve(workers: int, port: int, mode: str) -> None:
+    """Server side of a run (executed in a subprocess)."""
+    if mode == "prefork":
+        import api_main
+        from utils.prefork import serve as prefork_serve
+
+        prefork_serve(build_app(), host=HOST, port=port, workers=workers,
+                      preload=api_main.preload_shared_data, log_level="warning")
+    else:
+        import uvicorn
+
+        os.environ["PREFORK_BENCH_APP"] = "1"
+        uvicorn.run("benchmarks.prefork_bench:app", host=HOST, port=port, workers=workers, log_level="warning")
+
+
+def _client(port: int, duration: float, queue) -> None:
+    conn = http.client.HTTPConnection(HOST, port, timeout=30)
+    done = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        conn.request("GET", "/work")
+        response = conn.getresponse()
+        response.read()
+        if response.status == 200:
+            done += 1
+    conn.close()
+    queue.put(done)
+
+
+def _wait_ready(port: int, timeout: float = 300.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(HOST, port, timeout=2)
+            conn.request("GET", "/ping")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("server did not come up")
+
+
+def _descendants(pid: int) -> List[int]:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as handle:
+                children.extend(int(child) for child in handle.read().split())
+        except OSError:
+            continue
+    found = list(children)
+    for child in children:
+        found.extend(_descendants(child))
+    return found
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as handle:
+        for line in handle:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":"):
+                values[parts[0][:-1]] = int(parts[1]) if parts[1].isdigit() else 0
+    return {"uss": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0), "pss": values.get("Pss", 0)}
+
+
+def _worker_pids(server_pid: int) -> List[int]:
+    """Processes that actually serve requests (excludes the supervisor / spawn helper)."""
+    pids = []
+    for pid in _descendants(server_pid):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as handle:
+                cmdline = handle.read()
+        except OSError:
+            continue
+        if b"resource_tracker" not in cmdline:
+            pids.append(pid)
+    # prefork: children of the server process; spawn: children of uvicorn's supervisor.
+    # uvicorn serves in-process when workers == 1
+    return [pid for pid in pids if not _descendants(pid)] or pids or [server_pid]
+
+
+def run(workers: int, mode: str, port: int, duration: float, clients: int) -> Dict[str, float]:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.prefork_bench", "--serve", str(workers), "--port", str(port), "--mode", mode],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(port)
+        queue = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_client, args=(port, duration, queue)) for _ in range(clients)]
+        for proc in procs:
+            proc.start()
+        total = sum(queue.get() for _ in procs)
+        for proc in procs:
+            proc.join()
+        worker_pids = _worker_pids(server.pid)
+        memory = [_memory_kb(pid) for pid in worker_pids]
+        return {
+            "rps": total / duration,
+            "uss_mb": sum(m["uss"] for m in memory) / len(memory) / 1024,
+            "pss_mb": sum(m["pss"] for m in memory) / len(memory) / 1024,
+            "total_pss_mb": sum(_memory_kb(pid)["pss"] for pid in {server.pid, *worker_pids}) / 1024,
+        }
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--modes", nargs="+", default=["prefork", "spawn"], choices=["prefork", "spawn"])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", default="prefork", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.mode)
+        return
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, {args.duration:.0f}s per run")
+    print(f"{'mode':<9}{'workers':>8}{'req/s':>10}{'scaling':>9}{'USS MB/w':>10}{'PSS MB/w':>10}{'total PSS MB':>14}")
+    results = []
+    for mode in args.modes:
+        base = None
+        for workers in args.workers:
+            # Fresh port per run: the previous server's socket may linger in TIME_WAIT
+            port = args.port + len(results)
+            result = run(workers, mode, port, args.duration, args.clients)
+            base = base or result["rps"]
+            results.append({"mode": mode, "workers": workers, **result})
+            print(f"{mode:<9}{workers:>8}{result['rps']:>10.0f}{result['rps'] / base:>8.2f}x"
+                  f"{result['uss_mb']:>10.1f}{result['pss_mb']:>10.1f}{result['total_pss_mb']:>14.1f}")
+    if os.getenv("PREFORK_BENCH_JSON"):
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Traffic replay load generator for the HTTP API.
+
+Drives ``/api/v1/session/init``, ``/api/v1/query`` and ``/api/v1/query/expand``
+on a running server, from either a captured request log or synthesized
+sessions. Synthesized sessions use the chart fixtures and fixture questions,
+with lognormal think times between turns.
+
+Capture format (JSONL, one request per line; ``--write-capture`` emits it):
+
+    {"ts": 1731142200.125, "session": "u17", "path": "/api/v1/session/init", "body": {...}}
+    {"ts": 1731142209.870, "session": "u17", "path": "/api/v1/query", "body": {"session_id": "...", "question": "...", "mode": "draft"}}
+    {"ts": 1731142231.004, "session": "u17", "path": "/api/v1/query/expand", "params": {"session_id": "..."}}
+
+``session`` groups a user's requests. A recorded ``session_id`` is replaced
+with the id the replayed init returned. Gaps between ``ts`` values are
+replayed as arrival and think times, divided by ``--speed``. If ``--qps`` is
+given, the speed is set to reach that rate instead.
+
+Modes:
+    open-loop (default)  Every request has a fixed intended send time: the
+                         session arrival plus cumulative think time. Latency
+                         is measured from that time. A slow server therefore
+                         delays the next send, and the delay still counts as
+                         latency. Overload shows up in the tail instead of
+                         being hidden (no coordinated omission).
+    --closed-loop N      N virtual users. Each sends its next request one think
+                         time after the previous response. Latency is measured
+                         from the actual send, which is the classic load-test
+                         number, kept for comparison.
+
+Reported per endpoint:
+* latency p50/p90/p95/p99/max
+* error rate by status
+* the cache fields of the ``performance`` block: ``cache_hit``,
+  ``cache_reused``, ``speculative``, cached prompt tokens, and LLM
+  response-cache hits (``llm_total_ms`` 0 while synthesis ran)
+
+Usage:
+    python -m benchmarks.replay --base-url http://localhost:8080 --synthesize 50 --qps 2
+        [--questions-per-session 3] [--expand-ratio 0.3] [--think-time 8:30] [--closed-loop N]
+    python -m benchmarks.replay --base-url http://localhost:8080 --capture traffic.jsonl [--speed 2 | --qps 5]
+        [--out results.jsonl] [--max-error-rate 0.01]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.session_memory_bench import build_chart
+
+QUESTIONS = os.path.join(os.path.dirname(__file__), "fixtures", "questions.txt")
+INIT, QUERY, EXPAND = "/api/v1/session/init", "/api/v1/query", "/api/v1/query/expand"
+NICHES = ["love", "career", "health", "wealth", "spiritual"]
+
+# A session: {"label", "start" (s from run start), "steps": [{"offset" (s from session start), "path", "body", "params"}]}
+Session = Dict[str, Any]
+
+
+def _lognormal(rng: random.Random, median: float, p95: float) -> float:
+    sigma = math.log(max(p95, median) / median) / 1.645 if median > 0 else 0.0
+    return rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+def synthesize(count: int, qps: float, questions_per_session: float, expand_ratio: float,
+               think_time: str, seed: int) -> List[Session]:
+    """Poisson session arrivals sized so the request rate averages ``qps``"""
+    rng = random.Random(seed)
+    with open(QUESTIONS, encoding="utf-8") as handle:
+        questions = [line.strip() for line in handle if len(line.strip()) >= 8]
+    median, _, p95 = think_time.partition(":")
+    think = (float(median), float(p95 or median))
+    requests_per_session = 1 + questions_per_session * (1 + expand_ratio)
+    arrival_rate = qps / requests_per_session
+
+    sessions, start = [], 0.0
+    for index in range(count):
+        start += rng.expovariate(arrival_rate)
+        steps = [{"offset": 0.0, "path": INIT, "body": {
+            "user_id": f"replay-{index}",
+            "niche": rng.choice(NICHES),
+            "chart_data": {
+                "birth_time": "1995-06-15 14:30:00",
+                "birth_place": "Mumbai, India",
+                "latitude": 19.076,
+                "longitude": 72.8777,
+                "chart_json": build_chart(rng.randrange(10_000)),
+            },
+        }}]
+        offset = 0.0
+        # Geometric number of questions with the requested mean (at least one)
+        turns = 1 + int(math.log(1 - rng.random()) / math.log(1 - 1 / questions_per_session)) \
+            if questions_per_session > 1 else 1
+        for _ in range(turns):
+            offset += _lognormal(rng, *think)
+            steps.append({"offset": offset, "path": QUERY, "body": {"question": rng.choice(questions), "mode": "draft"}})
+            if rng.random() < expand_ratio:
+                offset += _lognormal(rng, *think)
+                steps.append({"offset": offset, "path": EXPAND, "params": {}})
+        sessions.append({"label": f"s{index}", "start": start, "steps": steps})
+    return sessions
+
+
+def load_capture(path: str) -> List[Session]:
+    """Sessions from a capture file (times relative to the first request)"""
+    records = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                records.append(json.loads(line))
+    records.sort(key=lambda record: record["ts"])
+    first = records[0]["ts"] if records else 0.0
+
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        label = record.get("session") or (record.get("body") or {}).get("session_id") \
+            or (record.get("params") or {}).get("session_id") or "anonymous"
+        grouped.setdefault(str(label), []).append(record)
+
+    sessions = []
+    for label, group in grouped.items():
+        start = group[0]["ts"]
+        sessions.append({
+            "label": label,
+            "start": start - first,
+            "steps": [
+                {"offset": record["ts"] - start, "path": record["path"],
+                 "body": record.get("body"), "params": record.get("params")}
+                for record in group
+            ],
+        })
+    sessions.sort(key=lambda session: session["start"])
+    return sessions
+
+
+def write_capture(sessions: List[Session], path: str, epoch: float) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        for session in sessions:
+            for step in session["steps"]:
+                record = {"ts": round(epoch + session["start"] + step["offset"], 3), "session": session["label"],
+                          "path": step["path"]}
+                for key in ("body", "params"):
+                    if step.get(key) is not None:
+                        record[key] = step[key]
+                handle.write(json.dumps(record) + "\n")
+
+
+def request_rate(sessions: List[Session]) -> float:
+    """Average requests per second of a schedule"""
+    times = [session["start"] + step["offset"] for session in sessions for step in session["steps"]]
+    span = max(times) - min(times) if len(times) > 1 else 0.0
+    return len(times) / span if span else float("inf")
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+def _performance_fields(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Cache-related fields of a response's performance block"""
+    performance = payload.get("performance") or {}
+    stages = performance.get("stages_ms") or {}
+    fields = {
+        key: performance[key]
+        for key in ("total_ms", "cache_hit", "cache_reused", "speculative", "prompt_tokens", "cached_tokens")
+        if key in performance
+    }
+    if stages.get("synthesis_ms"):
+        fields["llm_cache_hit"] = not stages.get("llm_total_ms")
+    if path == QUERY:
+        fields["complexity"] = (payload.get("metadata") or {}).get("complexity")
+    return fields
+
+
+class Replayer:
+    """Sends one schedule and records every request"""
+
+    def __init__(self, client, sessions: List[Session]):
+        self.client = client
+        self.sessions = sessions
+        self.records: List[Dict[str, Any]] = []
+        self._started = 0.0
+
+    async def _send(self, session: Session, step: Dict[str, Any], session_id: Optional[str],
+                    intended: Optional[float]) -> Optional[Dict[str, Any]]:
+        body = dict(step.get("body") or {})
+        params = dict(step.get("params") or {})
+        if step["path"] != INIT:
+            if session_id is None:
+                self.records.append({"session": session["label"], "path": step["path"], "status": 0,
+                                     "error": "no session (init failed)", "latency_ms": 0.0})
+                return None
+            if step["path"] == EXPAND:
+                params["session_id"] = session_id
+            else:
+                body["session_id"] = session_id
+
+        loop = asyncio.get_running_loop()
+        sent = loop.time()
+        record: Dict[str, Any] = {"session": session["label"], "path": step["path"], "sent_s": sent - self._started}
+        try:
+            response = await self.client.post(step["path"], json=body or None, params=params or None)
+            record["status"] = response.status_code
+            payload = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+            if response.status_code >= 400:
+                record["error"] = str(payload.get("detail", response.text[:200]))
+        except Exception as e:
+            record["status"], record["error"], payload = 0, f"{type(e).__name__}: {e}", {}
+        done = loop.time()
+        record["service_ms"] = (done - sent) * 1000
+        # Open loop: charge the wait behind a slow previous response to the server too
+        record["latency_ms"] = (done - (intended if intended is not None else sent)) * 1000
+        if intended is not None:
+            record["send_lag_ms"] = (sent - intended) * 1000
+        record.update(_performance_fields(step["path"], payload))
+        self.records.append(record)
+        return payload
+
+    async def _run_session(self, session: Session, open_loop: bool) -> None:
+        loop = asyncio.get_running_loop()
+        session_start = self._started + session["start"] if open_loop else loop.time()
+        session_id, previous_offset = None, 0.0
+        for step in session["steps"]:
+            if open_loop:
+                intended = session_start + step["offset"]
+                await asyncio.sleep(max(0.0, intended - loop.time()))
+            else:
+                # Think time starts when the previous response arrived
+                intended = None
+                await asyncio.sleep(max(0.0, step["offset"] - previous_offset))
+                previous_offset = step["offset"]
+            payload = await self._send(session, step, session_id, intended)
+            if step["path"] == INIT:
+                session_id = (payload or {}).get("session_id")
+
+    async def run_open_loop(self) -> float:
+        self._started = asyncio.get_running_loop().time()
+        await asyncio.gather(*(self._run_session(session, open_loop=True) for session in self.sessions))
+        return asyncio.get_running_loop().time() - self._started
+
+    async def run_closed_loop(self, users: int) -> float:
+        self._started = asyncio.get_running_loop().time()
+        queue: asyncio.Queue = asyncio.Queue()
+        for session in self.sessions:
+            queue.put_nowait(session)
+
+        async def user() -> None:
+            while not queue.empty():
+                await self._run_session(queue.get_nowait(), open_loop=False)
+
+        await asyncio.gather(*(user() for _ in range(users)))
+        return asyncio.get_running_loop().time() - self._started
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Linear-interpolated percentile of ``values`` (fraction in 0..1)"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _rate(records: List[Dict[str, Any]], key: str) -> str:
+    flags = [bool(record[key]) for record in records if key in record and record[key] is not None]
+    return f"{sum(flags)}/{len(flags)} ({sum(flags) / len(flags):.0%})" if flags else "-"
+
+
+def report(records: List[Dict[str, Any]], elapsed: float, open_loop: bool) -> float:
+    """Print the summary; returns the overall error rate"""
+    errors = [record for record in records if record.get("status", 0) == 0 or record["status"] >= 400]
+    print(f"\n{len(records)} requests in {elapsed:.1f}s ({len(records) / elapsed:.2f} req/s), "
+          f"{len(errors)} errors, {'open' if open_loop else 'closed'} loop")
+    print(f"\n{'endpoint':<24}{'n':>6}{'err%':>7}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}   (ms)")
+    for path in (INIT, QUERY, EXPAND):
+        group = [record for record in records if record["path"] == path]
+        latencies = [record["latency_ms"] for record in group if record.get("status") == 200]
+        if not group:
+            continue
+        failed = sum(1 for record in group if record.get("status", 0) == 0 or record["status"] >= 400)
+        row = f"{path:<24}{len(group):>6}{failed / len(group):>7.1%}"
+        if latencies:
+            row += "".join(f"{percentile(latencies, q):>9.0f}" for q in (0.5, 0.9, 0.95, 0.99)) + f"{max(latencies):>9.0f}"
+        print(row)
+
+    if open_loop:
+        lags = [record["send_lag_ms"] for record in records if "send_lag_ms" in record]
+        if lags:
+            print(f"\nsend lag behind schedule: p50 {percentile(lags, 0.5):.0f}ms, p99 {percentile(lags, 0.99):.0f}ms, "
+                  f"max {max(lags):.0f}ms")
+
+    queries = [record for record in records if record["path"] == QUERY and record.get("status") == 200]
+    expands = [record for record in records if record["path"] == EXPAND and record.get("status") == 200]
+    answered = queries + expands
+    prompt = sum(record.get("prompt_tokens", 0) for record in answered)
+    cached = sum(record.get("cached_tokens", 0) for record in answered)
+    print("\ncache fields:")
+    print(f"  query cache_hit        {_rate(queries, 'cache_hit')}")
+    print(f"  expand cache_reused    {_rate(expands, 'cache_reused')}")
+    print(f"  expand speculative     {dict(Counter(str(record.get('speculative')) for record in expands)) or '-'}")
+    print(f"  LLM response cache     {_rate(answered, 'llm_cache_hit')}")
+    print(f"  cached prompt tokens   {cached}/{prompt}" + (f" ({cached / prompt:.0%})" if prompt else ""))
+    complexities = Counter(record.get("complexity") for record in queries)
+    if complexities:
+        print(f"  complexity mix         {dict(complexities)}")
+
+    status = Counter(record.get("status") for record in errors)
+    if status:
+        print(f"\nerrors by status: {dict(status)}")
+        for message, count in Counter(record.get("error", "") for record in errors).most_common(3):
+            print(f"  {count} x {message[:160]}")
+    return len(errors) / len(records) if records else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8080")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--capture", help="captured request log (JSONL)")
+    source.add_argument("--synthesize", type=int, metavar="SESSIONS", help="generate this many sessions")
+    parser.add_argument("--qps", type=float, help="target request rate (synthesized default: 1.0)")
+    parser.add_argument("--speed", type=float, default=1.0, help="capture time compression")
+    parser.add_argument("--questions-per-session", type=float, default=3.0)
+    parser.add_argument("--expand-ratio", type=float, default=0.3)
+    parser.add_argument("--think-time", default="8:30", help="median:p95 seconds between a user's requests")
+    parser.add_argument("--closed-loop", type=int, metavar="USERS", help="closed loop with this many users")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="per-request records (JSONL)")
+    parser.add_argument("--write-capture", help="also write the schedule in capture format")
+    parser.add_argument("--max-error-rate", type=float, help="exit non-zero above this error rate")
+    args = parser.parse_args()
+
+    import httpx
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.capture:
+        sessions = load_capture(args.capture)
+        speed = args.qps / request_rate(sessions) if args.qps else args.speed
+        for session in sessions:
+            session["start"] /= speed
+            for step in session["steps"]:
+                step["offset"] /= speed
+    else:
+        sessions = synthesize(args.synthesize, args.qps or 1.0, args.questions_per_session,
+                              args.expand_ratio, args.think_time, args.seed)
+    if args.write_capture:
+        write_capture(sessions, args.write_capture, epoch=time.time())
+
+    total = sum(len(session["steps"]) for session in sessions)
+    print(f"{len(sessions)} sessions, {total} requests, scheduled {request_rate(sessions):.2f} req/s -> {args.base_url}")
+
+    async def run() -> Tuple[float, List[Dict[str, Any]]]:
+        # No client-side connection cap: queueing here would hide server latency
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+            replayer = Replayer(client, sessions)
+            if args.closed_loop:
+                elapsed = await replayer.run_closed_loop(args.closed_loop)
+            else:
+                elapsed = await replayer.run_open_loop()
+        return elapsed, replayer.records
+
+    elapsed, records = asyncio.run(run())
+    error_rate = report(records, elapsed, open_loop=not args.closed_loop)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            for record in records:
+                handle.write(json.dumps(record) + "\n")
+    if args.max_error_rate is not None and error_rate > args.max_error_rate:
+        print(f"\nFAIL: error rate {error_rate:.1%} > {args.max_error_rate:.1%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Reranking quality vs latency: length-based IDF vs corpus IDF statistics.
+
+Scores the same candidate sets with two FastReranker configurations:
+* length  - the built-in approximation (len(token) / 10)
+* corpus  - an IDF table from ``python -m agents.corpus_idf build``
+
+For each final top_k (1..--max-k) it reports:
+* nDCG@k over graded relevance
+* relevant@k: highly relevant passages that reach the prompt
+* prompt tokens@k: passage text the synthesizer receives (~4 chars per token)
+It also reports the median rerank time per candidate set.
+
+It recommends the smallest top_k at which corpus IDF still puts as many
+relevant passages into the prompt as the length heuristic does at
+--current-k (default: RERANK_CONFIG["final_top_k"]). That top_k is what
+RERANK_FINAL_TOP_K can be lowered to.
+
+Data:
+    --judgments FILE   reviewed candidate sets, one JSON object per line:
+                       {"query": "...", "passages": [{"text": ..., "distance": ...}, ...],
+                        "relevance": [2, 0, 1, ...]}   (grade per passage, 2 = relevant)
+                       requires --idf
+    (default)          a synthetic FakeCorpus with a simulated dense-retrieval step.
+                       Relevance comes from the generated planet/theme. The IDF table
+                       is built from the same corpus unless --idf is given.
+
+Exits non-zero (REGRESSION) when corpus IDF loses more than --max-ndcg-drop
+nDCG@current_k against the length heuristic.
+
+Usage:
+    python -m benchmarks.rerank_quality [--queries 200] [--candidates 30] [--corpus-size 2000]
+    python -m benchmarks.rerank_quality --judgments judged.jsonl --idf rerank_idf.bin
+"""
+
+import argparse
+import copy
+import json
+import logging
+import random
+import re
+import statistics
+import sys
+import timeit
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from agents.corpus_idf import CorpusIDF
+from agents.fast_reranker import FastReranker
+from benchmarks.standins import FakeCorpus
+
+# (query, candidate passages, relevance grade per passage)
+Judgment = Tuple[str, List[Dict[str, Any]], List[int]]
+
+RELEVANT_GRADE = 2
+_PASSAGE_PATTERN = re.compile(r"When (\w+) occupies the \d+ house in \w+, the native's (\w+)")
+_QUESTION_TEMPLATES = [
+    "How does {planet} shape my {theme}, and what results manifest during its dasha?",
+    "What does the lord of my house say about {theme} when {planet} aspects it?",
+    "{planet} occupies my seventh house; what is the native's {theme} like?",
+    "Will {planet} dasha bring results concerning {theme}?",
+]
+
+
+def load_judgments(path: str) -> List[Judgment]:
+    judgments = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                record = json.loads(line)
+                judgments.append((record["query"], record["passages"], [int(g) for g in record["relevance"]]))
+    return judgments
+
+
+def synthetic_judgments(corpus: FakeCorpus, queries: int, candidates: int, seed: int = 0) -> List[Judgment]:
+    """
+    Candidate sets from a simulated dense retriever over ``corpus``
+
+    The grade is planet match + theme match, so 2 means both match. Retrieval
+    similarity is 0.1 * grade plus noise. The candidates are therefore enriched
+    but not ranked, which leaves the ordering to the reranker's lexical signals.
+    """
+    rng = np.random.default_rng(seed)
+    attributes = [_PASSAGE_PATTERN.match(p["text"]).groups() for p in corpus.passages]
+    planets = sorted({planet for planet, _ in attributes})
+    themes = sorted({theme for _, theme in attributes})
+    picker = random.Random(seed)
+
+    judgments = []
+    for index in range(queries):
+        planet, theme = picker.choice(planets), picker.choice(themes)
+        query = picker.choice(_QUESTION_TEMPLATES).format(planet=planet, theme=theme)
+        grades = np.array([(p == planet) + (t == theme) for p, t in attributes])
+        similarity = 0.1 * grades + rng.normal(0.0, 0.08, len(grades))
+        top = np.argsort(-similarity)[:candidates]
+        passages = [
+            {"text": corpus.passages[i]["text"], "source": corpus.passages[i]["source"],
+             "distance": float(np.clip(0.55 - similarity[i], 0.05, 0.95))}
+            for i in top
+        ]
+        judgments.append((query, passages, [int(grades[i]) for i in top]))
+    return judgments
+
+
+def ndcg(grades: List[int], ideal: List[int], k: int) -> float:
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    gain = float(np.dot((2.0 ** np.array(grades[:k], dtype=float)) - 1, discounts[:len(grades[:k])]))
+    best = sorted(ideal, reverse=True)[:k]
+    best_gain = float(np.dot((2.0 ** np.array(best, dtype=float)) - 1, discounts[:len(best)]))
+    return gain / best_gain if best_gain else 0.0
+
+
+def evaluate(reranker: FastReranker, judgments: List[Judgment], max_k: int) -> Dict[str, Any]:
+    """Quality per top_k and median rerank time for one reranker configuration"""
+    per_k = {k: {"ndcg": [], "relevant": [], "tokens": []} for k in range(1, max_k + 1)}
+    timings = []
+    for query, passages, grades in judgments:
+        candidates = copy.deepcopy(passages)
+        for index, passage in enumerate(candidates):
+            passage["_judged"] = index
+        ranked = reranker.rerank(candidates, query)
+        ranked_grades = [grades[p["_judged"]] for p in ranked]
+        for k, bucket in per_k.items():
+            bucket["ndcg"].append(ndcg(ranked_grades, grades, k))
+            bucket["relevant"].append(sum(grade >= RELEVANT_GRADE for grade in ranked_grades[:k]))
+            bucket["tokens"].append(sum(len(FastReranker._passage_text(p)) for p in ranked[:k]) / 4)
+
+        # Warm term cache, as when the same candidates are reranked again (rerank_many, repeat turns)
+        timer = timeit.Timer(lambda: reranker.rerank(candidates, query, top_k=max_k))
+        timings.append(min(timer.repeat(repeat=3, number=5)) / 5 * 1e6)
+
+    return {
+        "k": {k: {name: float(np.mean(values)) for name, values in bucket.items()} for k, bucket in per_k.items()},
+        "rerank_us": statistics.median(timings),
+    }
+
+
+def recommend(length: Dict[str, Any], corpus: Dict[str, Any], current_k: int) -> Optional[int]:
+    """Smallest k where corpus IDF reaches the length heuristic's relevant@current_k"""
+    target = length["k"][current_k]["relevant"]
+    for k in sorted(corpus["k"]):
+        if corpus["k"][k]["relevant"] >= target:
+            return k
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--judgments", help="reviewed candidate sets (JSONL)")
+    parser.add_argument("--idf", help="corpus IDF table (default: built from the synthetic corpus)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=30)
+    parser.add_argument("--corpus-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-k", type=int, default=6)
+    parser.add_argument("--current-k", type=int, default=config.RERANK_CONFIG.get("final_top_k", 3))
+    parser.add_argument("--max-ndcg-drop", type=float, default=0.01)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)  # the agents log per call
+
+    if args.judgments:
+        if not args.idf:
+            parser.error("--judgments needs --idf (a table built from the full corpus)")
+        judgments = load_judgments(args.judgments)
+        table = CorpusIDF.load(args.idf)
+    else:
+        corpus = FakeCorpus(size=args.corpus_size, dimension=8, seed=args.seed)
+        judgments = synthetic_judgments(corpus, args.queries, args.candidates, args.seed)
+        table = CorpusIDF.load(args.idf) if args.idf else CorpusIDF.from_documents(p["text"] for p in corpus.passages)
+    max_k = max(args.max_k, args.current_k)
+
+    results = {
+        "length": evaluate(FastReranker(), judgments, max_k),
+        "corpus": evaluate(FastReranker(idf_table=table), judgments, max_k),
+    }
+    sizes = [len(passages) for _, passages, _ in judgments]
+    print(f"{len(judgments)} candidate sets ({min(sizes)}-{max(sizes)} passages); "
+          f"IDF table {table.corpus_version}: {len(table)} terms over {table.n_docs} docs")
+    print(f"\n{'k':>3}{'nDCG len':>11}{'nDCG idf':>11}{'rel@k len':>11}{'rel@k idf':>11}{'prompt tok':>12}")
+    for k in range(1, max_k + 1):
+        length, corpus_idf = results["length"]["k"][k], results["corpus"]["k"][k]
+        marker = "  <- current" if k == args.current_k else ""
+        print(f"{k:>3}{length['ndcg']:>11.3f}{corpus_idf['ndcg']:>11.3f}{length['relevant']:>11.2f}"
+              f"{corpus_idf['relevant']:>11.2f}{corpus_idf['tokens']:>12.0f}{marker}")
+    print(f"\nrerank time per candidate set (median): length {results['length']['rerank_us']:.0f}µs, "
+          f"corpus {results['corpus']['rerank_us']:.0f}µs")
+
+    k = recommend(results["length"], results["corpus"], args.current_k)
+    if k is not None and k < args.current_k:
+        saved = results["corpus"]["k"][args.current_k]["tokens"] - results["corpus"]["k"][k]["tokens"]
+        print(f"corpus IDF at top_k={k} matches the length heuristic's relevant@{args.current_k} "
+              f"-> RERANK_FINAL_TOP_K={k} trims ~{saved:.0f} prompt tokens per request")
+    else:
+        print(f"no smaller top_k than {args.current_k} keeps relevant@{args.current_k}; keep RERANK_FINAL_TOP_K")
+
+    drop = results["length"]["k"][args.current_k]["ndcg"] - results["corpus"]["k"][args.current_k]["ndcg"]
+    if drop > args.max_ndcg_drop:
+        print(f"\nREGRESSION:\n  corpus IDF nDCG@{args.current_k} is {drop:.3f} below the length heuristic")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Memory benchmark: bytes per live session in the in-memory session store.
+
+Before: each session held the raw chart JSON string plus its own factor dict,
+and an unbounded list of exchange dicts, each carrying retrieval artifacts.
+After: one shared immutable ChartRecord per chart, a history ring buffer of
+``max_history_turns`` compact exchanges, artifacts kept on the latest only.
+
+Charts are parsed by the schema parser from synthetic D1 + D9 + dasha JSON;
+``--charts`` controls how many distinct charts the sessions are spread over.
+
+Allocations are traced with tracemalloc, which is slow: the 100k point takes
+several minutes.
+
+Usage:
+    python -m benchmarks.session_memory_bench [--sizes 1000 10000 100000] [--turns 15] [--charts 1000]
+"""
+
+import argparse
+import gc
+import json
+import logging
+import random
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List
+
+from agents.chart_schema import PLANETS, SIGNS, parse_chart_json
+from utils.chart_fingerprint import compute_chart_fingerprint
+from utils.conversation_manager import ConversationManager
+from utils.session_store import InMemorySessionStore
+
+ANSWER = (
+    "Venus in the 7th house of your D9 points to a partner met through work. "
+    "The current Jupiter-Saturn period favours commitment after mid-2026. "
+) * 6
+
+
+def build_chart(seed: int) -> Dict[str, Any]:
+    """Synthetic chart JSON in the documented format (D1 + D9 + 3-level dasha tree)."""
+    rng = random.Random(seed)
+
+    def planets() -> Dict[str, Dict[str, Any]]:
+        return {
+            planet: {"sign": rng.choice(SIGNS), "house": rng.randint(1, 12), "degree": round(rng.uniform(0, 30), 2)}
+            for planet in PLANETS
+        }
+
+    dasha: Dict[str, Any] = {}
+    year = 2000 + seed % 10
+    for maha in PLANETS:
+        dasha[maha] = {}
+        for antar_index, antar in enumerate(PLANETS):
+            start = f"{year}-{antar_index + 1:02d}-01 00:00:00"
+            end = f"{year}-{antar_index + 2:02d}-01 00:00:00" if antar_index < 8 else f"{year + 1}-01-01 00:00:00"
+            dasha[maha][antar] = {"start_time": start, "end_time": end}
+        year += 1
+    return {"d1": {"planets": planets()}, "d9": {"planets": planets()}, "dasha": dasha}
+
+
+def exchange_payload(turn: int) -> Dict[str, Any]:
+    return {
+        "user_message": f"Question {turn}: when will I get married and what will my partner be like?",
+        "assistant_response": f"({turn}) {ANSWER}",
+        "metadata": {"mode": "draft", "latency_ms": 1800 + turn, "complexity": "MODERATE", "passages_used": 5},
+        "artifacts": {
+            "classification": {"complexity": "MODERATE", "confidence": 0.8},
+            "chart_focus": [f"7th house factor {i}" for i in range(40)],
+            "queries": ["venus seventh house navamsa marriage timing", "jupiter saturn dasha marriage"],
+            "passages": [{"text": "x" * 800, "source": f"book-{i}", "score": 0.5} for i in range(5)],
+        },
+    }
+
+
+def legacy_sessions(count: int, turns: int, charts: List[Dict[str, Any]], factors: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Session table as it was: chart text + own factor dict + unbounded exchange list."""
+    sessions = {}
+    for index in range(count):
+        chart_index = index % len(charts)
+        history = []
+        for turn in range(1, turns + 1):
+            payload = exchange_payload(turn)
+            history.append({"turn": turn, "timestamp": datetime.now().isoformat(), **payload})
+        sessions[f"legacy-{index}"] = {
+            "chart_data": json.dumps(charts[chart_index]),
+            "chart_factors": json.loads(json.dumps(factors[chart_index])),
+            "niche": "Love & Relationships",
+            "history": history,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now(),
+            "question_count": turns,
+            "metadata": {},
+        }
+    return sessions
+
+
+def compact_sessions(
+    count: int, turns: int, factors: List[Dict[str, Any]], fingerprints: List[str], max_history: int
+) -> ConversationManager:
+    """Current ConversationManager over a capped, ring-buffered in-memory store."""
+    manager = ConversationManager(store=InMemorySessionStore(max_sessions=count, max_history=max_history))
+    for index in range(count):
+        # Parsed charts arrive as fresh dicts with their fingerprint (parsed-chart cache)
+        chart_factors = json.loads(json.dumps(factors[index % len(factors)]))
+        session_id = manager.create_session(
+            None, chart_factors, "Love & Relationships", chart_fingerprint=fingerprints[index % len(factors)]
+        )
+        for turn in range(1, turns + 1):
+            payload = exchange_payload(turn)
+            manager.add_exchange(session_id, payload["user_message"], payload["assistant_response"],
+                                 payload["metadata"], payload["artifacts"])
+    return manager
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    held = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    gc.collect()
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--turns", type=int, default=15, help="exchanges per session")
+    parser.add_argument("--charts", type=int, default=1000, help="distinct charts across sessions")
+    parser.add_argument("--max-history", type=int, default=10)
+    parser.add_argument("--skip-legacy-above", type=int, default=10000,
+                        help="legacy layout is only measured up to this many sessions")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    charts = [build_chart(seed) for seed in range(args.charts)]
+    factors = [parse_chart_json(chart) for chart in charts]
+    fingerprints = [compute_chart_fingerprint(chart_factors) for chart_factors in factors]
+    print(f"Chart: {len(factors[0])} factors, {len(json.dumps(charts[0]))} bytes of chart JSON; "
+          f"{args.turns} turns/session, {args.charts} distinct charts, history cap {args.max_history}")
+    print(f"{'sessions':>10}{'before B/session':>20}{'after B/session':>20}{'ratio':>8}")
+    for size in args.sizes:
+        after = measure(lambda: compact_sessions(size, args.turns, factors, fingerprints, args.max_history)) / size
+        if size <= args.skip_legacy_above:
+            before = measure(lambda: legacy_sessions(size, args.turns, charts, factors)) / size
+            print(f"{size:>10}{before:>20,.0f}{after:>20,.0f}{before / after:>7.1f}x")
+        else:
+            print(f"{size:>10}{'(skipped)':>20}{after:>20,.0f}{'':>8}")
+
+
+if __name__ == "__main__":
+    main()
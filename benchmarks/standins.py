@@ -0,0 +1,403 @@
+"""
+Local stand-ins for the pipeline's network backends (offline benchmarks).
+
+Each stand-in replaces only the network call, so the production code
+around it still runs: prompt building, HTTP pooling, the embedding cache,
+passage extraction, dedupe and reranking.
+
+* FakeLLMServer - OpenAI-compatible ``/chat/completions`` and ``/auth/key``
+  on localhost. It samples a time-to-first-token and a per-token generation
+  delay, and streams SSE chunks when the request sets ``"stream": true``.
+  The real OpenRouterSynthesizer talks to it via ``api_base``.
+* FakeEmbeddingClient - deterministic, hash-seeded unit vectors behind
+  ``models.embed_content``, injected into the real GeminiEmbeddings.
+* FakeRagEngine / FakeVectorSearch - the real RealRAGRetriever and
+  VectorSearchRetriever over a synthetic classical-text corpus, with only the
+  Vertex RAG ``retrieval_query`` / Vector Search ``find_neighbors`` call replaced.
+
+Latencies are lognormal, configured as "median:p95" milliseconds and
+multiplied by ``time_scale`` (0.1 for quick runs).
+"""
+
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from agents.gemini_embeddings import GeminiEmbeddings
+from agents.openrouter_synthesizer import OpenRouterSynthesizer
+from agents.real_rag_retriever import RealRAGRetriever
+from agents.smart_orchestrator import SmartOrchestrator
+from agents.vector_search_retriever import VectorSearchRetriever
+
+_PLANETS = ["Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn", "Rahu", "Ketu"]
+_SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo", "Libra", "Scorpio",
+          "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
+_THEMES = ["marriage", "spouse", "career", "wealth", "health", "children", "travel", "dasha",
+           "profession", "partnership", "longevity", "fortune", "status", "education"]
+_SOURCES = ["BPHS", "Phaladeepika", "Saravali", "Jataka Parijata", "Uttara Kalamrita"]
+
+
+class LatencyModel:
+    """Lognormal latency from a median and a p95, in milliseconds"""
+
+    def __init__(self, median_ms: float, p95_ms: float, time_scale: float = 1.0, seed: int = 0):
+        self.median_ms = median_ms
+        self.p95_ms = max(p95_ms, median_ms)
+        self.time_scale = time_scale
+        self._mu = math.log(max(median_ms, 1e-3))
+        self._sigma = math.log(self.p95_ms / median_ms) / 1.645 if median_ms > 0 else 0.0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, time_scale: float = 1.0, seed: int = 0) -> "LatencyModel":
+        """From "median:p95" (or a fixed "median")"""
+        median, _, p95 = spec.partition(":")
+        return cls(float(median), float(p95 or median), time_scale, seed)
+
+    def sample_ms(self) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        with self._lock:
+            return self._rng.lognormvariate(self._mu, self._sigma) * self.time_scale
+
+    def sleep(self) -> float:
+        """Sleep one sampled latency; returns it in ms"""
+        ms = self.sample_ms()
+        time.sleep(ms / 1000)
+        return ms
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+def hash_embedding(text: str, dimension: int = 768) -> List[float]:
+    """Deterministic unit vector for a text (same text -> same vector)"""
+    vector = np.random.default_rng(_seed(text)).standard_normal(dimension)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+# ============================================================================
+# LLM
+# ============================================================================
+
+class FakeLLMServer:
+    """
+    OpenAI-compatible chat completions server on localhost
+
+    Args:
+        first_token (LatencyModel): Time to first token
+        token_ms (float): Generation delay per output token (already scaled)
+        output_tokens (int): Tokens per answer (capped by the request's max_tokens)
+        error_rate (float): Fraction of completions answered with HTTP 500
+        seed (int): Seed for errors and answer text
+    """
+
+    def __init__(
+        self,
+        first_token: LatencyModel,
+        token_ms: float = 6.0,
+        output_tokens: int = 350,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.first_token = first_token
+        self.token_ms = token_ms
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"completions": 0, "streams": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def api_base(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "FakeLLMServer":
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Token counts, answer words and whether to fail, for one request"""
+        prompt_chars = sum(len(str(message.get("content", ""))) for message in payload.get("messages", []))
+        completion_tokens = min(self.output_tokens, int(payload.get("max_tokens") or self.output_tokens))
+        rng = random.Random(_seed(json.dumps(payload.get("messages", []), sort_keys=True)))
+        words = [rng.choice(_PLANETS + _SIGNS + _THEMES) for _ in range(completion_tokens)]
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+            self.stats["errors" if failed else "completions"] += 1
+            if not failed:
+                self.stats["prompt_tokens"] += prompt_chars // 4
+                self.stats["completion_tokens"] += completion_tokens
+        return {
+            "failed": failed,
+            "words": words,
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_chars // 4 + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _json(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                if self.path.rstrip("/").endswith("/auth/key"):
+                    self._json(200, {"data": {"label": "fake", "usage": 0, "limit": None}})
+                else:
+                    self._json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self) -> None:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._json(404, {"error": {"message": "not found"}})
+                    return
+                completion = server._completion(payload)
+                server.first_token.sleep()
+                if completion["failed"]:
+                    self._json(500, {"error": {"message": "injected failure", "code": 500}})
+                elif payload.get("stream"):
+                    self._stream(payload, completion)
+                else:
+                    time.sleep(len(completion["words"]) * server.token_ms / 1000)
+                    self._json(200, {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion",
+                        "model": payload.get("model"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": " ".join(completion["words"])},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": completion["usage"],
+                    })
+
+            def _stream(self, payload: Dict[str, Any], completion: Dict[str, Any]) -> None:
+                with server._lock:
+                    server.stats["streams"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def event(body: Any) -> None:
+                    data = body if isinstance(body, str) else json.dumps(body)
+                    self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                for index, word in enumerate(completion["words"]):
+                    event({
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "model": payload.get("model"),
+                        "choices": [{"index": 0, "delta": {"content": ("" if index == 0 else " ") + word}}],
+                    })
+                    time.sleep(server.token_ms / 1000)
+                if (payload.get("stream_options") or {}).get("include_usage"):
+                    event({"id": "chatcmpl-fake", "object": "chat.completion.chunk", "choices": [],
+                           "usage": completion["usage"]})
+                event("[DONE]")
+
+        return Handler
+
+
+# ============================================================================
+# EMBEDDINGS
+# ============================================================================
+
+class FakeEmbeddingClient:
+    """``client.models.embed_content`` with hash embeddings and sampled latency"""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.calls = 0
+        self.models = self
+
+    def embed_content(self, model: str, contents: str, config: Any = None) -> SimpleNamespace:
+        self.latency.sleep()
+        self.calls += 1
+        dimension = getattr(config, "output_dimensionality", None) or 768
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=hash_embedding(contents, dimension))])
+
+
+# ============================================================================
+# RAG
+# ============================================================================
+
+class FakeCorpus:
+    """Synthetic classical passages with hash-embedded vectors"""
+
+    def __init__(self, size: int = 500, dimension: int = 768, seed: int = 0):
+        rng = random.Random(seed)
+        self.passages: List[Dict[str, str]] = []
+        for index in range(size):
+            planet, sign, theme = rng.choice(_PLANETS), rng.choice(_SIGNS), rng.choice(_THEMES)
+            house = rng.randint(1, 12)
+            source = f"{rng.choice(_SOURCES)} Chapter {rng.randint(1, 97)}"
+            text = (
+                f"When {planet} occupies the {house} house in {sign}, the native's {theme} is shaped by "
+                f"{planet}'s dignity and aspects; during the {planet} dasha results concerning {theme} "
+                f"manifest, modified by the lord of the {house} house and {rng.choice(_PLANETS)}'s aspect."
+            )
+            self.passages.append({"id": f"p{index:05d}", "text": text, "source": source})
+        self.vectors = np.array([hash_embedding(p["text"], dimension) for p in self.passages], dtype=np.float32)
+
+    def nearest(self, query_vector: List[float], count: int) -> List[int]:
+        scores = self.vectors @ np.asarray(query_vector, dtype=np.float32)
+        return [int(i) for i in np.argsort(-scores)[:count]]
+
+    def sample(self, text: str, count: int) -> List[int]:
+        """Deterministic passage ids for a query text"""
+        return random.Random(_seed(text)).sample(range(len(self.passages)), min(count, len(self.passages)))
+
+
+def _synthetic_distances(text: str, count: int) -> List[float]:
+    """Ascending cosine distances for ranked hits (hash vectors have no real neighbours)"""
+    rng = random.Random(_seed(text) ^ 0x5EED)
+    return sorted(min(0.95, 0.12 + 0.06 * rank + rng.uniform(0.0, 0.05)) for rank in range(count))
+
+
+class FakeRagEngine(RealRAGRetriever):
+    """RealRAGRetriever with the Vertex ``retrieval_query`` answered from a FakeCorpus"""
+
+    def __init__(self, corpus: FakeCorpus, latency: LatencyModel, top_k: int = 6, final_top_k: int = 3,
+                 similarity_threshold: float = 0.5):
+        self.corpus = corpus
+        self.latency = latency
+        super().__init__(project_id="local", location="local", corpus_id="fake", top_k=top_k,
+                         similarity_threshold=similarity_threshold, final_top_k=final_top_k)
+
+    def _initialize_corpus(self):
+        self.corpus_resource_name = "fake-corpus"
+
+    def _retrieval_query(self, text: str):
+        self.latency.sleep()
+        ids = self.corpus.sample(text, self.top_k)
+        contexts = [
+            SimpleNamespace(text=self.corpus.passages[i]["text"], source_uri=f"gs://corpus/{self.corpus.passages[i]['source']}",
+                            distance=distance)
+            for i, distance in zip(ids, _synthetic_distances(text, len(ids)))
+        ]
+        return SimpleNamespace(contexts=SimpleNamespace(contexts=contexts))
+
+
+class _FakeIndexEndpoint:
+    """``find_neighbors`` over a FakeCorpus"""
+
+    def __init__(self, corpus: FakeCorpus, latency: LatencyModel):
+        self.corpus = corpus
+        self.latency = latency
+
+    def find_neighbors(self, deployed_index_id: str, queries: List[List[float]], num_neighbors: int):
+        self.latency.sleep()
+        results = []
+        for vector in queries:
+            ids = self.corpus.nearest(vector, num_neighbors)
+            distances = _synthetic_distances(str(ids), len(ids))
+            results.append([
+                SimpleNamespace(id=self.corpus.passages[i]["id"], distance=distance,
+                                restricts={**self.corpus.passages[i], "chapter": "", "verse": ""})
+                for i, distance in zip(ids, distances)
+            ])
+        return results
+
+
+class FakeVectorSearch(VectorSearchRetriever):
+    """VectorSearchRetriever with ``find_neighbors`` answered from a FakeCorpus"""
+
+    def __init__(self, corpus: FakeCorpus, latency: LatencyModel):
+        self._fake_endpoint = _FakeIndexEndpoint(corpus, latency)
+        super().__init__(project_id="local", location="local",
+                         index_endpoint_name="fake-endpoint", deployed_index_id="fake-index")
+
+    def _initialize_client(self):
+        self.index_endpoint = self._fake_endpoint
+        self.use_mock = False
+
+
+# ============================================================================
+# ASSEMBLY
+# ============================================================================
+
+def build_orchestrator(
+    llm_api_base: str,
+    retriever: str = "rag_engine",
+    embed_latency: Optional[LatencyModel] = None,
+    rag_latency: Optional[LatencyModel] = None,
+    corpus_size: int = 500,
+    classifier=None,
+) -> SmartOrchestrator:
+    """
+    SmartOrchestrator wired to the stand-ins, configured as in api_main
+
+    Args:
+        llm_api_base (str): FakeLLMServer.api_base
+        retriever (str): "rag_engine" (production default) or "vector_search"
+        embed_latency (Optional[LatencyModel]): Per embedding request
+        rag_latency (Optional[LatencyModel]): Per corpus query
+        corpus_size (int): Synthetic passages
+        classifier: Optional QuestionComplexityClassifier
+
+    Returns:
+        SmartOrchestrator: Ready to answer questions offline
+    """
+    embed_latency = embed_latency or LatencyModel(40, 120)
+    rag_latency = rag_latency or LatencyModel(180, 450)
+    corpus = FakeCorpus(size=corpus_size)
+    embedder = GeminiEmbeddings(project_id="local", location="local", client=FakeEmbeddingClient(embed_latency))
+    if retriever == "vector_search":
+        rag = FakeVectorSearch(corpus, rag_latency)
+    else:
+        rag = FakeRagEngine(corpus, rag_latency)
+    synthesizer = OpenRouterSynthesizer(
+        api_key="local",
+        model_name="openai/gpt-4o-mini",
+        temperature=0.7,
+        max_output_tokens=3000,
+        api_base=llm_api_base,
+    )
+    return SmartOrchestrator(embedder=embedder, rag_retriever=rag, synthesizer=synthesizer, classifier=classifier)
+
@@ -29,6 +29,8 @@ RAG_RETRIEVAL_TIMEOUT = int(os.getenv("RAG_RETRIEVAL_TIMEOUT", "5"))
 
 # ===== SERVER CONFIGURATION =====
 PORT = int(os.getenv("PORT", "8080"))
+# >1 runs the prefork launcher (utils/prefork.py); SESSION_BACKEND=memory is switched to sqlite there
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
 
 # ===== APPROACH B CONFIGURATION =====
 USE_APPROACH_B = os.getenv("USE_APPROACH_B", "true").lower() == "true"
@@ -120,6 +122,56 @@ SESSION_CONFIG = {
     "ttl_minutes": 60,  # Session timeout
     "max_history_turns": 10,  # Keep last 10 Q&A
     "max_sessions_in_memory": 100,  # Auto-cleanup after
+    "sweep_interval_seconds": 60,  # Background purge of expired sessions
+    # Backend shared by all workers: "memory" (single process), "sqlite" or "redis"
+    "backend": os.getenv("SESSION_BACKEND", "memory"),
+    "sqlite_path": os.getenv("SESSION_SQLITE_PATH", "sessions.db"),
+    "redis_url": os.getenv("SESSION_REDIS_URL"),
+    "redis_prefix": "astro:session:",
+}
+
+# ===== SPECULATIVE EXPANSION =====
+# Start the expand-mode synthesis in the background right after a draft answer
+SPECULATIVE_EXPAND_CONFIG = {
+    "enabled": os.getenv("SPECULATIVE_EXPAND", "false").lower() == "true",
+    "max_inflight": int(os.getenv("SPECULATIVE_EXPAND_MAX_INFLIGHT", "2")),  # Per-instance budget
+    "complexities": ["SIMPLE", "MODERATE", "COMPLEX"],  # Tracks eligible for speculation
+    "max_age_seconds": float(os.getenv("SPECULATIVE_EXPAND_MAX_AGE_SECONDS", "900")),  # Unclaimed results dropped after
+    "max_pending": int(os.getenv("SPECULATIVE_EXPAND_MAX_PENDING", "256")),  # Sessions holding a speculation
+}
+
+# ===== ROUTING MODEL =====
+# Optional offline-trained complexity router (python -m agents.routing_model train ...)
+ROUTING_MODEL_CONFIG = {
+    "model_path": os.getenv("ROUTING_MODEL_PATH", ""),  # Empty = regex rules only
+    "threshold": float(os.getenv("ROUTING_MODEL_THRESHOLD", "0.8")),
+    "complex_threshold": float(os.getenv("ROUTING_MODEL_COMPLEX_THRESHOLD", "0.9")),  # Stricter: COMPLEX is costliest
+    "log_path": os.getenv("ROUTING_LOG_PATH", ""),  # JSONL training log of routed questions
+}
+
+# ===== RERANKING =====
+# Passages kept after FastReranker; corpus IDF table from python -m agents.corpus_idf build ...
+RERANK_CONFIG = {
+    "idf_path": os.getenv("RERANK_IDF_PATH", ""),  # Empty = length-based IDF approximation
+    "final_top_k": int(os.getenv("RERANK_FINAL_TOP_K", "3")),  # See benchmarks/rerank_quality.py before lowering
+}
+
+# ===== WARM-UP / READINESS =====
+# /health/ready answers 503 until these steps have run after startup
+WARMUP_CONFIG = {
+    "enabled": os.getenv("WARMUP_ENABLED", "true").lower() == "true",
+    "timeout_seconds": float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30")),  # Ready anyway after this
+    "templates_per_niche": int(os.getenv("WARMUP_TEMPLATES_PER_NICHE", "2")),  # Hot queries pre-embedded
+    "required": [s for s in os.getenv("WARMUP_REQUIRED", "").split(",") if s],  # Steps that must succeed
+    "cache_snapshot_path": os.getenv("CACHE_SNAPSHOT_PATH", ""),  # Empty = no snapshot load/save
+}
+
+# ===== TRACING =====
+# Per-request span trees (OTLP/JSON lines); trace ids appear in every log line
+TRACING_CONFIG = {
+    "exporter": os.getenv("TRACE_EXPORTER", "none"),  # none | stdout | file
+    "file_path": os.getenv("TRACE_FILE", "traces.jsonl"),
+    "service_name": os.getenv("OTEL_SERVICE_NAME", "astroairk-api"),
 }
 
 # ===== EXPECTED CHART FACTORS =====
@@ -36,6 +36,7 @@ if not hasattr(_metadata, "packages_distributions"):
         _metadata.packages_distributions = _packages_distributions_stub  # type: ignore[attr-defined]
 
 # Import Approach B modules
+from agents.chart_schema import SCHEMA_VERSION
 from agents.simple_chart_parser import ChartParser
 from agents.modern_synthesizer import ModernSynthesizer
 from agents.openrouter_synthesizer import OpenRouterSynthesizer  # NEW: GPT-4.1 Mini via OpenRouter
@@ -50,6 +51,7 @@ from agents.niche_preloader import NichePreloader
 from agents.cached_retriever import CachedRetriever  # Phase 2: Parallel retrieval
 from agents.semantic_selector import SemanticFactorSelector  # Phase 3: Semantic targeting
 from utils.cache_manager import get_cache_manager
+from utils.chart_fingerprint import compute_chart_fingerprint, compute_chart_input_key
 
 # Import existing niche instructions
 try:
@@ -254,19 +256,32 @@ def initialize_session_button(chart_data: str, niche: str):
         if not chart_data.strip():
             return "❌ Error: Please enter chart data", {}
         
-        # Parse chart into factors
-        logger.info("Parsing chart data...")
-        factors = chart_parser.parse_chart_text(
-            chart_data=chart_data,
-            niche=niche
-        )
+        # Parse chart into factors (known charts come from the parsed-chart cache)
+        chart_key = compute_chart_input_key(chart_data, parser_version=SCHEMA_VERSION)
+        cached = cache_manager.get_parsed_chart(chart_key) if cache_manager else None
+        if cached:
+            logger.info("Parsed chart cache hit")
+            factors = cached["chart_factors"]
+            chart_fingerprint = cached["chart_fingerprint"]
+        else:
+            logger.info("Parsing chart data...")
+            factors = chart_parser.parse_chart_text(
+                chart_data=chart_data,
+                niche=niche
+            )
+            chart_fingerprint = compute_chart_fingerprint(factors)
+            if cache_manager:
+                cache_manager.set_parsed_chart(chart_key, factors, chart_fingerprint)
         
-        # Create conversation session
+        # Create conversation session (chart-focus views compiled once up front)
         current_session_id = conversation_manager.create_session(
             chart_data=chart_data,
             chart_factors=factors,
             niche=niche,
-            user_id="user_001"
+            user_id="user_001",
+            chart_views=smart_orchestrator.compile_chart_views(factors, niche, chart_fingerprint) if smart_orchestrator else None,
+            chart_fingerprint=chart_fingerprint,
+            chart_key=chart_key
         )
         
         current_chart_factors = factors
@@ -392,13 +407,17 @@ def chat_handler(message: str, history: list, mode: str = "draft"):
             logger.error("Smart orchestrator is not initialized")
             return "❌ The system is still initializing. Please try again in a moment."
 
+        current_session = conversation_manager.get_session(current_session_id) or {}
         orchestration_result = smart_orchestrator.answer_question(
             question=message,
             chart_factors=current_chart_factors,
             niche=current_niche,
             niche_instruction=NICHE_INSTRUCTIONS.get(current_niche, current_niche),
             conversation_history=conversation_manager.get_conversation_context(current_session_id),
-            mode=mode  # Pass mode for draft/expand
+            mode=mode,  # Pass mode for draft/expand
+            chart_fingerprint=current_session.get("chart_fingerprint"),
+            chart_views=current_session.get("chart_views"),
+            dasha_timeline=current_session.get("dasha_timeline"),
         )
 
         answer = orchestration_result.response
@@ -419,7 +438,7 @@ def chat_handler(message: str, history: list, mode: str = "draft"):
                 "dedupe_ms": latencies.get("dedupe_ms", 0.0),
                 "rerank_ms": latencies.get("rerank_ms", 0.0),
                 "retrieval_ms": latencies.get("retrieval_ms", 0.0),
-                "prompt_build_ms": latencies.get("prompt_build_start_ms", 0.0),
+                "prompt_build_ms": latencies.get("prompt_build_ms", 0.0),
                 "llm_first_byte_ms": latencies.get("llm_first_byte_ms", 0.0),
                 "llm_total_ms": latencies.get("llm_total_ms", 0.0),
                 "synthesis_ms": latencies.get("synthesis_ms", 0.0),
@@ -439,7 +458,7 @@ def chat_handler(message: str, history: list, mode: str = "draft"):
             f"- RAG Call: {latencies.get('rag_call_ms', 0.0):.0f}ms (merged query)",
             f"- Dedupe: {latencies.get('dedupe_ms', 0.0):.0f}ms",
             f"- Rerank: {latencies.get('rerank_ms', 0.0):.0f}ms (NumPy fast)",
-            f"- LLM First Token: {latencies.get('llm_first_byte_ms', 0.0):.0f}ms",
+            f"- LLM First Byte: {latencies.get('llm_first_byte_ms', 0.0):.0f}ms",
             f"- LLM Total: {latencies.get('llm_total_ms', 0.0):.0f}ms",
             f"- **Total: {total_time:.0f}ms ({total_time/1000:.1f}s)**",
         ]
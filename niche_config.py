@@ -4,8 +4,9 @@ Maps each astrology niche to its relevant chart factors and divisional charts
 Professional-grade configuration for intelligent pre-loading
 """
 
-from datetime import timedelta
-from typing import Dict, List, Any
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
 
 # ===== NICHE-SPECIFIC FACTOR MAPPINGS =====
 
@@ -411,6 +412,13 @@ CACHE_CONFIG = {
     # TTL settings
     "default_ttl_minutes": 60,  # 1 hour default
     "session_ttl_minutes": 180,  # 3 hours for session data
+    # Max TTLs for chart-derived caches; each entry is additionally capped at the
+    # chart's next dasha boundary (see get_boundary_ttl)
+    "max_ttl_hours": {
+        "parsed_chart": 168,
+        "chart_views": 168,
+        "chart_focus": 168,
+    },
     
     # Pre-loading settings (OPTIMIZED FOR PARALLEL RETRIEVAL)
     "preload": {
@@ -453,37 +461,52 @@ def get_niche_factors(niche: str) -> List[str]:
     return all_factors
 
 
-def get_dasha_range(question: str, niche: str) -> Dict[str, Any]:
+def get_dasha_range(question: str, niche: str, timeline: Any = None, at: Optional[datetime] = None) -> Dict[str, Any]:
     """
     Determine intelligent dasha extraction range based on question
     
     Args:
         question: User's question
         niche: Selected niche
+        timeline: Session DashaTimeline (optional); when given, the periods are resolved too
+        at: Reference time for the timeline lookups (default: now)
     
     Returns:
-        Dict with range info
+        Dict with range info; with a timeline also "years", "periods" (in range),
+        "active" (period per level) and "next_change" (next boundary datetime)
     """
     question_lower = question.lower()
+    range_info = None
     
     # Check for timing keywords
     for rule_name, rule in DASHA_EXTRACTION_RULES.items():
         if any(kw in question_lower for kw in rule["keywords"]):
-            return {
+            range_info = {
                 "range": rule["range"],
                 "description": rule["description"],
                 "rule": rule_name
             }
-    
-    # Default to niche configuration
-    niche_config = NICHE_FACTOR_MAP.get(niche, {})
-    default_range = niche_config.get("dasha_config", {}).get("default_range", "±5 years")
-    
-    return {
-        "range": default_range,
-        "description": "Default niche range",
-        "rule": "niche_default"
-    }
+            break
+    
+    if range_info is None:
+        # Default to niche configuration
+        niche_config = NICHE_FACTOR_MAP.get(niche, {})
+        default_range = niche_config.get("dasha_config", {}).get("default_range", "±5 years")
+        range_info = {
+            "range": default_range,
+            "description": "Default niche range",
+            "rule": "niche_default"
+        }
+    
+    if timeline is not None:
+        match = re.search(r"(\d+)\s*year", range_info["range"])
+        years = int(match.group(1)) if match else 5
+        range_info["years"] = years
+        range_info["periods"] = timeline.within(years, at)
+        range_info["active"] = timeline.active(at)
+        range_info["next_change"] = timeline.next_boundary(at)
+    
+    return range_info
 
 
 def get_cache_ttl(niche: str) -> int:
@@ -501,6 +524,32 @@ def get_cache_ttl(niche: str) -> int:
     return ttl_minutes * 60
 
 
+def get_boundary_ttl(cache_name: str, timeline: Any = None, max_ttl_seconds: Optional[int] = None, at: Optional[datetime] = None) -> int:
+    """
+    Get TTL (in seconds) for a chart-derived cache entry
+    
+    Answers depend on the running dasha, so an entry must not outlive the next
+    period change, but nothing needs recomputing before it either.
+    
+    Args:
+        cache_name: Key in CACHE_CONFIG["max_ttl_hours"] (e.g. "chart_focus", "chart_views")
+        timeline: Chart's DashaTimeline (optional); without it the max TTL applies
+        max_ttl_seconds: Override for the configured max TTL
+        at: Reference time (default: now)
+    
+    Returns:
+        min(max TTL, seconds until the next dasha boundary), at least 1
+    """
+    if max_ttl_seconds is None:
+        max_hours = CACHE_CONFIG.get("max_ttl_hours", {}).get(cache_name)
+        max_ttl_seconds = int(max_hours * 3600) if max_hours else CACHE_CONFIG["default_ttl_minutes"] * 60
+    
+    remaining = timeline.seconds_until_change(at) if timeline is not None else None
+    if remaining is None:
+        return max_ttl_seconds
+    return max(1, min(max_ttl_seconds, int(remaining)))
+
+
 def should_use_extended_dasha(question: str) -> bool:
     """
     Determine if extended dasha range (±20 years) should be used
@@ -555,7 +604,7 @@ def get_timing_factors(niche: str, chart_factors: Dict[str, Any] = None) -> List
     dasha_config = niche_config.get("dasha_config", {})
     
     # Get base timing factors from config
-    timing_factors = dasha_config.get("timing_factors", [])
+    timing_factors = list(dasha_config.get("timing_factors", []))
     
     # If chart factors provided, add specific planet dashas
     if chart_factors and niche == "Love & Relationships":
@@ -16,6 +16,7 @@ Author: AI System Architect
 """
 
 import json
+import os
 import time
 import hashlib
 import logging
@@ -30,7 +31,9 @@ except ImportError:
     REDIS_AVAILABLE = False
     logging.warning("Redis not installed. Using in-memory cache fallback.")
 
-from niche_config import CACHE_CONFIG, get_cache_ttl
+from niche_config import CACHE_CONFIG, get_boundary_ttl, get_cache_ttl
+from utils.dasha_timeline import DashaTimeline
+from utils.tracing import traced
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -78,6 +81,8 @@ class CacheManager:
             "level1_misses": 0,
             "level2_hits": 0,      # Full prompt hits
             "level2_misses": 0,
+            "hits": 0,             # Generic get() hits (parsed charts, RAG factors)
+            "misses": 0,
             "sets": 0,
             "errors": 0,
             "time_saved_ms": 0,
@@ -112,6 +117,7 @@ class CacheManager:
             self.redis_client = None
             self.use_redis = False
     
+    @traced("cache.get_level1", kind="client")
     def get_level1(
         self,
         intent_bucket: str,
@@ -162,6 +168,7 @@ class CacheManager:
             self.cache_stats["errors"] += 1
             return None
     
+    @traced("cache.set_level1", kind="client")
     def set_level1(
         self,
         intent_bucket: str,
@@ -207,6 +214,7 @@ class CacheManager:
             logger.error(f"Level 1 cache set error: {e}")
             self.cache_stats["errors"] += 1
     
+    @traced("cache.get_level2", kind="client")
     def get_level2(self, prompt_hash: str) -> Optional[str]:
         """
         LEVEL 2: Get from full prompt cache
@@ -247,6 +255,7 @@ class CacheManager:
             self.cache_stats["errors"] += 1
             return None
     
+    @traced("cache.set_level2", kind="client")
     def set_level2(
         self,
         prompt_hash: str,
@@ -363,6 +372,96 @@ class CacheManager:
         bucket_hash = hashlib.md5(bucket_str.encode()).hexdigest()[:12]
         
         return bucket_hash
+    
+    def get_parsed_chart(self, chart_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get parsed chart factors by content address
+        
+        Args:
+            chart_key: Canonical hash of the chart input (see compute_chart_input_key)
+        
+        Returns:
+            Dict with chart_factors and chart_fingerprint, or None if not cached
+        """
+        return self.get(self._build_chart_key(chart_key))
+    
+    def set_parsed_chart(
+        self,
+        chart_key: str,
+        chart_factors: Dict[str, Any],
+        chart_fingerprint: str,
+        ttl_hours: Optional[int] = None
+    ):
+        """
+        Cache parsed chart factors by content address
+        
+        The entry never outlives the running dasha period, since the parsed
+        "current" dasha factors would be stale after it changes.
+        
+        Args:
+            chart_key: Canonical hash of the chart input
+            chart_factors: Parsed chart factors
+            chart_fingerprint: Fingerprint of the parsed factors
+            ttl_hours: Max time to live in hours (default: CACHE_CONFIG max_ttl_hours["parsed_chart"])
+        """
+        ttl_seconds = get_boundary_ttl(
+            "parsed_chart",
+            DashaTimeline.from_factors(chart_factors),
+            int(ttl_hours * 3600) if ttl_hours else None
+        )
+        self.set(
+            self._build_chart_key(chart_key),
+            {"chart_factors": chart_factors, "chart_fingerprint": chart_fingerprint},
+            ttl_seconds
+        )
+    
+    def get_chart_views(self, chart_fingerprint: str, niche: str) -> Optional[Dict[str, List[str]]]:
+        """
+        Get precompiled chart-focus views for a parsed chart and niche
+        
+        Args:
+            chart_fingerprint: Fingerprint of the parsed factors
+            niche: Astrology niche
+        
+        Returns:
+            Dict mapping complexity to chart-focus lines, or None if not cached
+        """
+        return self.get(self._build_chart_views_key(chart_fingerprint, niche))
+    
+    def set_chart_views(
+        self,
+        chart_fingerprint: str,
+        niche: str,
+        chart_views: Dict[str, List[str]],
+        ttl_hours: Optional[float] = None,
+        dasha_timeline: Optional[DashaTimeline] = None
+    ):
+        """
+        Cache precompiled chart-focus views for a parsed chart and niche
+        
+        Args:
+            chart_fingerprint: Fingerprint of the parsed factors
+            niche: Astrology niche
+            chart_views: Dict mapping complexity to chart-focus lines
+            ttl_hours: Max time to live in hours (default: CACHE_CONFIG max_ttl_hours["chart_views"])
+            dasha_timeline: Chart's dasha timeline; caps the TTL at its next boundary
+        """
+        ttl_seconds = get_boundary_ttl(
+            "chart_views", dasha_timeline, int(ttl_hours * 3600) if ttl_hours else None
+        )
+        self.set(self._build_chart_views_key(chart_fingerprint, niche), chart_views, ttl_seconds)
+    
+    def _build_chart_key(self, chart_key: str) -> str:
+        """Build parsed-chart cache key"""
+        return f"astro:chart:{chart_key}"
+    
+    def _build_chart_views_key(self, chart_fingerprint: str, niche: str) -> str:
+        """Build chart-views cache key"""
+        niche_normalized = niche.lower().replace(" ", "_").replace("&", "and")
+        return f"astro:chart_views:{chart_fingerprint}:{niche_normalized}"
+    
+    @traced("cache.get", kind="client")
+    def get(self, key: str) -> Optional[Any]:
         """
         Get value from cache
         
@@ -400,6 +499,7 @@ class CacheManager:
             self.cache_stats["errors"] += 1
             return None
     
+    @traced("cache.set", kind="client")
     def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None):
         """
         Set value in cache with TTL
@@ -456,6 +556,7 @@ class CacheManager:
             logger.error(f"Cache exists error for key {key}: {e}")
             return False
     
+    @traced("cache.get_many", kind="client")
     def get_many(self, keys: List[str]) -> Dict[str, Any]:
         """
         Get multiple keys at once (batch operation)
@@ -500,6 +601,7 @@ class CacheManager:
         
         return results
     
+    @traced("cache.set_many", kind="client")
     def set_many(self, items: Dict[str, Any], ttl_seconds: Optional[int] = None):
         """
         Set multiple keys at once (batch operation)
@@ -617,6 +719,67 @@ class CacheManager:
         
         return status
     
+    def save_snapshot(self, path: str) -> int:
+        """
+        Write the live in-memory entries to a JSON snapshot file
+        
+        Redis already outlives the process, so only the memory fallback is
+        snapshotted. The file is replaced atomically.
+        
+        Args:
+            path: Snapshot file path
+        
+        Returns:
+            Number of entries written
+        """
+        if self.use_redis:
+            return 0
+        
+        now = time.time()
+        entries = {
+            key: data for key, data in list(self.memory_cache.items())
+            if data["expires_at"] > now
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"saved_at": now, "entries": entries}, handle)
+        os.replace(tmp_path, path)
+        logger.info(f"💾 Cache snapshot saved: {len(entries)} entries -> {path}")
+        return len(entries)
+    
+    def load_snapshot(self, path: str) -> int:
+        """
+        Load unexpired entries from a snapshot written by save_snapshot
+        
+        Entries keep their original expiry; keys already present win.
+        
+        Args:
+            path: Snapshot file path
+        
+        Returns:
+            Number of entries loaded (0 if the file does not exist)
+        """
+        if not os.path.exists(path):
+            return 0
+        
+        with open(path, encoding="utf-8") as handle:
+            snapshot = json.load(handle)
+        
+        now = time.time()
+        loaded = 0
+        for key, data in snapshot.get("entries", {}).items():
+            if data.get("expires_at", 0) <= now or key in self.memory_cache:
+                continue
+            if self.use_redis and self.redis_client:
+                ttl_seconds = max(1, int(data["expires_at"] - now))
+                if not self.redis_client.set(key, json.dumps(data["value"]), ex=ttl_seconds, nx=True):
+                    continue
+            else:
+                self.memory_cache[key] = data
+            loaded += 1
+        logger.info(f"📥 Cache snapshot loaded: {loaded} entries <- {path}")
+        return loaded
+    
     def cleanup_expired(self):
         """Clean up expired entries (for memory cache)"""
         if not self.use_redis:
@@ -0,0 +1,73 @@
+"""
+Chart Fingerprint Module
+Purpose: Stable identity for a parsed chart, computed once per session
+
+The fingerprint is a short digest of the canonical JSON form of the chart
+factors. Sessions store it at creation time and pass it along with every
+request, so chart-dependent caches (chart focus, formatted chart sections)
+key on it instead of re-serializing and hashing the whole chart per question.
+"""
+
+import hashlib
+import json
+from collections.abc import Mapping
+from typing import Any, Dict, Optional
+
+
+def _canonicalize(value: Any) -> Any:
+    """Reduce a chart value to JSON-safe, order-independent primitives."""
+    if isinstance(value, Mapping):
+        return {str(k): _canonicalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonicalize(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonicalize(v) for v in value), key=repr)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def compute_chart_fingerprint(chart_factors: Optional[Dict[str, Any]]) -> str:
+    """
+    Compute the fingerprint of a chart
+
+    Args:
+        chart_factors (Dict): Parsed chart factors
+
+    Returns:
+        str: 32-character hex digest, identical for equal charts regardless of key order
+    """
+    return _digest(chart_factors or {})
+
+
+def compute_chart_input_key(chart_input: Any, parser_version: int = 1) -> str:
+    """
+    Compute the content address of raw chart input (before parsing)
+
+    Args:
+        chart_input (Any): Chart JSON (dict/list) or chart text as submitted
+        parser_version (int): Bumped when parsing output changes, to retire old entries
+
+    Returns:
+        str: 32-character hex digest; JSON text and the equivalent dict share a key
+    """
+    if isinstance(chart_input, str):
+        text = chart_input.strip()
+        try:
+            chart_input = json.loads(text)
+        except ValueError:
+            chart_input = " ".join(text.split())
+    return _digest({"parser_version": parser_version, "chart": chart_input})
+
+
+def _digest(value: Any) -> str:
+    blob = json.dumps(
+        _canonicalize(value),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=16).hexdigest()
+
+
+__all__ = ["compute_chart_fingerprint", "compute_chart_input_key"]
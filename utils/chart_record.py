@@ -0,0 +1,113 @@
+"""
+Chart Record Module
+Purpose: Compact, immutable, shareable form of parsed chart factors
+
+Sessions used to hold the chart as a JSON string *and* a factor dict. A
+ChartRecord is the single in-memory copy:
+
+* read-only Mapping, so callers keep using ``.get`` / ``[]`` / ``.items()``
+* ``__slots__``: no per-instance ``__dict__``
+* keys are interned and the key layout (key tuple + position index) is shared
+  by every chart with the same factor set, so a chart costs one values tuple
+* records are deduplicated by chart fingerprint: sessions for the same chart
+  share one instance for as long as any of them is alive
+"""
+
+import sys
+import threading
+import weakref
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Key layouts (canonical key tuple, key -> position) shared by records with the same keys
+_LAYOUTS: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], Dict[str, int]]] = {}
+_LAYOUTS_LOCK = threading.Lock()
+
+# Live records by chart fingerprint
+_RECORDS: "weakref.WeakValueDictionary[str, ChartRecord]" = weakref.WeakValueDictionary()
+_RECORDS_LOCK = threading.Lock()
+
+
+def _intern_value(value: Any) -> Any:
+    """Intern strings so repeated sign/planet/lord names share one object"""
+    if isinstance(value, str) and len(value) <= 64:
+        return sys.intern(value)
+    return value
+
+
+def _layout(keys: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Dict[str, int]]:
+    layout = _LAYOUTS.get(keys)
+    if layout is None:
+        with _LAYOUTS_LOCK:
+            layout = _LAYOUTS.setdefault(keys, (keys, {key: i for i, key in enumerate(keys)}))
+    return layout
+
+
+class ChartRecord(Mapping):
+    """
+    Immutable mapping of chart factors
+
+    Nested values (dasha period lists, the serialized timeline) are kept as
+    parsed and must be treated as read-only.
+    """
+
+    __slots__ = ("_keys", "_index", "_values", "fingerprint", "__weakref__")
+
+    def __init__(self, factors: Mapping, fingerprint: Optional[str] = None) -> None:
+        keys, index = _layout(tuple(sys.intern(str(key)) for key in factors))
+        self._keys = keys
+        self._index = index
+        self._values = tuple(_intern_value(factors[key]) for key in factors)
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def shared(cls, factors: Optional[Mapping], fingerprint: Optional[str] = None) -> "ChartRecord":
+        """
+        Record for ``factors``, reusing a live record with the same fingerprint
+
+        Args:
+            factors (Mapping): Parsed chart factors (dict or ChartRecord)
+            fingerprint (Optional[str]): compute_chart_fingerprint(factors)
+
+        Returns:
+            ChartRecord
+        """
+        if isinstance(factors, ChartRecord) and (fingerprint is None or factors.fingerprint == fingerprint):
+            return factors
+        if not fingerprint:
+            return cls(factors or {})
+        with _RECORDS_LOCK:
+            record = _RECORDS.get(fingerprint)
+            if record is None:
+                record = cls(factors or {}, fingerprint)
+                _RECORDS[fingerprint] = record
+            return record
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._index[key]]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        position = self._index.get(key)
+        return default if position is None else self._values[position]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"ChartRecord({len(self)} factors, fingerprint={self.fingerprint!r})"
+
+    def __reduce__(self):
+        return (ChartRecord, (dict(self), self.fingerprint))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict copy (JSON serialization, callers that need to mutate)"""
+        return dict(zip(self._keys, self._values))
+
+
+__all__ = ["ChartRecord"]
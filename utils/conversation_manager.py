@@ -8,69 +8,128 @@ Features:
 * Conversation history tracking  
 * Session expiration (TTL)
 * Context retrieval for multi-turn
+* Per-exchange retrieval artifacts (reused by expand requests)
+* Pluggable persistence (memory / SQLite / Redis, see utils.session_store),
+  hydrated lazily and cached for the duration of a request
 """
 
 import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 import uuid
 import logging
+import weakref
+
+from niche_config import get_boundary_ttl
+from utils.chart_fingerprint import compute_chart_fingerprint
+from utils.chart_record import ChartRecord
+from utils.dasha_timeline import DashaTimeline
+from utils.session_store import InMemorySessionStore, SessionStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Indexed timelines by chart fingerprint, shared by all live sessions of a chart
+_timelines: "weakref.WeakValueDictionary[str, DashaTimeline]" = weakref.WeakValueDictionary()
+
+# Sessions hydrated during the current request (None outside a request scope)
+_request_sessions: ContextVar[Optional[Dict[str, Dict]]] = ContextVar("request_sessions", default=None)
+
 
 class ConversationManager:
     """
     Manages conversation sessions and history
     """
     
-    def __init__(self, session_ttl_minutes: int = 60):
+    def __init__(self, session_ttl_minutes: int = 60, store: Optional[SessionStore] = None):
         """
         Initialize conversation manager
         
         Args:
             session_ttl_minutes (int): Session lifetime in minutes (default 60)
+            store (Optional[SessionStore]): Session backend (default: in-memory)
         """
-        self.sessions = {}  # In-memory storage (upgrade to database later)
+        self.store = store or InMemorySessionStore()
         self.session_ttl = timedelta(minutes=session_ttl_minutes)
-        logger.info(f"Conversation manager initialized (TTL: {session_ttl_minutes} min)")
+        logger.info(
+            f"Conversation manager initialized (TTL: {session_ttl_minutes} min, "
+            f"store: {type(self.store).__name__})"
+        )
+    
+    @contextmanager
+    def request_scope(self) -> Iterator[None]:
+        """
+        Cache hydrated sessions for the duration of one request
+        
+        Within the scope each session is loaded from the backend at most once;
+        outside it every call goes to the backend.
+        """
+        token = _request_sessions.set({})
+        try:
+            yield
+        finally:
+            _request_sessions.reset(token)
     
     def create_session(
         self,
-        chart_data: str,
+        chart_data: Optional[str],
         chart_factors: Dict,
         niche: str,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        chart_views: Optional[Dict[str, List[str]]] = None,
+        chart_fingerprint: Optional[str] = None,
+        chart_key: Optional[str] = None,
+        dasha_timeline: Optional[DashaTimeline] = None
     ) -> str:
         """
         Create new conversation session
         
         Args:
-            chart_data (str): Raw chart data as text
+            chart_data (Optional[str]): Raw chart text; only kept when no factors were parsed
             chart_factors (Dict): Parsed 30 chart factors
             niche (str): Niche/domain (e.g., "Love & Relationships")
             user_id (Optional[str]): User identifier for tracking
+            chart_views (Optional[Dict]): Precompiled chart-focus views per complexity
+            chart_fingerprint (Optional[str]): Fingerprint of chart_factors, if already known
+            chart_key (Optional[str]): Content address of the raw chart in the parsed-chart cache
+            dasha_timeline (Optional[DashaTimeline]): Indexed dasha timeline, if already built
         
         Returns:
             str: New session ID
+        
+        The chart fingerprint is computed once here (unless supplied) and reused
+        by every chart-dependent cache for the lifetime of the session; the
+        dasha timeline is indexed once here for timing questions. The chart
+        views are dropped at the next dasha boundary (they mark the running period).
         """
         
         session_id = str(uuid.uuid4())
+        chart_fingerprint = chart_fingerprint or compute_chart_fingerprint(chart_factors)
+        # One immutable copy per chart, shared by every session on it
+        chart_record = ChartRecord.shared(chart_factors, chart_fingerprint)
+        dasha_timeline = self._shared_timeline(chart_record, dasha_timeline)
         
-        self.sessions[session_id] = {
+        record = {
             "session_id": session_id,
             "user_id": user_id or "anonymous",
-            "chart_data": chart_data,
-            "chart_factors": chart_factors,
+            "chart_data": None if chart_record else chart_data,
+            "chart_key": chart_key,
+            "chart_factors": chart_record,
+            "chart_fingerprint": chart_fingerprint,
+            "chart_views": chart_views or {},
+            "chart_views_expire_at": time.time() + get_boundary_ttl("chart_views", dasha_timeline),
             "niche": niche,
-            "history": [],  # Conversation turns
-            "created_at": datetime.now(),
-            "updated_at": datetime.now(),
-            "question_count": 0,
+            "created_at": time.time(),
             "metadata": {}
         }
+        if isinstance(self.store, InMemorySessionStore):
+            record["dasha_timeline"] = dasha_timeline  # Live objects need no re-hydration
+        
+        self.store.create(session_id, record, self.session_ttl.total_seconds())
         
         logger.info(f"Session created: {session_id} (Niche: {niche})")
         return session_id
@@ -86,31 +145,60 @@ class ConversationManager:
             Optional[Dict]: Session data if exists, None otherwise
         """
         
-        if session_id not in self.sessions:
-            logger.warning(f"Session not found: {session_id}")
-            return None
-        
-        session = self.sessions[session_id]
+        scoped = _request_sessions.get()
+        if scoped is not None and session_id in scoped:
+            return scoped[session_id]
         
-        # Check if expired
-        if self._is_session_expired(session):
-            logger.info(f"Session expired: {session_id}")
-            del self.sessions[session_id]
+        # Missing and expired sessions look the same: the store drops expired ones
+        record = self.store.load(session_id)
+        if record is None:
+            logger.warning(f"Session not found or expired: {session_id}")
             return None
         
+        session = self._hydrate(record)
+        if scoped is not None:
+            scoped[session_id] = session
         return session
     
-    def _is_session_expired(self, session: Dict) -> bool:
-        """Check if session has expired"""
-        time_since_update = datetime.now() - session["updated_at"]
-        return time_since_update > self.session_ttl
+    def _hydrate(self, record: Dict[str, Any]) -> Dict:
+        """Turn a stored record into the session dict handed to callers"""
+        session = dict(record)
+        session["created_at"] = datetime.fromtimestamp(record["created_at"])
+        session["updated_at"] = datetime.fromtimestamp(record["updated_at"])
+        if not isinstance(session.get("chart_factors"), ChartRecord):
+            session["chart_factors"] = ChartRecord.shared(session.get("chart_factors"), session.get("chart_fingerprint"))
+        if session.get("dasha_timeline") is None:
+            session["dasha_timeline"] = self._shared_timeline(session["chart_factors"])
+        
+        # Views compiled before a dasha change are recompiled on demand by the orchestrator
+        if session["chart_views"] and session["chart_views_expire_at"] <= time.time():
+            session["chart_views"] = {}
+        
+        return session
+    
+    @staticmethod
+    def _shared_timeline(
+        chart_record: ChartRecord,
+        dasha_timeline: Optional[DashaTimeline] = None
+    ) -> Optional[DashaTimeline]:
+        """Indexed timeline of a chart, built once per fingerprint while any session holds it"""
+        fingerprint = chart_record.fingerprint
+        if fingerprint:
+            shared = _timelines.get(fingerprint)
+            if shared is not None:
+                return shared
+        dasha_timeline = dasha_timeline or DashaTimeline.from_factors(chart_record)
+        if fingerprint and dasha_timeline is not None:
+            _timelines[fingerprint] = dasha_timeline
+        return dasha_timeline
     
     def add_exchange(
         self,
         session_id: str,
         user_message: str,
         assistant_response: str,
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        artifacts: Optional[Dict] = None
     ) -> Dict:
         """
         Add user question and assistant response to history
@@ -120,6 +208,8 @@ class ConversationManager:
             user_message (str): User question
             assistant_response (str): Assistant answer
             metadata (Optional[Dict]): Additional metadata (latency, confidence, etc)
+            artifacts (Optional[Dict]): Retrieval artifacts (classification, chart
+                focus, queries, passages) so the answer can be expanded later
         
         Returns:
             Dict: Exchange record
@@ -131,25 +221,45 @@ class ConversationManager:
             return {}
         
         exchange = {
-            "turn": len(session["history"]) + 1,
+            "turn": session["question_count"] + 1,
             "timestamp": datetime.now().isoformat(),
             "user_message": user_message,
             "assistant_response": assistant_response,
-            "metadata": metadata or {}
+            "metadata": metadata or {},
+            "artifacts": artifacts
         }
         
-        session["history"].append(exchange)
+        if not self.store.append_exchange(session_id, exchange, self.session_ttl.total_seconds()):
+            logger.error(f"Session vanished before exchange was stored: {session_id}")
+            return {}
         session["updated_at"] = datetime.now()
         session["question_count"] += 1
         
         logger.info(
             f"Exchange added to {session_id}. "
             f"Turn: {exchange['turn']}, "
-            f"Latency: {metadata.get('latency_ms', 'N/A')}ms"
+            f"Latency: {exchange['metadata'].get('latency_ms', 'N/A')}ms"
         )
         
         return exchange
     
+    def get_history(self, session_id: str) -> List[Dict]:
+        """
+        Get the retained conversation history of a session
+        
+        Args:
+            session_id (str): Session ID
+        
+        Returns:
+            List[Dict]: Last max_history_turns exchanges, oldest first (empty if session missing)
+        """
+        
+        session = self.get_session(session_id)
+        if not session:
+            return []
+        
+        return self.store.history(session_id)
+    
     def get_conversation_context(
         self,
         session_id: str,
@@ -171,8 +281,7 @@ class ConversationManager:
             return []
         
         # Return last N exchanges
-        history = session["history"]
-        return history[-max_turns:] if history else []
+        return self.store.history(session_id, last_n=max_turns)
     
     def format_context_for_prompt(
         self,
@@ -220,7 +329,7 @@ class ConversationManager:
         if not session:
             return {}
         
-        exchanges = session["history"]
+        exchanges = self.store.history(session_id)
         
         summary = {
             "session_id": session_id,
@@ -247,8 +356,11 @@ class ConversationManager:
             bool: True if deleted, False if not found
         """
         
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        scoped = _request_sessions.get()
+        if scoped is not None:
+            scoped.pop(session_id, None)
+        
+        if self.store.delete(session_id):
             logger.info(f"Session deleted: {session_id}")
             return True
         
@@ -262,19 +374,16 @@ class ConversationManager:
             int: Number of sessions deleted
         """
         
-        expired_ids = []
-        
-        for session_id, session in self.sessions.items():
-            if self._is_session_expired(session):
-                expired_ids.append(session_id)
+        removed = self.store.purge_expired()
         
-        for session_id in expired_ids:
-            del self.sessions[session_id]
+        if removed:
+            logger.info(f"Cleaned up {removed} expired sessions")
         
-        if expired_ids:
-            logger.info(f"Cleaned up {len(expired_ids)} expired sessions")
-        
-        return len(expired_ids)
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Session count plus the store's eviction/expiry counters"""
+        return self.store.stats()
 
 
 # Usage example
@@ -0,0 +1,274 @@
+"""
+Dasha Timeline Module
+Purpose: Indexed Vimshottari timeline with O(log n) period lookups
+
+Each level (Mahadasha, Antardasha, Pratyantar) is held as sorted start/end
+epoch arrays plus the lord path of every period. The timeline is built once
+per chart (at parse time or session creation) and answers:
+
+* the active period at a date, per level
+* periods within ±N years of a date
+* the next boundary at which any level changes
+
+with bisect lookups instead of re-parsing date strings per call.
+"""
+
+import bisect
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LEVELS = ("mahadasha", "antardasha", "pratyantar")
+
+_EPOCH = datetime(1970, 1, 1)
+_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d", "%d-%m-%Y")
+_YEAR_SECONDS = 365.25 * 86400
+
+# (start_epoch, end_epoch, lord path) - e.g. (…, …, ("Jupiter", "Saturn")) for an Antardasha
+PeriodRow = Tuple[int, int, Tuple[str, ...]]
+
+
+def to_epoch(value: datetime) -> int:
+    """Naive datetime -> integer seconds since 1970-01-01 (no timezone shift)"""
+    return int((value - _EPOCH).total_seconds())
+
+
+def from_epoch(seconds: float) -> datetime:
+    """Inverse of to_epoch"""
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+@lru_cache(maxsize=4096)
+def parse_dasha_date(text: str) -> Optional[datetime]:
+    """Parse a dasha date string in any of the formats the chart sources use"""
+    text = text.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+@dataclass(frozen=True)
+class DashaPeriod:
+    """One period of the timeline"""
+
+    level: str
+    lords: Tuple[str, ...]
+    start: datetime
+    end: datetime
+
+    @property
+    def lord(self) -> str:
+        return self.lords[-1]
+
+    @property
+    def label(self) -> str:
+        return "/".join(self.lords)
+
+    def contains(self, at: datetime) -> bool:
+        return self.start <= at < self.end
+
+    def as_dict(self, at: Optional[datetime] = None) -> Dict[str, Any]:
+        """Period in the ``dasha_periods_20yr`` entry shape"""
+        data: Dict[str, Any] = {level: lord for level, lord in zip(LEVELS, self.lords)}
+        data["start_date"] = self.start.strftime("%Y-%m-%d %H:%M:%S")
+        data["end_date"] = self.end.strftime("%Y-%m-%d %H:%M:%S")
+        data["is_current"] = self.contains(at or datetime.now())
+        return data
+
+
+class _Level:
+    """Sorted, non-overlapping periods of one dasha level"""
+
+    __slots__ = ("name", "starts", "ends", "lords")
+
+    def __init__(self, name: str, rows: Iterable[PeriodRow]) -> None:
+        ordered = sorted(rows, key=lambda row: row[0])
+        self.name = name
+        self.starts = array("q", (row[0] for row in ordered))
+        self.ends = array("q", (row[1] for row in ordered))
+        self.lords: List[Tuple[str, ...]] = [tuple(row[2]) for row in ordered]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def period(self, index: int) -> DashaPeriod:
+        return DashaPeriod(self.name, self.lords[index], from_epoch(self.starts[index]), from_epoch(self.ends[index]))
+
+    def index_at(self, t: int) -> Optional[int]:
+        index = bisect.bisect_right(self.starts, t) - 1
+        if index >= 0 and t < self.ends[index]:
+            return index
+        return None
+
+
+class DashaTimeline:
+    """
+    Indexed Vimshottari dasha timeline
+
+    Build with :meth:`from_rows` (parser), :meth:`from_dict` (serialized in the
+    chart factors as ``dasha_timeline``) or :meth:`from_factors`.
+    """
+
+    def __init__(self, levels: Dict[str, Iterable[PeriodRow]]) -> None:
+        self._levels: Dict[str, _Level] = {}
+        for name in LEVELS:
+            level = _Level(name, levels.get(name, ()))
+            if len(level):
+                self._levels[name] = level
+        self._boundaries = array("q", sorted({
+            t for level in self._levels.values() for t in (*level.starts, *level.ends)
+        }))
+
+    @classmethod
+    def from_rows(cls, levels: Dict[str, Iterable[Tuple[datetime, datetime, Sequence[str]]]]) -> "DashaTimeline":
+        """Build from ``{level: [(start, end, lord path), ...]}`` with datetime bounds"""
+        return cls({
+            name: [(to_epoch(start), to_epoch(end), tuple(lords)) for start, end, lords in rows]
+            for name, rows in levels.items()
+        })
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, List[List[Any]]]) -> "DashaTimeline":
+        """Inverse of :meth:`to_dict`"""
+        return cls({
+            name: [(int(row[0]), int(row[1]), tuple(str(row[2]).split("/"))) for row in rows]
+            for name, rows in data.items() if name in LEVELS
+        })
+
+    @classmethod
+    def from_factors(cls, chart_factors: Optional[Dict[str, Any]]) -> Optional["DashaTimeline"]:
+        """
+        Build the timeline for parsed chart factors
+
+        Uses the serialized ``dasha_timeline`` factor when present (schema
+        parser), otherwise the ``dasha_periods_20yr`` list (LLM/regex parsers).
+
+        Args:
+            chart_factors (Dict): Parsed chart factors
+
+        Returns:
+            DashaTimeline, or None if the chart carries no dasha periods
+        """
+        if not chart_factors:
+            return None
+        serialized = chart_factors.get("dasha_timeline")
+        if isinstance(serialized, dict) and serialized:
+            return cls.from_dict(serialized)
+
+        periods = chart_factors.get("dasha_periods_20yr")
+        if not isinstance(periods, list):
+            return None
+        antar_rows: List[PeriodRow] = []
+        for period in periods:
+            if not isinstance(period, dict) or not period.get("mahadasha") or not period.get("antardasha"):
+                continue
+            start = parse_dasha_date(str(period.get("start_date") or ""))
+            end = parse_dasha_date(str(period.get("end_date") or ""))
+            if start and end:
+                antar_rows.append((to_epoch(start), to_epoch(end), (period["mahadasha"], period["antardasha"])))
+        if not antar_rows:
+            return None
+
+        # Mahadashas are the runs of consecutive antardashas under the same lord
+        antar_rows.sort(key=lambda row: row[0])
+        maha_rows: List[PeriodRow] = []
+        for start, end, lords in antar_rows:
+            if maha_rows and maha_rows[-1][2][0] == lords[0] and maha_rows[-1][1] >= start:
+                maha_rows[-1] = (maha_rows[-1][0], end, maha_rows[-1][2])
+            else:
+                maha_rows.append((start, end, (lords[0],)))
+        return cls({"mahadasha": maha_rows, "antardasha": antar_rows})
+
+    def to_dict(self) -> Dict[str, List[List[Any]]]:
+        """Compact JSON-safe form: ``{level: [[start_epoch, end_epoch, "Lord/Lord"], ...]}``"""
+        return {
+            name: [[start, end, "/".join(lords)] for start, end, lords in zip(level.starts, level.ends, level.lords)]
+            for name, level in self._levels.items()
+        }
+
+    @property
+    def levels(self) -> Tuple[str, ...]:
+        return tuple(self._levels)
+
+    def __len__(self) -> int:
+        return sum(len(level) for level in self._levels.values())
+
+    def period_at(self, level: str, at: Optional[datetime] = None) -> Optional[DashaPeriod]:
+        """Active period of ``level`` at ``at`` (default: now)"""
+        periods = self._levels.get(level)
+        if periods is None:
+            return None
+        index = periods.index_at(to_epoch(at or datetime.now()))
+        return periods.period(index) if index is not None else None
+
+    def active(self, at: Optional[datetime] = None) -> Dict[str, DashaPeriod]:
+        """Active period per level at ``at`` (default: now)"""
+        at = at or datetime.now()
+        active = {}
+        for name in self._levels:
+            period = self.period_at(name, at)
+            if period:
+                active[name] = period
+        return active
+
+    def following(self, level: str, at: Optional[datetime] = None) -> Optional[DashaPeriod]:
+        """First period of ``level`` starting after ``at``"""
+        periods = self._levels.get(level)
+        if periods is None:
+            return None
+        index = bisect.bisect_right(periods.starts, to_epoch(at or datetime.now()))
+        return periods.period(index) if index < len(periods) else None
+
+    def preceding(self, level: str, at: Optional[datetime] = None) -> Optional[DashaPeriod]:
+        """Last period of ``level`` that ended at or before ``at``"""
+        periods = self._levels.get(level)
+        if periods is None:
+            return None
+        index = bisect.bisect_right(periods.ends, to_epoch(at or datetime.now())) - 1
+        return periods.period(index) if index >= 0 else None
+
+    def within(
+        self,
+        years: float,
+        at: Optional[datetime] = None,
+        level: str = "antardasha",
+    ) -> List[DashaPeriod]:
+        """
+        Periods of ``level`` overlapping ``at`` ± ``years``
+
+        Args:
+            years (float): Window half-width in years
+            at (Optional[datetime]): Window centre (default: now)
+            level (str): Timeline level
+
+        Returns:
+            List[DashaPeriod]: Periods in chronological order
+        """
+        periods = self._levels.get(level)
+        if periods is None:
+            return []
+        t = to_epoch(at or datetime.now())
+        window = int(years * _YEAR_SECONDS)
+        # Periods are contiguous and sorted, so ends are sorted too
+        lo = bisect.bisect_right(periods.ends, t - window)
+        hi = bisect.bisect_left(periods.starts, t + window)
+        return [periods.period(index) for index in range(lo, hi)]
+
+    def next_boundary(self, at: Optional[datetime] = None) -> Optional[datetime]:
+        """Next instant after ``at`` at which any level changes period"""
+        index = bisect.bisect_right(self._boundaries, to_epoch(at or datetime.now()))
+        return from_epoch(self._boundaries[index]) if index < len(self._boundaries) else None
+
+    def seconds_until_change(self, at: Optional[datetime] = None) -> Optional[float]:
+        """Seconds from ``at`` to :meth:`next_boundary` (None past the end of the timeline)"""
+        at = at or datetime.now()
+        boundary = self.next_boundary(at)
+        return (boundary - at).total_seconds() if boundary else None
+
+
+__all__ = ["DashaPeriod", "DashaTimeline", "LEVELS", "from_epoch", "parse_dasha_date", "to_epoch"]
@@ -0,0 +1,239 @@
+"""
+Metrics Module
+Purpose: Prometheus metrics (text exposition format 0.0.4) without extra dependencies
+
+Two kinds of metrics:
+- instruments updated on the request path (:class:`Counter`, :class:`Gauge`,
+  :class:`Histogram`), thread-safe and labelled
+- collectors: callables run at scrape time that turn existing in-process
+  stats (cache, sessions, token usage, executors) into samples, so those
+  components need no metrics code of their own
+
+Each process exposes its own values; in prefork mode every worker answers
+for itself.
+"""
+
+import logging
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request / stage latencies: 1ms .. 30s
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class MetricFamily:
+    """Samples of one metric, as rendered in a scrape"""
+
+    def __init__(self, name: str, kind: str, help_text: str):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.samples: List[Tuple[str, Dict[str, str], float]] = []
+
+    def add(self, value: float, suffix: str = "", **labels: str) -> "MetricFamily":
+        """Append one sample (``suffix`` e.g. "_bucket", "_sum")"""
+        self.samples.append((suffix, labels, float(value)))
+        return self
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples:
+            lines.append(f"{self.name}{suffix}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def collect(self) -> MetricFamily:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help_text)
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            family.add(value, **dict(zip(self.labelnames, key)))
+        return family
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values (seconds for latencies)"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help_text)
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                family.add(cumulative, "_bucket", **labels, le=_format_value(bound))
+            cumulative += series[len(self.buckets)]
+            family.add(cumulative, "_bucket", **labels, le="+Inf")
+            family.add(series[-1], "_sum", **labels)
+            family.add(cumulative, "_count", **labels)
+        return family
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class MetricsRegistry:
+    """Instruments plus scrape-time collectors, rendered in registration order"""
+
+    def __init__(self, namespace: str = ""):
+        self.namespace = namespace
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self._name(name), help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self._name(name), help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(self._name(name), help_text, labelnames, buckets))
+
+    def family(self, name: str, kind: str, help_text: str) -> MetricFamily:
+        """Empty family for collectors, with this registry's namespace"""
+        return MetricFamily(self._name(name), kind, help_text)
+
+    def register_collector(self, collector: Collector) -> Collector:
+        """Add a scrape-time collector (usable as a decorator)"""
+        self._collectors.append(collector)
+        return collector
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, collectors: Optional[Iterable[Collector]] = None) -> str:
+        """
+        Prometheus text exposition of all metrics
+
+        Args:
+            collectors: Extra one-off collectors for this scrape (e.g. event-loop state)
+
+        Returns:
+            str: Exposition text
+        """
+        families = [metric.collect() for metric in self._metrics]
+        for collector in [*self._collectors, *(collectors or [])]:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                # One broken source must not fail the whole scrape
+                logger.warning(f"⚠️ Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        return "\n".join(family.render() for family in families if family.samples) + "\n"
+
+
+__all__ = [
+    "CONTENT_TYPE",
+    "Counter",
+    "DEFAULT_BUCKETS",
+    "Gauge",
+    "Histogram",
+    "MetricFamily",
+    "MetricsRegistry",
+]
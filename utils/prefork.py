@@ -0,0 +1,175 @@
+"""
+Prefork Launcher Module
+Purpose: Run the API as N worker processes that share read-only data copy-on-write
+
+``uvicorn --workers`` spawns fresh interpreters, so every worker re-imports
+the app and rebuilds every table. Here the parent:
+
+1. imports the app (module-level tables: niche registry and instructions,
+   chart schema maps, classifier rules, factor lists)
+2. runs the ``preload`` hook (data registered via :func:`shared_resource`,
+   e.g. the routing model)
+3. ``gc.freeze()``s everything loaded so far, so collections in the workers
+   never write to (and un-share) those pages
+4. binds the listening socket once and forks the workers
+
+Each worker runs the app lifespan after the fork, so network clients,
+threads and event loops are always per-process. The parent only supervises:
+crashed workers are replaced and SIGTERM/SIGINT are forwarded.
+
+Workers do not share sessions in memory - use SESSION_BACKEND=sqlite|redis.
+"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Read-only data loaded once per process tree (before the fork when preloaded)
+_SHARED: Dict[str, Any] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_resource(name: str, loader: Callable[[], Any]) -> Any:
+    """
+    Load read-only data once and reuse it
+
+    Called from the prefork ``preload`` hook, the data lands in the parent
+    and is inherited copy-on-write by every worker; called later (single
+    process, or data not preloaded) it is simply loaded once per process.
+
+    Args:
+        name (str): Registry key (include the source path/version)
+        loader (Callable): Zero-argument loader
+
+    Returns:
+        The loaded data
+    """
+    if name in _SHARED:
+        return _SHARED[name]
+    with _SHARED_LOCK:
+        if name not in _SHARED:
+            _SHARED[name] = loader()
+            logger.info(f"📦 Shared resource loaded: {name}")
+        return _SHARED[name]
+
+
+def shared_resource_names() -> List[str]:
+    """Names of the resources loaded so far"""
+    return list(_SHARED)
+
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # Accepted sockets inherit this; without it small responses hit delayed-ACK stalls
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app: Any, sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="on", log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def serve(
+    app: Any,
+    host: str = "0.0.0.0",
+    port: int = 8080,
+    workers: int = 2,
+    preload: Optional[Callable[[], None]] = None,
+    log_level: str = "info",
+) -> None:
+    """
+    Serve ``app`` from ``workers`` forked processes
+
+    Args:
+        app: ASGI application (already imported in this process)
+        host (str): Bind address
+        port (int): Bind port
+        workers (int): Number of worker processes
+        preload (Optional[Callable]): Loads shared read-only data before forking
+        log_level (str): uvicorn log level
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Prefork mode needs os.fork (POSIX only)")
+
+    started = time.perf_counter()
+    if preload:
+        preload()
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        f"🧊 Preloaded and froze {gc.get_freeze_count()} objects in "
+        f"{(time.perf_counter() - started) * 1000:.0f}ms "
+        f"(shared: {', '.join(shared_resource_names()) or 'module tables only'})"
+    )
+
+    sock = _bind(host, port)
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(app, sock, log_level)
+            except BaseException:
+                logger.exception(f"❌ Worker {slot} crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = slot
+        logger.info(f"👷 Worker {slot} started (pid {pid})")
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info(f"🚀 Prefork server on {host}:{port} with {workers} workers (parent pid {os.getpid()})")
+    for slot in range(workers):
+        spawn(slot)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is None:
+            continue
+        if not stopping:
+            logger.warning(f"⚠️ Worker {slot} (pid {pid}) exited with status {status}, restarting")
+            time.sleep(0.5)  # Avoid a hot crash loop
+            spawn(slot)
+
+    sock.close()
+    logger.info("👋 Prefork server stopped")
+
+
+__all__ = ["serve", "shared_resource", "shared_resource_names"]
@@ -0,0 +1,578 @@
+"""
+Session Store Module
+Purpose: Pluggable session persistence behind ConversationManager
+
+A session is an immutable record (chart, niche, user, precompiled views)
+plus an append-only history holding the last ``max_history`` exchanges.
+Backends:
+
+* InMemorySessionStore - per-process dicts (single worker, tests)
+* SQLiteSessionStore   - one file in WAL mode, shared by all workers on a host
+* RedisSessionStore    - shared by every worker and instance behind a load balancer
+
+Appending an exchange is O(1) on every backend (ring-buffer append, one
+INSERT, one RPUSH); the session record itself is never rewritten after
+creation. Only the latest exchange keeps its retrieval artifacts (expand
+reuses nothing older), so every backend clears them from the previous one.
+"""
+
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def dumps(value: Any) -> str:
+    """Serialize a session record or exchange for a persistent backend"""
+    return json.dumps(value, default=_json_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def _strip_artifacts(serialized: str) -> Optional[str]:
+    """Serialized exchange without its artifacts, or None if it has none to drop"""
+    exchange = json.loads(serialized)
+    if not exchange.get("artifacts"):
+        return None
+    exchange["artifacts"] = None
+    return dumps(exchange)
+
+
+class _Exchange:
+    """
+    Compact in-memory exchange
+
+    The metadata fields the API records on every turn get their own slots;
+    anything else goes to ``extra``. Callers only ever see :meth:`as_dict`.
+    """
+
+    __slots__ = (
+        "turn", "timestamp", "user_message", "assistant_response",
+        "mode", "latency_ms", "complexity", "passages_used", "extra", "artifacts",
+    )
+
+    _METADATA = ("mode", "latency_ms", "complexity", "passages_used")
+
+    def __init__(self, exchange: Dict[str, Any]) -> None:
+        metadata = dict(exchange.get("metadata") or {})
+        self.turn = exchange.get("turn")
+        self.timestamp = exchange.get("timestamp")
+        self.user_message = exchange.get("user_message")
+        self.assistant_response = exchange.get("assistant_response")
+        self.mode = metadata.pop("mode", None)
+        self.latency_ms = metadata.pop("latency_ms", None)
+        self.complexity = metadata.pop("complexity", None)
+        self.passages_used = metadata.pop("passages_used", None)
+        self.extra = metadata or None
+        self.artifacts = exchange.get("artifacts")
+
+    def as_dict(self) -> Dict[str, Any]:
+        metadata = {name: getattr(self, name) for name in self._METADATA if getattr(self, name) is not None}
+        if self.extra:
+            metadata.update(self.extra)
+        return {
+            "turn": self.turn,
+            "timestamp": self.timestamp,
+            "user_message": self.user_message,
+            "assistant_response": self.assistant_response,
+            "metadata": metadata,
+            "artifacts": self.artifacts,
+        }
+
+
+class SessionStore(ABC):
+    """
+    Session persistence interface
+
+    Records carry ``updated_at`` (epoch seconds) and ``question_count`` next
+    to the creation-time fields; both are maintained by the store. Histories
+    keep the last ``max_history`` exchanges (None: unbounded).
+    """
+
+    # Sessions dropped to respect the size cap / because their TTL ran out
+    evictions = 0
+    expirations = 0
+    max_history: Optional[int] = None
+
+    # Called with (session_id, reason) for sessions the store drops on its own
+    # ("evicted", "expired"); explicit delete() is left to the caller. Backends
+    # that expire keys server-side (Redis) cannot report expiries.
+    on_session_end: Optional[Callable[[str, str], None]] = None
+
+    @abstractmethod
+    def create(self, session_id: str, record: Dict[str, Any], ttl_seconds: float) -> None:
+        """Store a new session record"""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Session record, or None if missing or expired"""
+
+    @abstractmethod
+    def append_exchange(self, session_id: str, exchange: Dict[str, Any], ttl_seconds: float) -> bool:
+        """Append an exchange, bump question_count/updated_at and extend the expiry"""
+
+    @abstractmethod
+    def history(self, session_id: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Exchanges oldest first (only the last ``last_n`` if given)"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Remove a session and its history; True if it existed"""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Remove expired sessions; returns the number removed"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored (possibly not yet purged) sessions"""
+
+    def close(self) -> None:
+        """Release backend resources"""
+
+    def _notify_ended(self, session_ids: Iterable[str], reason: str) -> None:
+        """Report dropped sessions to on_session_end (call outside store locks)"""
+        if self.on_session_end is None:
+            return
+        for session_id in session_ids:
+            try:
+                self.on_session_end(session_id, reason)
+            except Exception as e:
+                logger.warning(f"⚠️ Session end hook failed for {session_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and eviction/expiry counters"""
+        return {
+            "backend": type(self).__name__,
+            "sessions": self.count(),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Per-process store; sessions are lost on restart and invisible to other workers
+
+    The table is an LRU capped at ``max_sessions`` (least recently used
+    sessions are evicted first) and expiry deadlines sit in a min-heap, so
+    :meth:`purge_expired` only touches sessions that are actually due.
+    Heap entries are invalidated lazily: a session whose deadline moved
+    (new exchange) leaves a stale entry that is skipped when popped.
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None, max_history: Optional[int] = None) -> None:
+        self.max_sessions = max_sessions if max_sessions and max_sessions > 0 else None
+        self.max_history = max_history if max_history and max_history > 0 else None
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._histories: Dict[str, "deque[_Exchange]"] = {}
+        self._expires_at: Dict[str, float] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def create(self, session_id: str, record: Dict[str, Any], ttl_seconds: float) -> None:
+        now = time.time()
+        evicted = []
+        with self._lock:
+            self._drop(session_id)
+            self._records[session_id] = dict(record, updated_at=now, question_count=0)
+            self._histories[session_id] = deque(maxlen=self.max_history)
+            self._schedule(session_id, now + ttl_seconds)
+            while self.max_sessions and len(self._records) > self.max_sessions:
+                oldest = next(iter(self._records))
+                self._drop(oldest)
+                self.evictions += 1
+                evicted.append(oldest)
+                logger.info(f"🧹 Session evicted (LRU, cap {self.max_sessions}): {oldest}")
+        self._notify_ended(evicted, "evicted")
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None:
+                return None
+            if self._expires_at[session_id] > time.time():
+                self._records.move_to_end(session_id)
+                return record
+            self._drop(session_id)
+            self.expirations += 1
+        self._notify_ended([session_id], "expired")
+        return None
+
+    def append_exchange(self, session_id: str, exchange: Dict[str, Any], ttl_seconds: float) -> bool:
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None:
+                return False
+            history = self._histories[session_id]
+            if history:
+                # Only the latest exchange's artifacts are reused (expand)
+                history[-1].artifacts = None
+            history.append(_Exchange(exchange))
+            record["question_count"] += 1
+            record["updated_at"] = time.time()
+            self._records.move_to_end(session_id)
+            self._schedule(session_id, record["updated_at"] + ttl_seconds)
+            return True
+
+    def history(self, session_id: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            history = self._histories.get(session_id, ())
+            start = max(len(history) - last_n, 0) if last_n else 0
+            return [history[i].as_dict() for i in range(start, len(history))]
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._drop(session_id)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        expired = []
+        with self._lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] <= now:
+                expires_at, session_id = heapq.heappop(heap)
+                if self._expires_at.get(session_id) == expires_at:
+                    self._drop(session_id)
+                    expired.append(session_id)
+            self.expirations += len(expired)
+        self._notify_ended(expired, "expired")
+        return len(expired)
+
+    def count(self) -> int:
+        return len(self._records)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["max_sessions"] = self.max_sessions
+        stats["heap_entries"] = len(self._expiry_heap)
+        return stats
+
+    def _schedule(self, session_id: str, expires_at: float) -> None:
+        self._expires_at[session_id] = expires_at
+        heapq.heappush(self._expiry_heap, (expires_at, session_id))
+        # Every exchange leaves a stale entry behind; rebuild once they dominate
+        if len(self._expiry_heap) > 2 * len(self._expires_at) + 64:
+            self._expiry_heap = [(deadline, sid) for sid, deadline in self._expires_at.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _drop(self, session_id: str) -> bool:
+        existed = self._records.pop(session_id, None) is not None
+        self._histories.pop(session_id, None)
+        self._expires_at.pop(session_id, None)
+        return existed
+
+
+class SQLiteSessionStore(SessionStore):
+    """Single-file store in WAL mode; safe for several worker processes on one host"""
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            record TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            question_count INTEGER NOT NULL DEFAULT 0,
+            expires_at REAL NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS exchanges (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            exchange TEXT NOT NULL,
+            PRIMARY KEY (session_id, seq)
+        )""",
+        "CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)",
+    )
+
+    def __init__(self, path: str = "sessions.db", max_history: Optional[int] = None) -> None:
+        self.path = path
+        self.max_history = max_history if max_history and max_history > 0 else None
+        self._local = threading.local()
+        with self._connection() as conn:
+            for statement in self._SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, session_id: str, record: Dict[str, Any], ttl_seconds: float) -> None:
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (session_id, record, updated_at, question_count, expires_at) "
+            "VALUES (?, ?, ?, 0, ?)",
+            (session_id, dumps(record), now, now + ttl_seconds),
+        )
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT record, updated_at, question_count FROM sessions WHERE session_id = ? AND expires_at > ?",
+            (session_id, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+        record["updated_at"], record["question_count"] = row[1], row[2]
+        return record
+
+    def append_exchange(self, session_id: str, exchange: Dict[str, Any], ttl_seconds: float) -> bool:
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                "UPDATE sessions SET question_count = question_count + 1, updated_at = ?, expires_at = ? "
+                "WHERE session_id = ?",
+                (now, now + ttl_seconds, session_id),
+            )
+            if cursor.rowcount == 0:
+                conn.execute("ROLLBACK")
+                return False
+            # Only the latest exchange's artifacts are reused (expand)
+            previous = conn.execute(
+                "SELECT seq, exchange FROM exchanges WHERE session_id = ? ORDER BY seq DESC LIMIT 1",
+                (session_id,),
+            ).fetchone()
+            stripped = _strip_artifacts(previous[1]) if previous else None
+            if stripped is not None:
+                conn.execute(
+                    "UPDATE exchanges SET exchange = ? WHERE session_id = ? AND seq = ?",
+                    (stripped, session_id, previous[0]),
+                )
+            conn.execute(
+                "INSERT INTO exchanges (session_id, seq, exchange) VALUES "
+                "(?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM exchanges WHERE session_id = ?), ?)",
+                (session_id, session_id, dumps(exchange)),
+            )
+            if self.max_history:
+                conn.execute(
+                    "DELETE FROM exchanges WHERE session_id = ? AND seq <= "
+                    "(SELECT MAX(seq) FROM exchanges WHERE session_id = ?) - ?",
+                    (session_id, session_id, self.max_history),
+                )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def history(self, session_id: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT exchange FROM (SELECT seq, exchange FROM exchanges WHERE session_id = ? "
+            "ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+            (session_id, last_n if last_n else -1),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete(self, session_id: str) -> bool:
+        conn = self._connection()
+        conn.execute("DELETE FROM exchanges WHERE session_id = ?", (session_id,))
+        return conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def purge_expired(self) -> int:
+        conn = self._connection()
+        now = time.time()
+        expired = [row[0] for row in conn.execute(
+            "SELECT session_id FROM sessions WHERE expires_at <= ?", (now,)
+        ).fetchall()]
+        conn.execute(
+            "DELETE FROM exchanges WHERE session_id IN (SELECT session_id FROM sessions WHERE expires_at <= ?)",
+            (now,),
+        )
+        removed = conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,)).rowcount
+        self.expirations += removed
+        self._notify_ended(expired, "expired")
+        return removed
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store shared by all workers and instances
+
+    Keys: ``{prefix}{id}`` hash (record, updated_at, question_count) and
+    ``{prefix}{id}:history`` list; both carry the session TTL, so expiry
+    is handled by Redis itself. ``{prefix}index`` is a sorted set of session
+    ids scored by expiry time, so counting sessions never scans the keyspace.
+    """
+
+    def __init__(self, client: Any, prefix: str = "astro:session:", max_history: Optional[int] = None) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.max_history = max_history if max_history and max_history > 0 else None
+        self._index_key = f"{prefix}index"
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _history_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:history"
+
+    def create(self, session_id: str, record: Dict[str, Any], ttl_seconds: float) -> None:
+        key = self._key(session_id)
+        pipe = self.client.pipeline()
+        pipe.delete(key, self._history_key(session_id))
+        pipe.hset(key, mapping={"record": dumps(record), "updated_at": time.time(), "question_count": 0})
+        pipe.expire(key, int(ttl_seconds))
+        pipe.zadd(self._index_key, {session_id: time.time() + int(ttl_seconds)})
+        pipe.execute()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        values = self.client.hmget(self._key(session_id), "record", "updated_at", "question_count")
+        if not values or values[0] is None:
+            return None
+        record = json.loads(values[0])
+        record["updated_at"] = float(values[1] or 0)
+        record["question_count"] = int(values[2] or 0)
+        return record
+
+    def append_exchange(self, session_id: str, exchange: Dict[str, Any], ttl_seconds: float) -> bool:
+        key = self._key(session_id)
+        if not self.client.exists(key):
+            return False
+        history_key = self._history_key(session_id)
+        serialized = dumps(exchange)
+
+        def append(pipe: Any) -> None:
+            # Only the latest exchange's artifacts are reused (expand); WATCH on the
+            # history retries if another worker appends in between
+            previous = pipe.lindex(history_key, -1)
+            stripped = _strip_artifacts(previous) if previous else None
+            pipe.multi()
+            if stripped is not None:
+                pipe.lset(history_key, -1, stripped)
+            pipe.rpush(history_key, serialized)
+            if self.max_history:
+                pipe.ltrim(history_key, -self.max_history, -1)
+            pipe.hincrby(key, "question_count", 1)
+            pipe.hset(key, "updated_at", time.time())
+            pipe.expire(key, int(ttl_seconds))
+            pipe.expire(history_key, int(ttl_seconds))
+            pipe.zadd(self._index_key, {session_id: time.time() + int(ttl_seconds)})
+
+        self.client.transaction(append, history_key)
+        return True
+
+    def history(self, session_id: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        start = -last_n if last_n else 0
+        return [json.loads(item) for item in self.client.lrange(self._history_key(session_id), start, -1)]
+
+    def delete(self, session_id: str) -> bool:
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(session_id), self._history_key(session_id))
+        pipe.zrem(self._index_key, session_id)
+        return pipe.execute()[0] > 0
+
+    def purge_expired(self) -> int:
+        # The keys expire in Redis; only the index needs trimming
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.zrangebyscore(self._index_key, "-inf", now)
+        pipe.zremrangebyscore(self._index_key, "-inf", now)
+        expired, _ = pipe.execute()
+        self._notify_ended(expired, "expired")
+        return len(expired)
+
+    def count(self) -> int:
+        return int(self.client.zcount(self._index_key, time.time(), "+inf"))
+
+    def close(self) -> None:
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+
+def create_session_store(session_config: Dict[str, Any]) -> SessionStore:
+    """
+    Build the configured session backend
+
+    Args:
+        session_config: SESSION_CONFIG (``backend``: memory | sqlite | redis)
+
+    Returns:
+        SessionStore; falls back to memory if the configured backend is unavailable
+    """
+    backend = str(session_config.get("backend", "memory")).lower()
+    max_history = session_config.get("max_history_turns")
+    try:
+        if backend == "sqlite":
+            path = session_config.get("sqlite_path", "sessions.db")
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            store = SQLiteSessionStore(path, max_history=max_history)
+            logger.info(f"✅ Session store: SQLite (WAL) at {path}")
+            return store
+        if backend == "redis":
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package not installed")
+            url = session_config.get("redis_url")
+            client = (
+                redis.Redis.from_url(url, decode_responses=True)
+                if url
+                else redis.Redis(
+                    host=session_config.get("redis_host", "localhost"),
+                    port=session_config.get("redis_port", 6379),
+                    db=session_config.get("redis_db", 0),
+                    decode_responses=True,
+                )
+            )
+            client.ping()
+            logger.info("✅ Session store: Redis")
+            return RedisSessionStore(
+                client,
+                prefix=session_config.get("redis_prefix", "astro:session:"),
+                max_history=max_history,
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Session backend '{backend}' unavailable, using in-memory sessions: {e}")
+    return InMemorySessionStore(
+        max_sessions=session_config.get("max_sessions_in_memory"),
+        max_history=max_history,
+    )
+
+
+__all__ = [
+    "InMemorySessionStore",
+    "RedisSessionStore",
+    "SQLiteSessionStore",
+    "SessionStore",
+    "create_session_store",
+]
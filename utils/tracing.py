@@ -0,0 +1,372 @@
+"""
+Tracing Module
+Purpose: Lightweight in-process span tracer with OpenTelemetry-compatible output
+
+Spans nest through a ContextVar, so a request's spans follow it across
+``run_in_threadpool`` and into the agents (orchestrator, retrievers,
+reranker, embeddings, cache, synthesizers). Every span measures real
+wall-clock time; callers read durations back from the span tree
+(:meth:`Span.child_ms`, :meth:`Span.find`) instead of estimating them.
+
+Only *root* spans (``root=True``, e.g. one per HTTP request) are exported.
+A span opened with no active trace still times its subtree but is never
+exported, so helpers called at startup or from background threads don't
+produce single-span noise.
+
+Compatibility:
+- W3C ``traceparent`` in and out (32-hex trace id, 16-hex span id)
+- exported as OTLP/JSON ``resourceSpans`` lines (one per trace), readable
+  by the OpenTelemetry Collector ``otlpjsonfile`` receiver
+
+Log correlation: :func:`install_log_correlation` adds ``trace_id`` and
+``span_id`` to every LogRecord ("-" outside a trace).
+"""
+
+import functools
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP SpanKind / StatusCode values
+_SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+_STATUS_OK, _STATUS_ERROR = 1, 2
+
+
+class Span:
+    """One timed operation; children are attached as they start"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "kind", "attributes",
+        "children", "start_ns", "end_ns", "_started", "_elapsed", "error", "export",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+        export: bool = False,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+        self.export = export
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._started = time.perf_counter()
+        self._elapsed: Optional[float] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach one attribute (str, bool, int or float)"""
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        """Attach several attributes"""
+        self.attributes.update(attributes)
+
+    def record_exception(self, exc: BaseException) -> None:
+        """Mark the span as failed"""
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        """Stop the clock (idempotent)"""
+        if self._elapsed is None:
+            self._elapsed = time.perf_counter() - self._started
+            self.end_ns = self.start_ns + int(self._elapsed * 1e9)
+
+    @property
+    def duration_ms(self) -> float:
+        """Elapsed milliseconds (so far, if still open)"""
+        elapsed = self._elapsed if self._elapsed is not None else time.perf_counter() - self._started
+        return elapsed * 1000
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value for this span"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def walk(self) -> Iterator["Span"]:
+        """This span and all descendants, depth first"""
+        stack = [self]
+        while stack:
+            span = stack.pop()
+            yield span
+            stack.extend(reversed(span.children))
+
+    def find(self, name: str) -> Optional["Span"]:
+        """First descendant span called ``name``"""
+        return next((span for span in self.walk() if span is not self and span.name == name), None)
+
+    def child_ms(self, name: str) -> float:
+        """Total milliseconds of the descendant spans called ``name`` (0.0 if none ran)"""
+        return sum((span.duration_ms for span in self.walk() if span is not self and span.name == name), 0.0)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON span"""
+        encoded = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": _SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": _STATUS_ERROR, "message": self.error} if self.error else {"code": _STATUS_OK},
+        }
+        if self.parent_id:
+            encoded["parentSpanId"] = self.parent_id
+        return encoded
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+# ============================================================================
+# EXPORTERS
+# ============================================================================
+
+class SpanExporter:
+    """Receives each finished root span with its whole subtree"""
+
+    def __init__(self, service_name: str = "astroairk-api"):
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, root: Span) -> None:
+        line = json.dumps(self.encode(root), separators=(",", ":"))
+        with self._lock:
+            self._write(line)
+
+    def encode(self, root: Span) -> Dict[str, Any]:
+        """One OTLP/JSON ExportTraceServiceRequest for a trace"""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "astroairk.tracing"},
+                    "spans": [span.to_otlp() for span in root.walk()],
+                }],
+            }]
+        }
+
+    def _write(self, line: str) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """One JSON line per trace on stdout (or any text stream)"""
+
+    def __init__(self, service_name: str = "astroairk-api", stream: Optional[TextIO] = None):
+        super().__init__(service_name)
+        self.stream = stream or sys.stdout
+
+    def _write(self, line: str) -> None:
+        self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends one JSON line per trace to a file"""
+
+    def __init__(self, path: str, service_name: str = "astroairk-api"):
+        super().__init__(service_name)
+        self.path = path
+        self._handle = open(path, "a", encoding="utf-8", buffering=1)
+
+    def _write(self, line: str) -> None:
+        self._handle.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._handle.close()
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def configure_tracing(exporter: str = "none", path: str = "traces.jsonl", service_name: str = "astroairk-api") -> None:
+    """
+    Select where finished traces go
+
+    Args:
+        exporter (str): "none", "stdout" or "file"
+        path (str): JSONL file for the file exporter
+        service_name (str): service.name resource attribute
+    """
+    global _exporter
+    if _exporter:
+        _exporter.close()
+    if exporter == "stdout":
+        _exporter = ConsoleSpanExporter(service_name)
+    elif exporter == "file":
+        _exporter = FileSpanExporter(path, service_name)
+    elif exporter in ("none", "", None):
+        _exporter = None
+    else:
+        raise ValueError(f"Unknown trace exporter: {exporter}")
+    if _exporter:
+        logger.info(f"🔭 Tracing enabled ({exporter}{': ' + path if exporter == 'file' else ''})")
+
+
+def shutdown_tracing() -> None:
+    """Close the exporter"""
+    configure_tracing("none")
+
+
+# ============================================================================
+# SPANS
+# ============================================================================
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, parent span_id) from a W3C traceparent header, or None"""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2)
+
+
+@contextmanager
+def span(
+    name: str,
+    kind: str = "internal",
+    root: bool = False,
+    traceparent: Optional[str] = None,
+    **attributes: Any,
+) -> Iterator[Span]:
+    """
+    Time a block as a span under the current one
+
+    Args:
+        name (str): Span name ("rag.query", "llm.request", ...)
+        kind (str): "internal", "server" or "client"
+        root (bool): Start a new exported trace (continuing ``traceparent`` if valid)
+        traceparent (Optional[str]): Incoming W3C header for root spans
+        **attributes: Initial span attributes
+
+    Yields:
+        Span: The open span (durations are readable once the block exits)
+    """
+    parent = None if root else _current_span.get()
+    if parent is not None:
+        current = Span(name, parent.trace_id, parent.span_id, kind, attributes)
+        parent.children.append(current)
+    else:
+        remote = parse_traceparent(traceparent) if root else None
+        trace_id, parent_id = remote or (f"{random.getrandbits(128):032x}", None)
+        current = Span(name, trace_id, parent_id, kind, attributes, export=root)
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.record_exception(exc)
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+        if current.export and _exporter:
+            try:
+                _exporter.export(current)
+            except Exception as e:
+                logger.warning(f"⚠️ Trace export failed: {e}")
+
+
+def traced(name: str, kind: str = "internal") -> Callable[[F], F]:
+    """
+    Decorator form of :func:`span` for whole functions
+
+    Args:
+        name (str): Span name
+        kind (str): "internal", "server" or "client"
+    """
+    def decorate(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorate
+
+
+def current_span() -> Optional[Span]:
+    """Innermost open span in this context"""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace id of the current context, if any"""
+    active = _current_span.get()
+    return active.trace_id if active else None
+
+
+# ============================================================================
+# LOG CORRELATION
+# ============================================================================
+
+_log_correlation_installed = False
+
+
+def install_log_correlation() -> None:
+    """Add ``trace_id``/``span_id`` attributes to every LogRecord (idempotent)"""
+    global _log_correlation_installed
+    if _log_correlation_installed:
+        return
+    base_factory = logging.getLogRecordFactory()
+
+    def record_factory(*args, **kwargs):
+        record = base_factory(*args, **kwargs)
+        active = _current_span.get()
+        record.trace_id = active.trace_id if active else "-"
+        record.span_id = active.span_id if active else "-"
+        return record
+
+    logging.setLogRecordFactory(record_factory)
+    _log_correlation_installed = True
+
+
+__all__ = [
+    "ConsoleSpanExporter",
+    "FileSpanExporter",
+    "Span",
+    "SpanExporter",
+    "configure_tracing",
+    "current_span",
+    "current_trace_id",
+    "install_log_correlation",
+    "parse_traceparent",
+    "shutdown_tracing",
+    "span",
+    "traced",
+]